@@ -1,12 +1,30 @@
+import argparse
+import array
 import asyncio
+import bisect
+import collections
+import errno
+import functools
+import heapq
 import json
+import math
+import mmap
+import multiprocessing
 import os
+import pickle
+import resource
+import select
+import signal
+import struct
+import threading
 import psutil
 import aiosmtplib
 import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from types import MappingProxyType
 import platform
 import socket
 
@@ -15,7 +33,8 @@ from pysnmp.entity.rfc3413 import cmdrsp, context
 from pysnmp.carrier.asyncio.dgram import udp
 from pysnmp.proto.api import v2c
 
-from pysnmp.proto import rfc1902, rfc1905
+from pysnmp.proto import error, rfc1902, rfc1905
+from pyasn1.codec.ber import encoder
 from pysnmp.proto.rfc1902 import Integer32, OctetString, ObjectIdentifier
 
 from pysnmp.hlapi.v3arch.asyncio import (
@@ -42,6 +61,39 @@ OID_MANAGER = BASE_OID + (1, 1, 0)
 OID_MANAGER_EMAIL = BASE_OID + (1, 2, 0)
 OID_CPU_USAGE = BASE_OID + (1, 3, 0)
 OID_CPU_THRESHOLD = BASE_OID + (1, 4, 0)
+OID_NOTIFY_QUEUE_DEPTH = BASE_OID + (1, 5, 0)
+OID_NOTIFY_DROPPED = BASE_OID + (1, 6, 0)
+OID_NOTIFY_DELIVERED = BASE_OID + (1, 7, 0)
+OID_NOTIFY_FAILED = BASE_OID + (1, 8, 0)
+OID_CPU_LOAD_AVG_1 = BASE_OID + (1, 9, 0)
+OID_CPU_LOAD_AVG_5 = BASE_OID + (1, 10, 0)
+OID_CPU_LOAD_AVG_15 = BASE_OID + (1, 11, 0)
+OID_CPU_USAGE_MIN = BASE_OID + (1, 12, 0)
+OID_CPU_USAGE_MAX = BASE_OID + (1, 13, 0)
+OID_CPU_HISTORY_ENTRY = BASE_OID + (1, 14, 1)
+OID_CPU_SAMPLE_INTERVAL = BASE_OID + (1, 15, 0)
+OID_CPU_SAMPLE_ADAPTIVE = BASE_OID + (1, 16, 0)
+OID_CPU_SAMPLE_LAG = BASE_OID + (1, 17, 0)
+OID_CPU_CORE_ENTRY = BASE_OID + (1, 18, 1)
+OID_ALARM_ENTRY = BASE_OID + (1, 19, 1)
+OID_CPU_THRESHOLD_HYSTERESIS = BASE_OID + (1, 20, 0)
+OID_ALERT_HOLD_TIME = BASE_OID + (1, 21, 0)
+OID_ALERT_RATE_LIMIT = BASE_OID + (1, 22, 0)
+OID_ALERT_RATE_WINDOW = BASE_OID + (1, 23, 0)
+OID_ALERT_HELD_BACK = BASE_OID + (1, 24, 0)
+OID_ALERT_SUPPRESSED = BASE_OID + (1, 25, 0)
+OID_ALERT_SUMMARIES = BASE_OID + (1, 26, 0)
+OID_ALERT_SUMMARY_TYPE = BASE_OID + (1, 27, 0)     # accessible-for-notify: sólo en el trap alertSummary
+OID_ALERT_SUMMARY_COUNT = BASE_OID + (1, 28, 0)    # accessible-for-notify
+OID_TRAP_TARGET_ENTRY = BASE_OID + (1, 29, 1)
+OID_TOP_CPU_ENTRY = BASE_OID + (1, 30, 1)
+OID_FS_ENTRY = BASE_OID + (1, 31, 1)
+OID_DISK_IO_ENTRY = BASE_OID + (1, 32, 1)
+OID_CGROUP_CPU_ENTRY = BASE_OID + (1, 33, 1)
+OID_PRESSURE = BASE_OID + (1, 34)                   # Escalares de PSI (.34.N.0)
+OID_PRESSURE_STALL_EVENTS = OID_PRESSURE + (25, 0)
+OID_PRESSURE_TRIGGER_STALL = OID_PRESSURE + (26, 0)     # accessible-for-notify: sólo en el trap pressureStall
+OID_PRESSURE_TRIGGER_WINDOW = OID_PRESSURE + (27, 0)    # accessible-for-notify
 
 
 # OIDs estándar de MIB -II System 
@@ -53,16 +105,94 @@ SYS_NAME = (1, 3, 6, 1, 2, 1, 1, 5, 0)
 SYS_LOCATION = (1, 3, 6, 1, 2, 1, 1, 6, 0)
 SYS_SERVICES = (1, 3, 6, 1, 2, 1, 1, 7, 0)
 
-# Lista de OIDs servidos, en orden
-ORDERED_OIDS = sorted([
-    SYS_DESCR, SYS_OBJECT_ID, SYS_UP_TIME, SYS_CONTACT, SYS_NAME,
-    SYS_LOCATION, SYS_SERVICES,
-    OID_MANAGER, OID_MANAGER_EMAIL, OID_CPU_USAGE, OID_CPU_THRESHOLD
-])
-
-JSON_FILE = 'mib_state.json'    # Archivo para persistencia del estado
-TRAP_HOST = '127.0.0.1'
+# OIDs estándar de MIB-II Interfaces e IF-MIB (RFC 2863)
+IF_NUMBER = (1, 3, 6, 1, 2, 1, 2, 1, 0)
+IF_ENTRY = (1, 3, 6, 1, 2, 1, 2, 2, 1)
+IF_X_ENTRY = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1)
+
+# OIDs estándar de HOST-RESOURCES-MIB (RFC 2790): almacenamiento y procesos en ejecución
+HR_STORAGE_ENTRY = (1, 3, 6, 1, 2, 1, 25, 2, 3, 1)
+HR_STORAGE_FIXED_DISK = (1, 3, 6, 1, 2, 1, 25, 2, 1, 4)   # hrStorageType de los sistemas de ficheros
+HR_SW_RUN_ENTRY = (1, 3, 6, 1, 2, 1, 25, 4, 2, 1)
+HR_SW_RUN_PERF_ENTRY = (1, 3, 6, 1, 2, 1, 25, 5, 1, 1)
+
+# Margen reservado para la cabecera del mensaje de respuesta (versión, comunidad,
+# request-id, error-status, error-index y cabeceras de secuencia)
+RESPONSE_OVERHEAD = 128
+
+AGENT_PORT = 161                # Puerto UDP estándar del agente SNMP
+FAST_PATH = False               # Responder GET/GETNEXT v2c sin pasar por pysnmp (--fast-path)
+
+# Comunidades SNMPv1/2c y su securityName (public = sólo lectura, private = lectura-escritura)
+COMMUNITIES = {
+    'public': 'public-user',
+    'private': 'private-user',
+}
+
+# Subárboles incluidos en las vistas VACM: System e Interfaces de MIB-II, HOST-RESOURCES-MIB,
+# IF-MIB y nuestra rama de Empresa
+VIEW_SUBTREES = [(1, 3, 6, 1, 2, 1, 1), (1, 3, 6, 1, 2, 1, 2), (1, 3, 6, 1, 2, 1, 25),
+                 (1, 3, 6, 1, 2, 1, 31), BASE_OID]
+
+WORKERS = 1                     # Procesos que atienden peticiones (--workers, SO_REUSEPORT)
+PERSIST_POLL_INTERVAL = 0.2     # Segundos entre comprobaciones de SETs pendientes de guardar (multiproceso)
+SHARED_STRING_SIZE = 1020       # Bytes por cadena en memoria compartida (255 caracteres UTF-8)
+SHARED_SNAPSHOT_SIZE = 8 << 20  # Bytes máximos de un snapshot de recolector en memoria compartida
+
+JSON_FILE = 'mib_state.json'    # Archivo para persistencia del estado (snapshot)
+JOURNAL_FILE = 'mib_state.journal'  # Registro append-only de SETs posteriores al snapshot
+JOURNAL_COMPACT_RECORDS = 1000  # Registros de journal que provocan una compactación en el snapshot
+PERSIST_DELAY = 0.5             # Segundos que se agrupan SETs antes de escribir el journal (write-behind)
+TRAP_HOST = '127.0.0.1'         # Destino por defecto: fila 1 de trapTargetTable si no hay configuración guardada
 TRAP_PORT = 162
+CPU_SAMPLE_INTERVAL = 5         # Segundos entre muestras de CPU (valor por defecto de cpuSampleInterval)
+CPU_HISTORY_SIZE = 180          # Muestras guardadas en el historial (15 minutos a 5 s)
+
+# Muestreo adaptativo (cpuSampleAdaptive = true)
+ADAPTIVE_NEAR_BAND = 10         # Puntos de CPU alrededor del umbral en los que se muestrea más rápido
+ADAPTIVE_FAST_FACTOR = 0.2      # Intervalo × factor cerca del umbral
+ADAPTIVE_MIN_INTERVAL = 1.0     # Intervalo mínimo (s) cerca del umbral
+ADAPTIVE_IDLE_LEVEL = 10        # CPU (%) por debajo de la cual el sistema se considera en reposo
+ADAPTIVE_IDLE_FACTOR = 3        # Intervalo × factor en reposo
+
+ACCESS_CACHE_SIZE = 4096        # Decisiones VACM (contexto, vista, OID) guardadas en la caché LRU
+
+COLLECTOR_THREADS = 4           # Threads que ejecutan los recolectores de métricas (psutil, /proc)
+IF_SAMPLE_INTERVAL = 5          # Segundos entre lecturas de los contadores de interfaz (un snapshot por ventana)
+PROC_SAMPLE_INTERVAL = 5        # Segundos entre pasadas por los procesos (delta de CPU por proceso)
+TOP_CPU_COUNT = 5               # Filas de topCpuTable: procesos que más CPU consumen (también en el trap y el email)
+FS_SAMPLE_INTERVAL = 10         # Segundos entre lecturas de ocupación de los sistemas de ficheros (statvfs)
+DISK_SAMPLE_INTERVAL = 5        # Segundos entre lecturas de /proc/diskstats (ventana de las tasas de E/S)
+CGROUP_ROOT = '/sys/fs/cgroup'  # Raíz de la jerarquía cgroup v2 que se recorre (--cgroup-root)
+CGROUP_SAMPLE_INTERVAL = 5      # Segundos entre lecturas de cpu.stat/cpu.max (ventana de las tasas)
+CGROUP_RESCAN_INTERVAL = 30     # Segundos entre recorridos del árbol para descubrir cgroups nuevos
+PRESSURE_ROOT = '/proc/pressure'  # Ficheros PSI (Pressure Stall Information) de cpu, memory e io
+PRESSURE_SAMPLE_INTERVAL = 2    # Segundos entre lecturas de PSI (el kernel recalcula las medias cada 2 s)
+ALARM_MAX_ROWS = 1000           # Filas de alarmTable como máximo (las creaciones de más fallan)
+TRAP_TARGET_MAX_ROWS = 32       # Destinos de notificaciones como máximo en trapTargetTable
+
+# Supresión de alertas (valores por defecto de los objetos alert*; 0 = desactivado)
+CPU_THRESHOLD_HYSTERESIS = 0    # Puntos por debajo de cpuThreshold que debe bajar la CPU para rearmar la alerta
+ALERT_HOLD_TIME = 0             # Segundos que debe mantenerse una condición antes de notificarla
+ALERT_RATE_LIMIT = 0            # Notificaciones de un mismo evento por ventana (0 = sin límite)
+ALERT_RATE_WINDOW = 60          # Segundos de la ventana del límite; al cerrarse se resumen las suprimidas
+
+# Cola de notificaciones: el muestreador sólo encola, los workers de cada canal entregan
+NOTIFY_QUEUE_SIZE = 100         # Eventos pendientes por canal (los que no caben se descartan)
+NOTIFY_RETRIES = 3              # Reintentos tras un fallo o timeout de entrega
+NOTIFY_BACKOFF = 1.0            # Segundos antes del primer reintento (se duplica en cada uno)
+NOTIFY_BACKOFF_MAX = 30.0       # Espera máxima entre reintentos
+NOTIFY_DRAIN_TIMEOUT = 3.0      # Segundos que se siguen entregando las notificaciones pendientes al cerrar
+TRAP_TIMEOUT = 5.0              # Timeout de entrega de un trap (s)
+
+# INFORMs (notificaciones confirmadas, --inform): retransmisiones gestionadas por una única rueda de temporización
+INFORM_TIMEOUT = 0.5            # Segundos hasta la primera retransmisión (se duplica en cada una)
+INFORM_RETRIES = 2              # Retransmisiones antes de dar el INFORM por no confirmado (< TRAP_TIMEOUT en total)
+INFORM_BACKOFF_MAX = 4.0        # Espera máxima entre retransmisiones
+INFORM_MAX_PENDING = 100        # INFORMs sin confirmar por destino (los siguientes esperan turno)
+INFORM_WHEEL_TICK = 0.01        # Resolución (s) de la rueda de retransmisiones
+INFORM_WHEEL_SLOTS = 512        # Ranuras de la rueda (una vuelta = 5,12 s)
+EMAIL_TIMEOUT = 30.0            # Timeout de entrega de un email (s)
 
 # ===========================
 # Configuración de Email (Gmail)
@@ -71,6 +201,887 @@ EMAIL_SENDER = "xxxxxxxxxxx@gmail.com"
 EMAIL_PASSWORD = "xxxxxxxxxxxxxxx"  # Contraseña de aplicación (16 dígitos)
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 465
+SMTP_USE_TLS = True             # SMTP sobre TLS implícito (SMTP_SSL, puerto 465)
+SMTP_POOL_SIZE = 2              # Sesiones SMTP persistentes como máximo
+EMAIL_DIGEST_WINDOW = 0         # Segundos para agrupar alertas en un único email (0 = un email por alerta)
+
+# ===========================
+# Registro de objetos MIB
+# ===========================
+
+# Tipos SNMP aceptados en un SET para cada sintaxis
+ACCEPTED_SET_TYPES = {
+    v2c.OctetString: (v2c.OctetString,),
+    v2c.Integer: (v2c.Integer, rfc1902.Integer32),
+    v2c.ObjectIdentifier: (v2c.ObjectIdentifier,),
+}
+
+# Descriptor de un objeto escalar: OID, sintaxis, acceso, restricciones y lectura del valor
+class MibObject:
+    table = None    # Los escalares no pertenecen a ninguna tabla (ver MibCell)
+
+    def __init__(self, name, oid, syntax, access='read-only', size=None,
+                 value_range=None, persistent=False, getter=None, mirrors=(), dynamic=False):
+        self.name = name                # Clave interna en MibDataStore.data
+        self.oid = oid
+        self.syntax = syntax            # Clase SNMP (v2c.OctetString, v2c.Integer, ...)
+        self.access = access            # 'read-only' o 'read-write' (MAX-ACCESS)
+        self.size = size                # (min, max) longitud para cadenas
+        self.value_range = value_range  # (min, max) para enteros
+        self.persistent = persistent    # Se guarda en el JSON
+        self.getter = getter            # Lectura calculada en lugar de MibDataStore.data
+        self.mirrors = mirrors          # Claves que se sincronizan al escribir (manager/sysContact)
+        self.dynamic = dynamic          # Cambia en cada petición: nunca se cachea (sysUpTime)
+
+    @property
+    def writable(self):
+        return self.access in ('read-write', 'read-create')
+
+    # Leer el valor Python actual
+    def read(self):
+        if self.getter is not None:
+            return self.getter()
+        return mib_store.data[self.name]
+
+    # Escribir un valor Python ya validado (e invalidar su valor SNMP cacheado)
+    def write(self, value):
+        for key in (self.name,) + self.mirrors:
+            mib_store.data[key] = value
+        mib_registry.invalidate(self.name, *self.mirrors)
+
+    # Traducción de valores Python a tipos SNMP
+    def to_snmp(self, value):
+        if self.syntax is v2c.Counter32:
+            return v2c.Counter32(int(value) % 2**32)   # Los contadores dan la vuelta
+        if self.syntax is v2c.OctetString:
+            return v2c.OctetString(str(value).encode('utf-8'))
+        elif self.syntax is v2c.ObjectIdentifier:
+            return v2c.ObjectIdentifier(value)
+        return self.syntax(int(value))
+
+    # Comprobar que el tipo SNMP recibido corresponde con la sintaxis
+    def accepts(self, snmp_value):
+        return isinstance(snmp_value, ACCEPTED_SET_TYPES.get(self.syntax, (self.syntax,)))
+
+    # Traducción de valores SNMP a tipos Python
+    def from_snmp(self, snmp_value):
+        if not self.accepts(snmp_value):
+            raise ValueError(f'Expected {self.syntax.__name__}')
+        if self.syntax is v2c.OctetString:
+            return bytes(snmp_value).decode('utf-8')
+        if self.syntax is v2c.ObjectIdentifier:
+            return tuple(snmp_value)
+        return int(snmp_value)
+
+    # Validar rango o longitud
+    def in_range(self, value):
+        if self.size is not None:
+            low, high = self.size
+            return low <= len(value) <= high
+        if self.value_range is not None:
+            low, high = self.value_range
+            return low <= value <= high
+        return True
+
+# Campo de longitud BER (forma corta o larga mínima)
+def ber_length(length):
+    if length < 0x80:
+        return bytes([length])
+    body = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([0x80 | len(body)]) + body
+
+# TLV BER completo
+def ber_tlv(tag, content):
+    return bytes([tag]) + ber_length(len(content)) + content
+
+# Varbind codificado en BER (SEQUENCE { OID, valor }), igual que lo codifica pysnmp
+def encode_varbind(oid, snmp_value):
+    return ber_tlv(0x30, encoder.encode(v2c.ObjectIdentifier(oid)) + encoder.encode(snmp_value))
+
+# Tamaño BER de un varbind
+def varbind_size(oid, snmp_value):
+    return len(encode_varbind(oid, snmp_value))
+
+# Registro con búsqueda O(1) por OID y O(log n) del siguiente OID
+class MibRegistry:
+    def __init__(self):
+        self.objects = {}       # OID -> MibObject
+        self.names = {}         # nombre -> MibObject
+        self.ordered_oids = []  # OIDs servidos, en orden lexicográfico
+        self.value_cache = {}   # OID -> (valor SNMP, varbind codificado en BER)
+        self.cache_generation = 0   # Generación de mib_store con la que se llenó la caché
+        self.tables = []        # MibTable ordenadas por OID
+
+    def register(self, obj):
+        self.objects[obj.oid] = obj
+        self.names[obj.name] = obj
+        bisect.insort(self.ordered_oids, obj.oid)
+        return obj
+
+    # Objeto exacto para un OID (None si no existe)
+    def get(self, oid):
+        obj = self.objects.get(oid)
+        if obj is None:
+            for table in self.tables:
+                if oid[:len(table.oid)] == table.oid:
+                    return table.get(oid)
+        return obj
+
+    # Destino de un SET: como get(), pero incluye las celdas de filas que aún no existen
+    # en tablas con filas creables (read-create)
+    def settable(self, oid):
+        obj = self.objects.get(oid)
+        if obj is None:
+            for table in self.tables:
+                if oid[:len(table.oid)] == table.oid:
+                    return table.settable(oid)
+        return obj
+
+    # Siguiente objeto servido (orden lexicográfico) mediante búsqueda binaria
+    def next(self, oid):
+        pos = bisect.bisect_right(self.ordered_oids, oid)
+        found = self.objects[self.ordered_oids[pos]] if pos < len(self.ordered_oids) else None
+        for table in self.tables:
+            # Tablas ordenadas: si esta empieza después del escalar encontrado, las siguientes también
+            if found is not None and table.oid > found.oid:
+                break
+            cell = table.next(oid)
+            if cell is not None and (found is None or cell.oid < found.oid):
+                found = cell
+        return found
+
+    # Valor SNMP y varbind pre-codificado; sólo los objetos dinámicos se reconstruyen siempre
+    def encoded(self, obj):
+        # Otro proceso ha modificado los datos compartidos: descartar la caché local
+        generation = mib_store.generation()
+        if generation != self.cache_generation:
+            self.value_cache.clear()
+            self.cache_generation = generation
+        entry = self.value_cache.get(obj.oid)
+        if entry is None:
+            snmp_value = obj.to_snmp(obj.read())
+            entry = (snmp_value, encode_varbind(obj.oid, snmp_value))
+            if not obj.dynamic:
+                self.value_cache[obj.oid] = entry
+        return entry
+
+    # Valor SNMP de un objeto (sin codificarlo si es dinámico)
+    def snmp_value(self, obj):
+        if obj.dynamic:
+            return obj.to_snmp(obj.read())
+        return self.encoded(obj)[0]
+
+    # Descartar los valores cacheados de los objetos indicados (tras un SET o una muestra)
+    def invalidate(self, *names):
+        for name in names:
+            obj = self.names.get(name)
+            if obj is not None:
+                self.value_cache.pop(obj.oid, None)
+
+    def persistent_keys(self):
+        return [obj.name for obj in self.objects.values() if obj.persistent]
+
+    def register_table(self, table):
+        self.tables.append(table)
+        self.tables.sort(key=lambda t: t.oid)
+        return table
+
+    # Tablas cuyas filas se guardan en el JSON (filas creadas por SET)
+    def persistent_tables(self):
+        return [table for table in self.tables if table.persistent]
+
+# Celda de una tabla: en un SET, las columnas de una misma fila se aplican juntas (MibTable.apply)
+class MibCell(MibObject):
+    def __init__(self, table, column, index, name, syntax, value, access='read-only', value_range=None,
+                 size=None):
+        super().__init__(name, table.oid + (column,) + index, syntax, access, size=size,
+                         value_range=value_range, getter=lambda: value, dynamic=True)
+        self.table = table
+        self.column = column
+        self.index = index
+
+# Tabla conceptual: las celdas (OID de la entrada + columna + índice) se generan al consultarlas
+class MibTable:
+    persistent = False  # Tablas de sólo lectura: nada que guardar
+
+    def __init__(self, name, oid, columns, indexes, cell):
+        self.name = name
+        self.oid = oid              # OID de xxxEntry
+        self.columns = columns      # {número de columna: (nombre, sintaxis)} de las columnas legibles
+        self.indexes = indexes      # Función -> índices de fila (tuplas) en orden lexicográfico
+        self.cell = cell            # Función (columna, índice) -> valor Python, o None si la fila no existe
+
+    # Las celdas cambian con los datos: nunca se cachean
+    def cell_object(self, column, index, value):
+        name, syntax = self.columns[column]
+        return MibCell(self, column, index, name, syntax, value)
+
+    def get(self, oid):
+        prefix = len(self.oid)
+        if oid[:prefix] != self.oid or len(oid) < prefix + 2 or oid[prefix] not in self.columns:
+            return None
+        index = oid[prefix + 1:]
+        value = self.cell(oid[prefix], index)
+        if value is None:
+            return None
+        return self.cell_object(oid[prefix], index, value)
+
+    # Tabla de sólo lectura: sólo las celdas existentes (y el SET las rechaza por notWritable)
+    def settable(self, oid):
+        return self.get(oid)
+
+    # Siguiente celda: columna a columna y, dentro de cada columna, por índice (búsqueda binaria)
+    def next(self, oid):
+        indexes = None
+        for column in sorted(self.columns):
+            column_oid = self.oid + (column,)
+            if oid[:len(column_oid)] == column_oid:
+                after = oid[len(column_oid):]
+            elif oid < column_oid:
+                after = None
+            else:
+                continue
+            if indexes is None:
+                indexes = self.indexes()
+            pos = 0 if after is None else bisect.bisect_right(indexes, after)
+            for pos in range(pos, len(indexes)):
+                value = self.cell(column, indexes[pos])
+                if value is not None:
+                    return self.cell_object(column, indexes[pos], value)
+        return None
+
+# Índices (1,), (2,), ... (count,) de una tabla indexada por posición (compartidos: no modificar)
+@functools.lru_cache(maxsize=32)
+def sequential_indexes(count):
+    return [(i,) for i in range(1, count + 1)]
+
+# Valores de RowStatus (RFC 2579)
+ROW_ACTIVE, ROW_NOT_IN_SERVICE, ROW_NOT_READY, ROW_CREATE_AND_GO, ROW_CREATE_AND_WAIT, ROW_DESTROY = range(1, 7)
+
+# Tabla cuyas filas crean, modifican y borran los managers por SET (RowStatus, RFC 2579).
+# Cada publicación de filas es un dict nuevo (copy-on-write): los lectores nunca ven una fila a
+# medias. En modo multiproceso las filas viven en un SharedSnapshot que cualquier worker publica
+# con el lock del estado compartido; las columnas que escribe el agente (runtime) las publica
+# sólo el proceso que las calcula (el supervisor). Cada subclase define runtime_cell() (valor de
+# una columna runtime) y ready() (fila completa y coherente: la puede activar un manager).
+class RowTable(MibTable):
+    persistent = True
+    spec = {}                   # columna -> (nombre, clave de la fila, sintaxis, rango o longitud de un SET)
+    runtime_columns = ()        # Columnas de sólo lectura que escribe el agente, no los managers
+    status_column = None        # Columna RowStatus
+    defaults = {}               # Fila recién creada
+    oid_keys = ()               # Claves de fila con OIDs (tuplas en memoria, listas en el JSON)
+    max_rows = 0
+
+    def __init__(self, name, oid):
+        super().__init__(name, oid,
+                         {column: (column_name, syntax)
+                          for column, (column_name, _, syntax, _) in self.spec.items()},
+                         indexes=self.row_indexes, cell=self.row_cell)
+        self.rows = MappingProxyType({})    # índice -> fila (dict que no se modifica una vez publicado)
+        self.values = MappingProxyType({})  # índice -> valores de las columnas runtime
+        self.lock = threading.Lock()        # Serializa los SETs (multiprocessing.Lock en modo multiproceso)
+        self.shared_rows = None             # SharedSnapshot de las filas (modo multiproceso)
+        self.shared_values = None           # SharedSnapshot de los valores runtime (modo multiproceso)
+        self.owner = None                   # PID del proceso que calcula los valores runtime (el supervisor)
+        self.index_cache = (None, [])       # (filas, índices ordenados) de la última consulta
+
+    # Pasar las filas a memoria compartida (antes de crear los workers)
+    def share(self, lock):
+        self.lock = lock
+        self.owner = os.getpid()
+        self.shared_rows = SharedSnapshot()
+        self.shared_rows.publish(self.rows)
+        self.shared_values = SharedSnapshot()
+        self.shared_values.publish(self.values)
+
+    # Filas actuales: en modo multiproceso cualquier worker puede haberlas cambiado
+    def current(self):
+        if self.shared_rows is not None:
+            return self.shared_rows.load()
+        return self.rows
+
+    def current_values(self):
+        if self.shared_values is not None and os.getpid() != self.owner:
+            return self.shared_values.load()
+        return self.values
+
+    def commit(self, rows):
+        self.rows = MappingProxyType(rows)
+        if self.shared_rows is not None:
+            self.shared_rows.publish(rows)
+
+    def publish_values(self, values):
+        if values != self.values:
+            self.values = MappingProxyType(values)
+            if self.shared_values is not None:
+                self.shared_values.publish(values)
+
+    def row_indexes(self):
+        rows = self.current()
+        if self.index_cache[0] is not rows:
+            self.index_cache = (rows, sorted(rows))
+        return self.index_cache[1]
+
+    def row_cell(self, column, index):
+        row = self.current().get(index)
+        if row is None:
+            return None
+        if column in self.runtime_columns:
+            return self.runtime_cell(column, index, row)
+        return row[self.spec[column][1]]
+
+    # Cualquier celda de las columnas escribibles, exista o no la fila (la crea la columna RowStatus)
+    def settable(self, oid):
+        prefix = len(self.oid)
+        if len(oid) != prefix + 2 or oid[prefix] not in self.spec or not 1 <= oid[prefix + 1] <= 65535:
+            return None
+        column, index = oid[prefix], oid[prefix + 1:]
+        name, _, syntax, limits = self.spec[column]
+        access = 'read-only' if column in self.runtime_columns else 'read-create'
+        if syntax is v2c.OctetString:
+            return MibCell(self, column, index, name, syntax, None, access, size=limits)
+        return MibCell(self, column, index, name, syntax, None, access, limits)
+
+    # Filas resultantes de aplicar a 'rows' las columnas de una fila recibidas en un SET
+    # ({columna: valor}), sin publicarlas. Devuelve (0, filas) o (error-status SNMP, None) si la
+    # fila no admite el cambio (RFC 2579)
+    def prepare(self, rows, index, values):
+        values = dict(values)
+        status = values.pop(self.status_column, None)
+        row = rows.get(index)
+        if status == ROW_DESTROY:
+            if row is not None:
+                rows = dict(rows)
+                del rows[index]
+            return 0, rows
+        if status == ROW_NOT_READY:
+            return 10, None     # wrongValue: notReady no se puede escribir
+        if row is None:
+            if status not in (ROW_CREATE_AND_GO, ROW_CREATE_AND_WAIT):
+                return 11, None     # noCreation
+            if len(rows) >= self.max_rows:
+                return 13, None     # resourceUnavailable
+            row = dict(self.defaults)
+        elif status in (ROW_CREATE_AND_GO, ROW_CREATE_AND_WAIT):
+            return 12, None     # inconsistentValue: la fila ya existe
+        else:
+            row = dict(row)
+
+        for column, value in values.items():
+            row[self.spec[column][1]] = value
+
+        ready = self.ready(row)
+        if status in (ROW_ACTIVE, ROW_CREATE_AND_GO):
+            if not ready:
+                return 12, None
+            row['status'] = ROW_ACTIVE
+        elif status == ROW_NOT_IN_SERVICE:
+            if not ready:
+                return 12, None
+            row['status'] = ROW_NOT_IN_SERVICE
+        elif row['status'] != ROW_ACTIVE:
+            row['status'] = ROW_NOT_IN_SERVICE if ready else ROW_NOT_READY
+        elif not ready:
+            return 12, None     # El cambio dejaría inválida una fila activa
+
+        rows = dict(rows)
+        rows[index] = row
+        return 0, rows
+
+    # Todas las filas de un SET ({índice: {columna: valor}}, en orden del PDU) o ninguna: con
+    # commit=False sólo se comprueban. Devuelve (0, filas anteriores) o (error-status, índice que falla)
+    def apply(self, changes, commit=True):
+        with self.lock:
+            previous = rows = self.current()
+            for index, values in changes.items():
+                error, rows = self.prepare(rows, index, values)
+                if error:
+                    return error, index
+            if commit and rows is not previous:
+                self.commit(dict(rows))
+            return 0, previous
+
+    # Deshacer un apply() ya publicado (otra tabla del mismo SET ha fallado): sólo se restauran
+    # las filas de ese SET, las que otro worker haya publicado entretanto se conservan
+    def rollback(self, previous, indexes):
+        with self.lock:
+            rows = dict(self.current())
+            for index in indexes:
+                if index in previous:
+                    rows[index] = previous[index]
+                else:
+                    rows.pop(index, None)
+            self.commit(rows)
+
+    # Filas activas (índice, fila) en orden de índice
+    def active(self):
+        rows = self.current()
+        return [(index, rows[index]) for index in self.row_indexes() if rows[index]['status'] == ROW_ACTIVE]
+
+    # Persistencia: {"índice": fila} en el JSON; en el journal, una clave "<tabla>.<índice>" por fila
+    def dump(self):
+        return {str(index[0]): self.dump_row(index) for index in self.row_indexes()}
+
+    def dump_row(self, index):
+        row = self.current().get(index)
+        if row is None:
+            return None
+        return dict(row, **{key: list(row[key]) for key in self.oid_keys})
+
+    def load(self, data):
+        rows = {}
+        for key, value in data.items():
+            rows[(int(key),)] = self.parse_row(value)
+        self.commit(rows)
+
+    def load_row(self, key, value):
+        rows = dict(self.current())
+        if value is None:
+            rows.pop((int(key),), None)
+        else:
+            rows[(int(key),)] = self.parse_row(value)
+        self.commit(rows)
+
+    def parse_row(self, value):
+        row = dict(self.defaults)
+        row.update((key, value[key]) for key in self.defaults if key in value)
+        for key in self.oid_keys:
+            row[key] = tuple(row[key])
+        return row
+
+# Valores de alarmSampleType y alarmStartupAlarm
+ALARM_ABSOLUTE, ALARM_DELTA = 1, 2
+ALARM_STARTUP_RISING, ALARM_STARTUP_FALLING, ALARM_STARTUP_BOTH = 1, 2, 3
+
+# Columnas de alarmTable: número -> (nombre, clave de la fila, sintaxis, rango de un SET)
+ALARM_COLUMNS = {
+    2: ('alarmInterval', 'interval', v2c.Integer, (1, 86400)),
+    3: ('alarmVariable', 'variable', v2c.ObjectIdentifier, None),
+    4: ('alarmSampleType', 'sampleType', v2c.Integer, (1, 2)),
+    5: ('alarmValue', 'value', v2c.Integer, None),
+    6: ('alarmStartupAlarm', 'startup', v2c.Integer, (1, 3)),
+    7: ('alarmRisingThreshold', 'rising', v2c.Integer, (-2**31, 2**31 - 1)),
+    8: ('alarmFallingThreshold', 'falling', v2c.Integer, (-2**31, 2**31 - 1)),
+    9: ('alarmRowStatus', 'status', v2c.Integer, (1, 6)),
+}
+
+# Fila recién creada: falta alarmVariable, así que queda notReady hasta que se asigne
+ALARM_DEFAULTS = {
+    'interval': CPU_SAMPLE_INTERVAL,
+    'variable': (0, 0),
+    'sampleType': ALARM_ABSOLUTE,
+    'startup': ALARM_STARTUP_BOTH,
+    'rising': 0,
+    'falling': 0,
+    'status': ROW_NOT_READY,
+}
+
+# Sintaxis numéricas que puede muestrear una alarma
+ALARM_SAMPLE_SYNTAXES = (v2c.Integer, v2c.Gauge32, v2c.Counter32, v2c.TimeTicks)
+
+# Tabla de alarmas estilo RMON (RFC 2819); alarmValue lo publica sólo el evaluador
+class AlarmTable(RowTable):
+    spec = ALARM_COLUMNS
+    runtime_columns = (5,)
+    status_column = 9
+    defaults = ALARM_DEFAULTS
+    oid_keys = ('variable',)
+    max_rows = ALARM_MAX_ROWS
+
+    def runtime_cell(self, column, index, row):
+        return self.current_values().get(index, 0)
+
+    # La variable existe, es numérica y los umbrales no se cruzan
+    def ready(self, row):
+        obj = mib_registry.get(row['variable'])
+        return (obj is not None and obj.syntax in ALARM_SAMPLE_SYNTAXES
+                and row['falling'] <= row['rising'])
+
+# Columnas de trapTargetTable (destinos de las notificaciones, estilo SNMP-TARGET-MIB)
+TRAP_TARGET_COLUMNS = {
+    2: ('trapTargetAddress', 'address', v2c.OctetString, (0, 255)),
+    3: ('trapTargetPort', 'port', v2c.Integer, (1, 65535)),
+    4: ('trapTargetDelivered', 'delivered', v2c.Counter32, None),
+    5: ('trapTargetFailed', 'failed', v2c.Counter32, None),
+    6: ('trapTargetRowStatus', 'status', v2c.Integer, (1, 6)),
+}
+
+# Fila recién creada: falta la dirección, así que queda notReady hasta que se asigne
+TRAP_TARGET_DEFAULTS = {
+    'address': '',
+    'port': 162,
+    'status': ROW_NOT_READY,
+}
+
+# Destinos de los traps/INFORMs. Los contadores de entrega los publica el supervisor, asociados
+# a la dirección y el puerto con los que se contaron: si la fila cambia de destino vuelven a 0
+class TrapTargetTable(RowTable):
+    spec = TRAP_TARGET_COLUMNS
+    runtime_columns = (4, 5)
+    status_column = 6
+    defaults = TRAP_TARGET_DEFAULTS
+    max_rows = TRAP_TARGET_MAX_ROWS
+
+    def __init__(self, name, oid):
+        super().__init__(name, oid)
+        # Sin configuración guardada: un único destino, el receptor por defecto
+        self.commit({(1,): {'address': TRAP_HOST, 'port': TRAP_PORT, 'status': ROW_ACTIVE}})
+
+    def counters(self, index, row):
+        address, port, delivered, failed = self.current_values().get(index, (None, None, 0, 0))
+        if (address, port) != (row['address'], row['port']):
+            return 0, 0
+        return delivered, failed
+
+    def runtime_cell(self, column, index, row):
+        return self.counters(index, row)[column - 4]
+
+    # Con dirección: el puerto siempre tiene valor
+    def ready(self, row):
+        return bool(row['address'])
+
+    # Contar el resultado de una entrega a un destino
+    def count(self, index, row, delivered):
+        sent, failed = self.counters(index, row)
+        values = dict(self.values)
+        values[index] = (row['address'], row['port'], sent + delivered, failed + (not delivered))
+        self.publish_values(values)
+
+mib_registry = MibRegistry()
+
+# Grupo System de MIB-II
+mib_registry.register(MibObject('sysDescr', SYS_DESCR, v2c.OctetString, size=(0, 255)))
+mib_registry.register(MibObject('sysObjectID', SYS_OBJECT_ID, v2c.ObjectIdentifier))
+mib_registry.register(MibObject('sysUpTime', SYS_UP_TIME, v2c.TimeTicks, dynamic=True,
+                                getter=lambda: mib_store.get_sysuptime()))
+mib_registry.register(MibObject('sysContact', SYS_CONTACT, v2c.OctetString, 'read-write',
+                                size=(0, 255), persistent=True, mirrors=('manager',)))
+mib_registry.register(MibObject('sysName', SYS_NAME, v2c.OctetString, 'read-write',
+                                size=(0, 255), persistent=True))
+mib_registry.register(MibObject('sysLocation', SYS_LOCATION, v2c.OctetString, 'read-write',
+                                size=(0, 255), persistent=True))
+mib_registry.register(MibObject('sysServices', SYS_SERVICES, v2c.Integer, 'read-write',
+                                value_range=(0, 127)))
+
+# OIDs personalizados de empresa
+mib_registry.register(MibObject('manager', OID_MANAGER, v2c.OctetString, 'read-write',
+                                size=(0, 255), persistent=True, mirrors=('sysContact',)))
+mib_registry.register(MibObject('managerEmail', OID_MANAGER_EMAIL, v2c.OctetString, 'read-write',
+                                size=(0, 255), persistent=True))
+mib_registry.register(MibObject('cpuUsage', OID_CPU_USAGE, v2c.Integer, value_range=(0, 100)))
+mib_registry.register(MibObject('cpuThreshold', OID_CPU_THRESHOLD, v2c.Integer, 'read-write',
+                                value_range=(0, 100), persistent=True))
+
+# Estadísticas de la cola de notificaciones
+mib_registry.register(MibObject('notifyQueueDepth', OID_NOTIFY_QUEUE_DEPTH, v2c.Gauge32))
+mib_registry.register(MibObject('notifyDropped', OID_NOTIFY_DROPPED, v2c.Counter32))
+mib_registry.register(MibObject('notifyDelivered', OID_NOTIFY_DELIVERED, v2c.Counter32))
+mib_registry.register(MibObject('notifyFailed', OID_NOTIFY_FAILED, v2c.Counter32))
+
+# Historial de CPU: medias móviles, mínimo y máximo, y tabla con las muestras
+mib_registry.register(MibObject('cpuLoadAvg1', OID_CPU_LOAD_AVG_1, v2c.Integer, value_range=(0, 100)))
+mib_registry.register(MibObject('cpuLoadAvg5', OID_CPU_LOAD_AVG_5, v2c.Integer, value_range=(0, 100)))
+mib_registry.register(MibObject('cpuLoadAvg15', OID_CPU_LOAD_AVG_15, v2c.Integer, value_range=(0, 100)))
+mib_registry.register(MibObject('cpuUsageMin', OID_CPU_USAGE_MIN, v2c.Integer, value_range=(0, 100)))
+mib_registry.register(MibObject('cpuUsageMax', OID_CPU_USAGE_MAX, v2c.Integer, value_range=(0, 100)))
+
+# Planificación del muestreo
+mib_registry.register(MibObject('cpuSampleInterval', OID_CPU_SAMPLE_INTERVAL, v2c.Integer, 'read-write',
+                                value_range=(1, 3600), persistent=True))
+mib_registry.register(MibObject('cpuSampleAdaptive', OID_CPU_SAMPLE_ADAPTIVE, v2c.Integer, 'read-write',
+                                value_range=(1, 2), persistent=True))   # TruthValue: true(1), false(2)
+mib_registry.register(MibObject('cpuSampleLag', OID_CPU_SAMPLE_LAG, v2c.Gauge32))
+
+# Supresión de alertas: histéresis, tiempo de mantenimiento, límite por evento y contadores
+mib_registry.register(MibObject('cpuThresholdHysteresis', OID_CPU_THRESHOLD_HYSTERESIS, v2c.Integer,
+                                'read-write', value_range=(0, 100), persistent=True))
+mib_registry.register(MibObject('alertHoldTime', OID_ALERT_HOLD_TIME, v2c.Integer, 'read-write',
+                                value_range=(0, 3600), persistent=True))
+mib_registry.register(MibObject('alertRateLimit', OID_ALERT_RATE_LIMIT, v2c.Integer, 'read-write',
+                                value_range=(0, 1000), persistent=True))
+mib_registry.register(MibObject('alertRateWindow', OID_ALERT_RATE_WINDOW, v2c.Integer, 'read-write',
+                                value_range=(1, 86400), persistent=True))
+mib_registry.register(MibObject('alertHeldBack', OID_ALERT_HELD_BACK, v2c.Counter32))
+mib_registry.register(MibObject('alertSuppressed', OID_ALERT_SUPPRESSED, v2c.Counter32))
+mib_registry.register(MibObject('alertSummaries', OID_ALERT_SUMMARIES, v2c.Counter32))
+
+mib_registry.register_table(MibTable(
+    'cpuHistoryTable', OID_CPU_HISTORY_ENTRY,
+    {2: ('cpuHistoryUsage', v2c.Integer), 3: ('cpuHistoryTime', v2c.TimeTicks)},
+    indexes=lambda: cpu_history.indexes(),
+    cell=lambda column, index: cpu_history.cell(column, index),
+))
+
+# Uso de CPU por núcleo (columnas del snapshot del recolector 'cpu')
+mib_registry.register_table(MibTable(
+    'cpuCoreTable', OID_CPU_CORE_ENTRY,
+    {2: ('cpuCoreUsage', v2c.Integer), 3: ('cpuCoreUser', v2c.Integer), 4: ('cpuCoreSystem', v2c.Integer),
+     5: ('cpuCoreIowait', v2c.Integer), 6: ('cpuCoreAlarm', v2c.Integer)},
+    indexes=lambda: core_indexes(),
+    cell=lambda column, index: core_cell(column, index),
+))
+
+# Grupo Interfaces de MIB-II e IF-MIB: columnas del snapshot del recolector 'interfaces'
+# (número de columna -> (nombre, sintaxis, clave del snapshot; None = el propio ifIndex))
+IF_COLUMNS = {
+    1: ('ifIndex', v2c.Integer, None),
+    2: ('ifDescr', v2c.OctetString, 'name'),
+    3: ('ifType', v2c.Integer, 'type'),
+    4: ('ifMtu', v2c.Integer, 'mtu'),
+    5: ('ifSpeed', v2c.Gauge32, 'speed'),
+    7: ('ifAdminStatus', v2c.Integer, 'adminStatus'),
+    8: ('ifOperStatus', v2c.Integer, 'operStatus'),
+    10: ('ifInOctets', v2c.Counter32, 'inOctets'),
+    11: ('ifInUcastPkts', v2c.Counter32, 'inPkts'),
+    13: ('ifInDiscards', v2c.Counter32, 'inDiscards'),
+    14: ('ifInErrors', v2c.Counter32, 'inErrors'),
+    16: ('ifOutOctets', v2c.Counter32, 'outOctets'),
+    17: ('ifOutUcastPkts', v2c.Counter32, 'outPkts'),
+    19: ('ifOutDiscards', v2c.Counter32, 'outDiscards'),
+    20: ('ifOutErrors', v2c.Counter32, 'outErrors'),
+}
+IF_X_COLUMNS = {
+    1: ('ifName', v2c.OctetString, 'name'),
+    6: ('ifHCInOctets', v2c.Counter64, 'inOctets'),
+    7: ('ifHCInUcastPkts', v2c.Counter64, 'inPkts'),
+    10: ('ifHCOutOctets', v2c.Counter64, 'outOctets'),
+    11: ('ifHCOutUcastPkts', v2c.Counter64, 'outPkts'),
+    15: ('ifHighSpeed', v2c.Gauge32, 'highSpeed'),
+}
+
+mib_registry.register(MibObject('ifNumber', IF_NUMBER, v2c.Integer, dynamic=True,
+                                getter=lambda: len(snapshot_indexes('interfaces'))))
+mib_registry.register_table(MibTable(
+    'ifTable', IF_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in IF_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('interfaces'),
+    cell=lambda column, index: snapshot_cell('interfaces', IF_COLUMNS, column, index),
+))
+mib_registry.register_table(MibTable(
+    'ifXTable', IF_X_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in IF_X_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('interfaces'),
+    cell=lambda column, index: snapshot_cell('interfaces', IF_X_COLUMNS, column, index),
+))
+
+# Sistemas de ficheros (hrStorageTable y fsTable) y E/S de disco: snapshots de los recolectores
+# 'filesystems' y 'diskio', con índices estables por punto de montaje y por dispositivo
+HR_STORAGE_COLUMNS = {
+    1: ('hrStorageIndex', v2c.Integer, None),
+    2: ('hrStorageType', v2c.ObjectIdentifier, 'storageType'),
+    3: ('hrStorageDescr', v2c.OctetString, 'mountPoint'),
+    4: ('hrStorageAllocationUnits', v2c.Integer, 'units'),
+    5: ('hrStorageSize', v2c.Integer, 'size'),
+    6: ('hrStorageUsed', v2c.Integer, 'used'),
+}
+FS_COLUMNS = {
+    2: ('fsMountPoint', v2c.OctetString, 'mountPoint'),
+    3: ('fsDevice', v2c.OctetString, 'device'),
+    4: ('fsType', v2c.OctetString, 'fsType'),
+    5: ('fsUsedPercent', v2c.Integer, 'usedPercent'),
+    6: ('fsInodesUsedPercent', v2c.Integer, 'inodesUsedPercent'),
+}
+DISK_IO_COLUMNS = {
+    2: ('diskIODevice', v2c.OctetString, 'device'),
+    3: ('diskIOReadBytes', v2c.Counter64, 'readBytes'),
+    4: ('diskIOWriteBytes', v2c.Counter64, 'writeBytes'),
+    5: ('diskIOReads', v2c.Counter32, 'reads'),
+    6: ('diskIOWrites', v2c.Counter32, 'writes'),
+    7: ('diskIOReadBytesRate', v2c.Gauge32, 'readBytesRate'),
+    8: ('diskIOWriteBytesRate', v2c.Gauge32, 'writeBytesRate'),
+    9: ('diskIOReadOpsRate', v2c.Gauge32, 'readsRate'),
+    10: ('diskIOWriteOpsRate', v2c.Gauge32, 'writesRate'),
+    11: ('diskIOBusyPercent', v2c.Integer, 'busyPercent'),
+}
+
+mib_registry.register_table(MibTable(
+    'hrStorageTable', HR_STORAGE_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in HR_STORAGE_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('filesystems'),
+    cell=lambda column, index: snapshot_cell('filesystems', HR_STORAGE_COLUMNS, column, index),
+))
+mib_registry.register_table(MibTable(
+    'fsTable', OID_FS_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in FS_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('filesystems'),
+    cell=lambda column, index: snapshot_cell('filesystems', FS_COLUMNS, column, index),
+))
+mib_registry.register_table(MibTable(
+    'diskIOTable', OID_DISK_IO_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in DISK_IO_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('diskio'),
+    cell=lambda column, index: snapshot_cell('diskio', DISK_IO_COLUMNS, column, index),
+))
+
+# CPU por cgroup v2 (contenedores): snapshot del recolector 'cgroups'
+CGROUP_CPU_COLUMNS = {
+    2: ('cgroupPath', v2c.OctetString, 'path'),
+    3: ('cgroupCpuUsage', v2c.Integer, 'usage'),
+    4: ('cgroupCpuQuotaUsage', v2c.Integer, 'quotaUsage'),
+    5: ('cgroupCpuQuota', v2c.Integer, 'quota'),
+    6: ('cgroupThrottledPercent', v2c.Integer, 'throttledPercent'),
+    7: ('cgroupNrThrottled', v2c.Counter32, 'nrThrottled'),
+    8: ('cgroupThrottledTime', v2c.Counter64, 'throttledUsec'),
+    9: ('cgroupCpuTime', v2c.Counter64, 'usageUsec'),
+}
+
+mib_registry.register_table(MibTable(
+    'cgroupCpuTable', OID_CGROUP_CPU_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in CGROUP_CPU_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('cgroups'),
+    cell=lambda column, index: snapshot_cell('cgroups', CGROUP_CPU_COLUMNS, column, index),
+))
+
+# Presión de CPU, memoria y E/S (PSI): snapshot del recolector 'pressure'. Un escalar por recurso,
+# tipo y campo, en ese orden: medias en centésimas de % (Gauge32, utilizables en alarmTable) y
+# tiempo total de atasco en µs (Counter64)
+PSI_RESOURCES = ('cpu', 'memory', 'io')
+PSI_KINDS = ('some', 'full')
+PSI_FIELDS = ('avg10', 'avg60', 'avg300', 'total')
+
+def pressure_key(name, kind, field):
+    return f'{name}{kind.capitalize()}{field.capitalize()}'     # 'cpuSomeAvg10'
+
+PRESSURE_OIDS = {}  # clave del snapshot -> OID del escalar
+for number, key in enumerate((pressure_key(name, kind, field) for name in PSI_RESOURCES
+                              for kind in PSI_KINDS for field in PSI_FIELDS), 1):
+    PRESSURE_OIDS[key] = OID_PRESSURE + (number, 0)
+    mib_registry.register(MibObject(
+        'pressure' + key[0].upper() + key[1:], PRESSURE_OIDS[key],
+        v2c.Counter64 if key.endswith('Total') else v2c.Gauge32, dynamic=True,
+        getter=lambda key=key: collectors.snapshot('pressure').get(key, 0)))
+mib_registry.register(MibObject('pressureStallEvents', OID_PRESSURE_STALL_EVENTS, v2c.Counter32))
+
+# Procesos (HOST-RESOURCES-MIB) y mayores consumidores de CPU: snapshot del recolector 'processes'
+HR_SW_RUN_COLUMNS = {
+    1: ('hrSWRunIndex', v2c.Integer, None),
+    2: ('hrSWRunName', v2c.OctetString, 'name'),
+    4: ('hrSWRunPath', v2c.OctetString, 'path'),
+    5: ('hrSWRunParameters', v2c.OctetString, 'parameters'),
+    6: ('hrSWRunType', v2c.Integer, 'type'),
+    7: ('hrSWRunStatus', v2c.Integer, 'status'),
+}
+HR_SW_RUN_PERF_COLUMNS = {
+    1: ('hrSWRunPerfCPU', v2c.Integer, 'cpu'),
+    2: ('hrSWRunPerfMem', v2c.Integer, 'mem'),
+}
+
+mib_registry.register_table(MibTable(
+    'hrSWRunTable', HR_SW_RUN_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in HR_SW_RUN_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('processes'),
+    cell=lambda column, index: snapshot_cell('processes', HR_SW_RUN_COLUMNS, column, index),
+))
+mib_registry.register_table(MibTable(
+    'hrSWRunPerfTable', HR_SW_RUN_PERF_ENTRY,
+    {column: (name, syntax) for column, (name, syntax, _) in HR_SW_RUN_PERF_COLUMNS.items()},
+    indexes=lambda: snapshot_indexes('processes'),
+    cell=lambda column, index: snapshot_cell('processes', HR_SW_RUN_PERF_COLUMNS, column, index),
+))
+mib_registry.register_table(MibTable(
+    'topCpuTable', OID_TOP_CPU_ENTRY,
+    {2: ('topCpuPid', v2c.Integer), 3: ('topCpuName', v2c.OctetString), 4: ('topCpuUsage', v2c.Integer)},
+    indexes=lambda: sequential_indexes(len(top_processes())),
+    cell=lambda column, index: top_cpu_cell(column, index),
+))
+
+# Alarmas configurables por los managers (reemplaza al umbral único de CPU como mecanismo general)
+alarm_table = mib_registry.register_table(AlarmTable('alarmTable', OID_ALARM_ENTRY))
+
+# Destinos de las notificaciones (reemplaza a TRAP_HOST/TRAP_PORT, que quedan como fila por defecto)
+trap_target_table = mib_registry.register_table(TrapTargetTable('trapTargetTable', OID_TRAP_TARGET_ENTRY))
+
+# ===========================
+# Estado MIB en memoria compartida (modo multiproceso)
+# ===========================
+
+# Valores enteros y cadenas de MibDataStore.data en un segmento mmap compartido entre procesos.
+# Escrituras serializadas con un lock entre procesos; lecturas sin lock mediante seqlock.
+class SharedMibData:
+    _header = struct.Struct('=QQ')  # (generación del seqlock, contador de persistencia)
+    _int = struct.Struct('=q')
+    _len = struct.Struct('=H')
+
+    def __init__(self, initial, lock):
+        self.lock = lock
+        self.local = {}     # Valores constantes que no se comparten (p. ej. sysObjectID)
+        self.slots = {}     # clave -> (offset, tipo)
+        offset = self._header.size
+        for key, value in initial.items():
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                self.local[key] = value
+            elif isinstance(value, int):
+                self.slots[key] = (offset, int)
+                offset += self._int.size
+            else:
+                self.slots[key] = (offset, str)
+                offset += self._len.size + SHARED_STRING_SIZE
+        # mmap anónimo (MAP_SHARED): lo heredan los procesos hijos tras el fork
+        self.buffer = mmap.mmap(-1, offset)
+        for key, (slot, kind) in self.slots.items():
+            self._store(slot, kind, initial[key])
+
+    def _store(self, slot, kind, value):
+        if kind is int:
+            self._int.pack_into(self.buffer, slot, int(value))
+        else:
+            raw = str(value).encode('utf-8')
+            if len(raw) > SHARED_STRING_SIZE:
+                raise ValueError('Value too long for shared memory')
+            self._len.pack_into(self.buffer, slot, len(raw))
+            start = slot + self._len.size
+            self.buffer[start:start + len(raw)] = raw
+
+    def _load(self, slot, kind):
+        if kind is int:
+            return self._int.unpack_from(self.buffer, slot)[0]
+        length = self._len.unpack_from(self.buffer, slot)[0]
+        start = slot + self._len.size
+        return self.buffer[start:start + length].decode('utf-8', errors='replace')
+
+    def generation(self):
+        return self._header.unpack_from(self.buffer, 0)[0]
+
+    def persist_counter(self):
+        return self._header.unpack_from(self.buffer, 0)[1]
+
+    def __getitem__(self, key):
+        entry = self.slots.get(key)
+        if entry is None:
+            return self.local[key]
+        while True:
+            before = self.generation()
+            if before & 1:
+                continue    # Escritura en curso en otro proceso
+            value = self._load(*entry)
+            if self.generation() == before:
+                return value
+
+    def __setitem__(self, key, value):
+        entry = self.slots.get(key)
+        if entry is None:
+            self.local[key] = value
+            return
+        with self.lock:
+            generation, persist = self._header.unpack_from(self.buffer, 0)
+            self._header.pack_into(self.buffer, 0, generation + 1, persist)
+            try:
+                self._store(entry[0], entry[1], value)
+            finally:
+                self._header.pack_into(self.buffer, 0, generation + 2, persist)
+
+    def __contains__(self, key):
+        return key in self.slots or key in self.local
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    # Marcar que hay cambios que el supervisor debe guardar en el JSON
+    def request_persist(self):
+        with self.lock:
+            generation, persist = self._header.unpack_from(self.buffer, 0)
+            self._header.pack_into(self.buffer, 0, generation, persist + 1)
 
 # ===========================
 # Clase para manejo de los datos del agente (MIB)
@@ -85,6 +1096,36 @@ class MibDataStore:
             'cpuUsage': 0,
             'cpuThreshold': 80,
 
+            # Estadísticas de la cola de notificaciones
+            'notifyQueueDepth': 0,
+            'notifyDropped': 0,
+            'notifyDelivered': 0,
+            'notifyFailed': 0,
+
+            # Resumen del historial de CPU
+            'cpuLoadAvg1': 0,
+            'cpuLoadAvg5': 0,
+            'cpuLoadAvg15': 0,
+            'cpuUsageMin': 0,
+            'cpuUsageMax': 0,
+
+            # Planificación del muestreo de CPU
+            'cpuSampleInterval': CPU_SAMPLE_INTERVAL,
+            'cpuSampleAdaptive': 2,     # false
+            'cpuSampleLag': 0,
+
+            # Supresión de alertas
+            'cpuThresholdHysteresis': CPU_THRESHOLD_HYSTERESIS,
+            'alertHoldTime': ALERT_HOLD_TIME,
+            'alertRateLimit': ALERT_RATE_LIMIT,
+            'alertRateWindow': ALERT_RATE_WINDOW,
+            'alertHeldBack': 0,
+            'alertSuppressed': 0,
+            'alertSummaries': 0,
+
+            # Atascos notificados por los triggers de PSI
+            'pressureStallEvents': 0,
+
             # Atributos estándar SNMP System
             'sysDescr': f'Mini SNMP Agent (Python/pysnmp) on {platform.system()}',
             'sysObjectID': BASE_OID, # Identifica nuestro agente con nuestro OID base
@@ -93,9 +1134,114 @@ class MibDataStore:
             'sysLocation': 'Lab System (Settable)',
             'sysServices': 72 # Servicios: End-to-End/Capa 4 (8) + Aplicación/Capa 7 (64)
         }
-        self.above_threshold = False    # Indica si el uso CPU ya superó el umbral
         self.start_time = time.time()   # Tiempo de inicio para sysUpTime
-        self.load_from_json()   # Cargar estado JSON
+        self.shared = None              # SharedMibData en modo multiproceso
+        self.journal_pending = []       # Registros de SET aún no escritos en el journal
+        self.journal_records = 0        # Registros en el journal desde la última compactación
+        self.journal_fd = None          # Descriptor O_APPEND del journal
+        self.persisted = {}             # Último estado persistente conocido (supervisor multiproceso)
+        self.flush_task = None          # Tarea write-behind pendiente
+        self.writing = None             # Escritura en curso en el executor
+        self.journal_delay = 0          # Retardo añadido a cada fdatasync (--slow-journal)
+        # El estado se carga al arrancar el agente (load_from_json), no al importar el módulo:
+        # cargarlo crea mib_state.* en el directorio actual y compacta un journal existente
+
+    # Pasar los valores a memoria compartida (antes de crear los workers)
+    def share(self, lock):
+        self.shared = SharedMibData(self.data, lock)
+        self.data = self.shared
+
+    # Generación de los datos: cambia cuando otro proceso escribe un valor
+    def generation(self):
+        if self.shared is None:
+            return 0
+        return self.shared.generation()
+
+    # Persistir tras un SET (changes: {clave: valor} de objetos persistentes);
+    # en modo multiproceso lo hace una única vez el supervisor
+    def persist(self, changes):
+        if self.shared is not None:
+            self.shared.request_persist()
+            return
+        # Write-behind: los SETs que lleguen durante PERSIST_DELAY se añaden al journal en una sola escritura
+        self.journal_pending.append(changes)
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.get_running_loop().create_task(self.write_behind())
+
+    async def write_behind(self):
+        while self.journal_pending:
+            await asyncio.sleep(PERSIST_DELAY)
+            await self.save_async()
+
+    # Supervisor multiproceso: los workers no dicen qué cambió, se compara con lo último guardado
+    async def persist_shared(self):
+        snapshot = self.snapshot()
+        changes = {key: value for key, value in snapshot.items() if self.persisted.get(key) != value}
+        if changes:
+            self.persisted.update(changes)
+            self.journal_pending.append(changes)
+            await self.save_async()
+        return changes
+
+    # Añadir los registros pendientes al journal fuera del event loop (y compactar si toca)
+    async def save_async(self):
+        records, self.journal_pending = self.journal_pending, []
+        snapshot = None
+        if self.journal_records + len(records) >= JOURNAL_COMPACT_RECORDS:
+            snapshot = self.snapshot()
+        self.writing = asyncio.get_running_loop().run_in_executor(
+            None, self.write_journal, records, snapshot
+        )
+        # shield: si se cancela la tarea, la escritura termina igualmente y flush() la espera
+        await asyncio.shield(self.writing)
+
+    # Una línea JSON por SET; un único write + fdatasync por lote
+    def write_journal(self, records, snapshot=None):
+        try:
+            if self.journal_fd is None:
+                self.journal_fd = os.open(JOURNAL_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            data = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+            os.write(self.journal_fd, data.encode('utf-8'))
+            os.fdatasync(self.journal_fd)
+            if self.journal_delay > 0:
+                time.sleep(self.journal_delay)  # Disco lento simulado: bloquea sólo el thread del executor
+            self.journal_records += len(records)
+            print(f'Saved state to {JOURNAL_FILE} ({len(records)} records)')
+        except Exception as e:
+            print(f'Error writing journal: {e}')
+        if snapshot is not None:
+            self.compact(snapshot)
+
+    # Compactar: snapshot atómico con todo el estado y journal vacío.
+    # Si se corta entre ambos pasos, reaplicar el journal sobre el snapshot no cambia nada.
+    def compact(self, snapshot):
+        if not self.write_json(snapshot):
+            return
+        try:
+            if self.journal_fd is None:
+                self.journal_fd = os.open(JOURNAL_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.ftruncate(self.journal_fd, 0)
+            os.fsync(self.journal_fd)
+            self.journal_records = 0
+        except Exception as e:
+            print(f'Error truncating journal: {e}')
+
+    # Al cerrar: cancelar la espera pendiente, esperar la escritura en curso y guardar el estado final
+    async def flush(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+        if self.writing is not None:
+            await self.writing
+            self.writing = None
+        self.save_to_json()
+        if self.journal_fd is not None:
+            os.close(self.journal_fd)
+            self.journal_fd = None
 
     # Cargar valores almacenados desde el JSON
     def load_from_json(self):
@@ -104,114 +1250,254 @@ class MibDataStore:
                 with open(JSON_FILE, 'r') as f:
                     loaded = json.load(f)
                     # Cargar valores
-                    self.data['manager'] = loaded.get('manager', self.data['manager'])
-                    self.data['managerEmail'] = loaded.get('managerEmail', self.data['managerEmail'])
-                    self.data['cpuThreshold'] = loaded.get('cpuThreshold', self.data['cpuThreshold'])
-                    self.data['sysContact'] = loaded.get('sysContact', self.data['manager'])
-                    self.data['sysName'] = loaded.get('sysName', self.data['sysName'])
-                    self.data['sysLocation'] = loaded.get('sysLocation', self.data['sysLocation'])
-
-                 # Sincronizar manager y sysContact (por si acaso)
-                self.data['sysContact'] = self.data['manager']
+                    for key in mib_registry.persistent_keys():
+                        self.data[key] = loaded.get(key, self.data[key])
+                    for table in mib_registry.persistent_tables():
+                        if table.name in loaded:
+                            table.load(loaded[table.name])
 
                 print(f'Loaded state from {JSON_FILE}')
             except Exception as e:
                 print(f'Error loading JSON: {e}')
         else:
             print(f'File {JSON_FILE} not found. Creating with default values.')
-            self.save_to_json()
 
-    # Guardar datos persistentes relevantes en el JSON
+        # Reaplicar los SETs del journal posteriores al snapshot
+        replayed = self.replay_journal()
+
+        # Sincronizar manager y sysContact (por si acaso)
+        self.data['sysContact'] = self.data['manager']
+
+        # Arrancar con un snapshot completo y el journal vacío
+        if replayed or not os.path.exists(JSON_FILE):
+            self.save_to_json()
+        self.persisted = self.snapshot()
+
+    def replay_journal(self):
+        if not os.path.exists(JOURNAL_FILE):
+            return 0
+        persistent = set(mib_registry.persistent_keys())
+        tables = {table.name: table for table in mib_registry.persistent_tables()}
+        replayed = 0
+        with open(JOURNAL_FILE, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break   # Última línea incompleta (corte durante la escritura)
+                for key, value in record.items():
+                    name, _, index = key.partition('.')
+                    if key in persistent:
+                        self.data[key] = value
+                    elif key in tables:
+                        tables[key].load(value)     # Tabla completa (supervisor multiproceso)
+                    elif name in tables:
+                        tables[name].load_row(index, value)
+                replayed += 1
+        if replayed:
+            print(f'Replayed {replayed} records from {JOURNAL_FILE}')
+        return replayed
+
+    # Datos persistentes relevantes
+    def snapshot(self):
+        snapshot = {key: self.data[key] for key in mib_registry.persistent_keys()}
+        for table in mib_registry.persistent_tables():
+            snapshot[table.name] = table.dump()
+        return snapshot
+
+    # Guardar datos persistentes relevantes en el JSON (compactando el journal)
     def save_to_json(self):
+        self.journal_pending = []
+        self.compact(self.snapshot())
+
+    # Escritura atómica: fichero temporal + fsync + rename (nunca queda un JSON a medias)
+    def write_json(self, persistent_data):
+        tmp_file = f'{JSON_FILE}.{os.getpid()}.{threading.get_ident()}.tmp'
         try:
-            with open(JSON_FILE, 'w') as f:
-                persistent_data = {
-                    'manager': self.data['manager'],
-                    'managerEmail': self.data['managerEmail'],
-                    'cpuThreshold': self.data['cpuThreshold'],
-                    'sysContact': self.data['sysContact'],
-                    'sysName': self.data['sysName'],
-                    'sysLocation': self.data['sysLocation']
-                }
+            with open(tmp_file, 'w') as f:
                 json.dump(persistent_data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, JSON_FILE)
+            # fsync del directorio para que el rename sobreviva a un corte de luz
+            dir_fd = os.open(os.path.dirname(os.path.abspath(JSON_FILE)), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
             print(f'Saved state to {JSON_FILE}')
+            return True
         except Exception as e:
             print(f'Error saving JSON: {e}')
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+            return False
 
-    # Relacionar un OID a la clave interna del diccionario
-    def oid_to_key(self, oid):
-        # Grupo System de MIB-II
-        if oid == SYS_DESCR:
-            return 'sysDescr'
-        elif oid == SYS_OBJECT_ID:
-            return 'sysObjectID'
-        elif oid == SYS_UP_TIME:
-            return 'sysUpTime'
-        elif oid == SYS_CONTACT:
-            return 'sysContact'
-        elif oid == SYS_NAME:
-            return 'sysName'
-        elif oid == SYS_LOCATION:
-            return 'sysLocation'
-        elif oid == SYS_SERVICES:
-            return 'sysServices'
-        # OIDs personalizados de empresa
-        elif oid == OID_MANAGER:
-            return 'manager'
-        elif oid == OID_MANAGER_EMAIL:
-            return 'managerEmail'
-        elif oid == OID_CPU_USAGE:
-            return 'cpuUsage'
-        elif oid == OID_CPU_THRESHOLD:
-            return 'cpuThreshold'
-        return None
-    
     # Calcular upTime: tiempo (en centésimas de segundo) desde arranque del agente
     def get_sysuptime(self):
         return int((time.time() - self.start_time) * 100)
 
 mib_store = MibDataStore()
 
-# Traducción de valores Python a tipos SNMP
-def python_to_snmp(key, value):
-    if key in ['manager', 'managerEmail', 'sysDescr', 'sysContact', 'sysName', 'sysLocation']:
-        return v2c.OctetString(str(value).encode('utf-8'))
-    elif key in ['cpuUsage', 'cpuThreshold', 'sysServices']:
-        return v2c.Integer(int(value))
-    elif key == 'sysUpTime':
-        return v2c.TimeTicks(int(value))
-    elif key == 'sysObjectID':
-        return v2c.ObjectIdentifier(value)
-    return v2c.Null()
-
-# Traducción de valores SNMP a tipos Python
-def snmp_to_python(key, snmp_value):
-    if key in ['manager', 'managerEmail', 'sysContact', 'sysName', 'sysLocation']:
-        if isinstance(snmp_value, v2c.OctetString):
-            return bytes(snmp_value).decode('utf-8')
-        else:
-            raise ValueError('Expected OctetString')
-    elif key in ['cpuUsage', 'cpuThreshold', 'sysServices']:
-        if isinstance(snmp_value, (v2c.Integer, rfc1902.Integer32)):
-            return int(snmp_value)
-        else:
-            raise ValueError('Expected Integer')
-    raise ValueError('Unknown key')
-
 # ===========================
-# Observer para capturar securityName
+# Historial de CPU (ring buffer)
 # ===========================
 
-current_security_name = None
+# Últimas CPU_HISTORY_SIZE muestras en arrays de tamaño fijo sobre un único buffer
+# (bytearray, o mmap compartido en modo multiproceso). Las medias de cada ventana,
+# el mínimo y el máximo se actualizan en O(1) amortizado por muestra. Las medias
+# cubren siempre su ventana completa aunque tenga más de CPU_HISTORY_SIZE muestras.
+class CpuHistory:
+    def __init__(self, size=CPU_HISTORY_SIZE):
+        self.size = size
+        # Ventanas de las medias móviles, en segundos (el intervalo de muestreo puede variar)
+        self.windows = {'cpuLoadAvg1': 60, 'cpuLoadAvg5': 300, 'cpuLoadAvg15': 900}
+        self.sums = dict.fromkeys(self.windows, 0)
+        self.starts = dict.fromkeys(self.windows, 0)    # Primera muestra dentro de cada ventana
+        # Las medias tienen su propio ring (sólo el muestreador): la ventana más larga al intervalo mínimo
+        self.window_size = int(max(self.windows.values()) / ADAPTIVE_MIN_INTERVAL) + 1
+        self.times = array.array('d', bytes(8 * self.window_size))  # Reloj monotónico de cada muestra
+        self.values = array.array('B', bytes(self.window_size))     # Uso de cada muestra
+        self.lowest = collections.deque()   # (número de muestra, valor) crecientes: mínimo delante
+        self.highest = collections.deque()  # (número de muestra, valor) decrecientes: máximo delante
+        self.index_cache = (None, [])       # (muestras, índices de fila) de la última consulta
+        self._bind(bytearray(8 + 5 * size))
+
+    # Layout: contador de muestras (Q), sysUpTime de cada muestra (I), uso de cada muestra (B)
+    def _bind(self, buffer):
+        self.buffer = buffer
+        view = memoryview(buffer)
+        self.header = view[:8].cast('Q')
+        self.ticks = view[8:8 + 4 * self.size].cast('I')
+        self.usage = view[8 + 4 * self.size:8 + 5 * self.size].cast('B')
+
+    # Pasar el buffer a memoria compartida (antes de crear los workers)
+    def share(self):
+        shared = mmap.mmap(-1, len(self.buffer))
+        shared[:] = self.buffer
+        self._bind(shared)
+
+    @property
+    def count(self):
+        return self.header[0]
+
+    # Registrar una muestra (sólo el proceso que muestrea)
+    def add(self, value, ticks, now=None):
+        if now is None:
+            now = time.monotonic()
+        n = self.count
+        slot = n % self.size
+        while self.lowest and self.lowest[-1][1] >= value:
+            self.lowest.pop()
+        self.lowest.append((n, value))
+        while self.highest and self.highest[-1][1] <= value:
+            self.highest.pop()
+        self.highest.append((n, value))
+        for extremes in (self.lowest, self.highest):
+            if extremes[0][0] <= n - self.size:
+                extremes.popleft()
+
+        # Escribir la muestra antes de publicarla con el contador
+        self.ticks[slot] = ticks % 2**32
+        self.usage[slot] = value
+        self.header[0] = n + 1
+
+        # Ring de las medias: si la muestra que se sobrescribe sigue en alguna ventana
+        # (muestras más rápidas que ADAPTIVE_MIN_INTERVAL), sale de ella
+        wslot = n % self.window_size
+        for name in self.windows:
+            if self.starts[name] <= n - self.window_size:
+                self.sums[name] -= self.values[wslot]
+                self.starts[name] += 1
+        self.times[wslot] = now
+        self.values[wslot] = value
+
+        # Añadir la muestra a cada ventana y sacar las que han quedado fuera de plazo
+        for name, span in self.windows.items():
+            self.sums[name] += value
+            start = self.starts[name]
+            while self.times[start % self.window_size] <= now - span:
+                self.sums[name] -= self.values[start % self.window_size]
+                start += 1
+            self.starts[name] = start
+
+    # Valores de los escalares de resumen (medias redondeadas al entero)
+    def summary(self):
+        n = self.count
+        values = {name: round(total / (n - self.starts[name])) if n else 0
+                  for name, total in self.sums.items()}
+        values['cpuUsageMin'] = self.lowest[0][1] if self.lowest else 0
+        values['cpuUsageMax'] = self.highest[0][1] if self.highest else 0
+        return values
+
+    # Índices de fila (número de muestra, desde 1) presentes en el buffer
+    def indexes(self):
+        n = self.count
+        cached_count, indexes = self.index_cache
+        if cached_count != n:
+            indexes = [(k,) for k in range(max(1, n - self.size + 1), n + 1)]
+            self.index_cache = (n, indexes)
+        return indexes
+
+    # Columna 2: uso (%); columna 3: sysUpTime de la muestra
+    def cell(self, column, index):
+        if len(index) != 1:
+            return None
+        k = index[0]
+        if not self.count - self.size < k <= self.count:
+            return None
+        slot = (k - 1) % self.size
+        value = self.usage[slot] if column == 2 else self.ticks[slot]
+        # Comprobar que el muestreador no ha reutilizado la posición mientras se leía
+        if self.count - self.size >= k:
+            return None
+        return value
+
+cpu_history = CpuHistory()
 
-def request_observer(snmpEngine, execpoint, variables, cbCtx):
-    """Observer que captura el securityName de cada petición"""
-    global current_security_name
-    if execpoint == 'rfc3412.receiveMessage:request':
-        current_security_name = variables.get('securityName', b'')
+# ===========================
+# Contexto de autorización por petición
+# ===========================
+
+# Decisiones VACM ya calculadas: (engine, contexto de autorización, tipo de vista, OID) -> bool.
+# La configuración VACM sólo se define al arrancar, así que no hace falta invalidarla; el OID lo
+# elige el cliente, así que la caché es LRU acotada (OIDs nuevos no la hacen crecer sin límite)
+@functools.lru_cache(maxsize=ACCESS_CACHE_SIZE)
+def access_allowed(snmpEngine, auth, view_type, oid):
+    """Consulta VACM (con caché) si el contexto de autorización puede acceder al OID"""
+    securityModel, securityName, securityLevel, contextName = auth
+    try:
+        # pysnmp devuelve (en vez de lanzar) StatusInformation si la vista no existe (p. ej. '')
+        result = snmpEngine.access_control_model[3].is_access_allowed(
+            snmpEngine, securityModel, securityName, securityLevel,
+            view_type, contextName, oid
+        )
+        return not isinstance(result, error.StatusInformation)
+    except error.StatusInformation:
+        return False
+
+# Guarda el securityName (y demás datos de seguridad) de cada petición según su stateReference,
+# en lugar de en una variable global compartida por todas las peticiones
+class AuthContextMixin:
+    def __init__(self, snmpEngine, snmpContext, cbCtx=None):
+        super().__init__(snmpEngine, snmpContext, cbCtx)
+        self.auth_contexts = {}     # stateReference -> (securityModel, securityName, securityLevel, contextName)
+
+    def process_pdu(self, snmpEngine, messageProcessingModel, securityModel, securityName,
+                    securityLevel, contextEngineId, contextName, pduVersion, PDU,
+                    maxSizeResponseScopedPDU, stateReference):
+        self.auth_contexts[stateReference] = (securityModel, securityName, securityLevel, contextName)
+        try:
+            super().process_pdu(snmpEngine, messageProcessingModel, securityModel, securityName,
+                                securityLevel, contextEngineId, contextName, pduVersion, PDU,
+                                maxSizeResponseScopedPDU, stateReference)
+        finally:
+            self.auth_contexts.pop(stateReference, None)
 
 # ===========================
-# Command Responders de Comando SNMP (GET, GETNEXT, SET)
+# Command Responders de Comando SNMP (GET, GETNEXT, GETBULK, SET)
 # ===========================
 
 # GET: responde consultas de lectura
@@ -223,22 +1509,13 @@ class JsonGetCommandResponder(cmdrsp.GetCommandResponder):
         errorIndex = 0
 
         for idx, (oid, val) in enumerate(varBinds, 1):
-            oid_tuple = tuple(oid)
-            key = mib_store.oid_to_key(oid_tuple)
+            obj = mib_registry.get(tuple(oid))
 
-            if key is None:
+            if obj is None:
                 rspVarBinds.append((oid, rfc1905.NoSuchObject()))
             else:
-                # --- Manejo de OIDs dinámicos --- #
-                if key == 'sysUpTime':
-                    value = mib_store.get_sysuptime()
-                # cpuUsage es actualizado por el sampler, así que se lee de .data
-                else:
-                    value = mib_store.data[key]
-                # --- Fin manejo dinámico --- #
-
-                snmp_value = python_to_snmp(key, value)
-                rspVarBinds.append((oid, snmp_value))
+                # Los OIDs dinámicos (sysUpTime) se resuelven con el getter del descriptor
+                rspVarBinds.append((oid, mib_registry.snmp_value(obj)))
 
         if errorStatus:
             rspVarBinds = [(oid, v2c.Null()) for oid, val in varBinds]
@@ -254,93 +1531,144 @@ class JsonGetNextCommandResponder(cmdrsp.NextCommandResponder):
         errorIndex = 0
 
         for idx, (oid, val) in enumerate(varBinds, 1):
-            oid_tuple = tuple(oid)
-
             # Buscar el siguiente OID servido
-            next_oid = None
-            for candidate in ORDERED_OIDS:
-                if candidate > oid_tuple:
-                    next_oid = candidate
-                    break
+            obj = mib_registry.next(tuple(oid))
 
-            if next_oid is None:
+            if obj is None:
                 rspVarBinds.append((oid, rfc1905.EndOfMibView()))
             else:
-                key = mib_store.oid_to_key(next_oid)
-                # --- Manejo de OIDs dinámicos --- 
-                if key == 'sysUpTime':
-                    value = mib_store.get_sysuptime()
-                else:
-                    value = mib_store.data[key]
-                # --- Fin manejo dinámico ---
-                snmp_value = python_to_snmp(key, value)
-                rspVarBinds.append((next_oid, snmp_value))
+                rspVarBinds.append((obj.oid, mib_registry.snmp_value(obj)))
 
         if errorStatus:
             rspVarBinds = [(oid, v2c.Null()) for oid, val in varBinds]
 
         self.send_varbinds(snmpEngine, stateReference, errorStatus, errorIndex, rspVarBinds)
 
-# SET: responde peticiones de escritura (solo para comunidad privada), con validaciones
-class JsonSetCommandResponder(cmdrsp.SetCommandResponder):
+# Tamaño máximo de mensaje que el engine puede enviar
+def max_response_size(snmpEngine):
+    maxMessageSize, = snmpEngine.get_mib_builder().import_symbols(
+        '__SNMP-FRAMEWORK-MIB', 'snmpEngineMaxMessageSize'
+    )
+    return int(maxMessageSize.syntax)
+
+# GETBULK: responde con varios GETNEXT encadenados en una sola respuesta (RFC 3416, 4.2.3)
+class JsonBulkCommandResponder(cmdrsp.BulkCommandResponder):
     def handle_management_operation(self, snmpEngine, stateReference, contextName, PDU):
-        global current_security_name
+        nonRepeaters = max(int(v2c.apiBulkPDU.get_non_repeaters(PDU)), 0)
+        maxRepetitions = max(int(v2c.apiBulkPDU.get_max_repetitions(PDU)), 0)
+        varBinds = v2c.apiPDU.get_varbinds(PDU)
 
-        # Verificar permisos (solo 'private-user' puede escribir)
-        if current_security_name != b'private-user':
-            varBinds = v2c.apiPDU.get_varbinds(PDU)
-            rspVarBinds = [(oid, v2c.Null()) for oid, val in varBinds]
-            self.send_varbinds(snmpEngine, stateReference, 6, 1, rspVarBinds)
-            return
+        N = min(nonRepeaters, len(varBinds))
+        R = len(varBinds) - N
+
+        rspVarBinds = []
+        budget = max_response_size(snmpEngine) - RESPONSE_OVERHEAD
+        used = 0
+
+        # Añade un varbind si cabe en la respuesta; si no, se trunca (nunca tooBig)
+        def append(oid, snmp_value, size=None):
+            nonlocal used
+            if size is None:
+                size = varbind_size(oid, snmp_value)
+            if used + size > budget:
+                return False
+            used += size
+            rspVarBinds.append((oid, snmp_value))
+            return True
+
+        # Siguiente OID, valor y tamaño a partir de un OID dado (valor None si fin de la MIB)
+        def next_varbind(oid_tuple):
+            obj = mib_registry.next(oid_tuple)
+            if obj is None:
+                return oid_tuple, None, None
+            snmp_value, varbind = mib_registry.encoded(obj)
+            return obj.oid, snmp_value, len(varbind)
+
+        # Non-repeaters: un único GETNEXT por varbind
+        for oid, val in varBinds[:N]:
+            next_oid, snmp_value, size = next_varbind(tuple(oid))
+            if snmp_value is None:
+                snmp_value = rfc1905.EndOfMibView()
+            if not append(next_oid, snmp_value, size):
+                break
+        else:
+            # Repeaters: hasta maxRepetitions filas de R varbinds
+            cursors = [tuple(oid) for oid, val in varBinds[N:]]
+            finished = [False] * R
+            full = False
+
+            for _ in range(maxRepetitions if R else 0):
+                for i in range(R):
+                    if finished[i]:
+                        next_oid, snmp_value, size = cursors[i], rfc1905.EndOfMibView(), None
+                    else:
+                        next_oid, snmp_value, size = next_varbind(cursors[i])
+                        if snmp_value is None:
+                            finished[i] = True
+                            snmp_value = rfc1905.EndOfMibView()
+                        else:
+                            cursors[i] = next_oid
+                    if not append(next_oid, snmp_value, size):
+                        full = True
+                        break
+                # Fin de la MIB en todas las columnas: no tiene sentido seguir repitiendo
+                if full or all(finished):
+                    break
+
+        self.send_varbinds(snmpEngine, stateReference, 0, 0, rspVarBinds)
+
+# SET: responde peticiones de escritura (solo para comunidad privada), con validaciones
+class JsonSetCommandResponder(AuthContextMixin, cmdrsp.SetCommandResponder):
+    def handle_management_operation(self, snmpEngine, stateReference, contextName, PDU):
+        auth = self.auth_contexts[stateReference]
 
         varBinds = v2c.apiPDU.get_varbinds(PDU)
         rspVarBinds = []
+        changes = {}    # Valores persistentes modificados (registro del journal)
+        scalars = []    # (objeto, valor) de los escalares, que se escriben sólo si todo el PDU es válido
+        rows = {}       # tabla -> {índice: {columna: valor}} de cada fila modificada
+        first = {}      # (tabla, índice) -> primer varbind de la fila (error-index)
         errorStatus = 0
         errorIndex = 0
 
         for idx, (oid, val) in enumerate(varBinds, 1):
-            oid_tuple = tuple(oid)
-            key = mib_store.oid_to_key(oid_tuple)
+            oid = tuple(oid)
+
+            # Verificar permisos de escritura (vista de escritura VACM de quien hace la petición)
+            if not access_allowed(snmpEngine, auth, 'write', oid):
+                errorStatus = 6 # noAccess
+                errorIndex = idx
+                break
+
+            obj = mib_registry.settable(oid)
 
-            if key is None:
+            if obj is None:
                 errorStatus = 18
                 errorIndex = idx
                 break
 
             # Proteger contra escritura en OIDs de solo lectura
-            if key in ['sysDescr', 'sysObjectID', 'sysUpTime', 'cpuUsage']:
+            if not obj.writable:
                 errorStatus = 17 # notWritable
                 errorIndex = idx
                 break
 
             try:
                 # Validar tipo de dato acorde con el atributo
-                if key in ['manager', 'managerEmail', 'sysContact', 'sysName', 'sysLocation']:
-                    if not isinstance(val, v2c.OctetString):
-                        errorStatus = 7; errorIndex = idx; break
-                elif key in ['cpuThreshold', 'sysServices']:
-                    if not isinstance(val, (v2c.Integer, rfc1902.Integer32)):
-                        errorStatus = 7; errorIndex = idx; break
-
-                python_value = snmp_to_python(key, val)
+                if not obj.accepts(val):
+                    errorStatus = 7; errorIndex = idx; break
+
+                python_value = obj.from_snmp(val)
                 # Validar rango o longitud
-                if key in ['manager', 'managerEmail', 'sysContact', 'sysName', 'sysLocation']:
-                    if len(python_value) > 255:
-                        errorStatus = 10; errorIndex = idx; break
-                elif key == 'cpuThreshold':
-                    if not (0 <= python_value <= 100):
-                        errorStatus = 10; errorIndex = idx; break
-                elif key == 'sysServices':
-                    if not (0 <= python_value <= 127):
-                        errorStatus = 10; errorIndex = idx; break
-                # Guardar valor
-                mib_store.data[key] = python_value
-
-                # Sincronizar manager y sysContact
-                if key == 'manager':
-                    mib_store.data['sysContact'] = python_value
-                elif key == 'sysContact':
-                    mib_store.data['manager'] = python_value
+                if not obj.in_range(python_value):
+                    errorStatus = 10; errorIndex = idx; break
+
+                if obj.table is not None:
+                    # Celda de tabla: las columnas de la fila se aplican juntas al final
+                    rows.setdefault(obj.table, {}).setdefault(obj.index, {})[obj.column] = python_value
+                    first.setdefault((obj.table, obj.index), idx)
+                else:
+                    scalars.append((obj, python_value))
 
                 rspVarBinds.append((oid, val))
 
@@ -349,76 +1677,514 @@ class JsonSetCommandResponder(cmdrsp.SetCommandResponder):
                 errorIndex = idx
                 break
 
+        # SET atómico (RFC 3416): comprobar las filas (RowStatus y filas completas) sin publicarlas
+        # antes de escribir nada, para que un varbind rechazado no deje aplicados los anteriores
+        for table, table_rows in rows.items():
+            if errorStatus:
+                break
+            errorStatus, index = table.apply(table_rows, commit=False)
+            if errorStatus:
+                errorIndex = first[(table, index)]
+
+        if not errorStatus:
+            # Guardar valores (sincroniza manager y sysContact e invalida la caché)
+            previous = [(obj, obj.read()) for obj, _ in scalars]
+            for obj, python_value in scalars:
+                obj.write(python_value)
+                if obj.persistent:
+                    for key in (obj.name,) + obj.mirrors:
+                        changes[key] = python_value
+
+            # Filas de tablas (creación, modificación y borrado con RowStatus)
+            committed = []
+            for table, table_rows in rows.items():
+                errorStatus, result = table.apply(table_rows)
+                if errorStatus:
+                    # Otro worker ha cambiado las filas tras la comprobación: deshacer todo el SET
+                    errorStatus, errorIndex = 14, first[(table, result)]    # commitFailed
+                    for done, before in committed:
+                        done.rollback(before, rows[done])
+                    for obj, value in reversed(previous):
+                        obj.write(value)
+                    break
+                committed.append((table, result))
+                if table.persistent:
+                    for index in table_rows:
+                        changes[f'{table.name}.{index[0]}'] = table.dump_row(index)
+
         if errorStatus:
             rspVarBinds = [(oid, v2c.Null()) for oid, val in varBinds]
-        else:
-            mib_store.save_to_json()     # Guardar persistente 
+        elif changes:
+            mib_store.persist(changes)     # Guardar persistente 
+            sample_scheduler.notify(changes)
 
         self.send_varbinds(snmpEngine, stateReference, errorStatus, errorIndex, rspVarBinds)
 
 # ===========================
-# Envío de TRAP SNMP y Email de Alarma
+# Fast path v2c: GET/GETNEXT sin pasar por la pila de pysnmp
 # ===========================
 
-# Enviar TRAP SNMP (cuando CPU supera umbral)
-async def send_trap(cpu_usage, cpu_threshold):
-    """Envía trap SNMP - versión con tuplas de OID"""
-    print(f'Sending TRAP: CPU {cpu_usage}% > threshold {cpu_threshold}%')
-
-    # Engine temporal: evita conflictos ACL/VACM del agente principal y simplifica el envío usando hlapi (high-level api)
-    trapEngine = engine.SnmpEngine()
-    
+# Etiquetas BER de las PDUs que el fast path sabe responder
+FAST_PATH_PDU_TAGS = (0xa0, 0xa1)   # GetRequest-PDU, GetNextRequest-PDU
+RESPONSE_PDU_TAG = 0xa2
+NO_SUCH_OBJECT_BER = b'\x80\x00'
+END_OF_MIB_VIEW_BER = b'\x82\x00'
+ERROR_FIELDS_BER = b'\x02\x01\x00\x02\x01\x00'  # error-status = 0, error-index = 0
+
+FAST_PATH_COMMUNITIES = {community.encode(): name for community, name in COMMUNITIES.items()}
+
+# Leer la cabecera de un TLV BER: (etiqueta, inicio del contenido, fin del contenido)
+def ber_read(data, pos):
+    if pos + 2 > len(data):
+        raise ValueError('Truncated TLV')
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7f
+        if n == 0 or n > 4:
+            raise ValueError('Unsupported length form')
+        length = int.from_bytes(data[pos:pos + n], 'big')
+        pos += n
+    end = pos + length
+    if end > len(data):
+        raise ValueError('Truncated TLV')
+    return tag, pos, end
+
+# INTEGER en complemento a dos, con el mismo número de bytes que usa pyasn1
+# (los negativos múltiplos de 8 bits llevan un byte extra, p. ej. -128 -> ff 80)
+def ber_integer(value):
+    bits = value.bit_length()
+    if bits % 8 == 0:
+        bits += 1
+    return ber_tlv(0x02, value.to_bytes((bits + 7) // 8, 'big', signed=True))
+
+# OBJECT IDENTIFIER (codificación y decodificación base 128)
+def ber_oid(oid):
+    arcs = [oid[0] * 40 + oid[1]] + list(oid[2:])
+    content = bytearray()
+    for arc in arcs:
+        chunk = [arc & 0x7f]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7f))
+            arc >>= 7
+        content.extend(reversed(chunk))
+    return ber_tlv(0x06, bytes(content))
+
+def ber_decode_oid(content):
+    if not content or content[-1] & 0x80:
+        raise ValueError('Bad OID')
+    arcs = []
+    value = 0
+    for byte in content:
+        if value == 0 and byte == 0x80:
+            raise ValueError('Non-minimal OID')
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    first = arcs[0]
+    if first < 80:
+        return (first // 40, first % 40) + tuple(arcs[1:])
+    return (2, first - 80) + tuple(arcs[1:])
+
+def in_read_view(oid):
+    return any(oid[:len(subtree)] == subtree for subtree in VIEW_SUBTREES)
+
+# Construye la respuesta a un GET/GETNEXT v2c, o None si debe atenderla pysnmp
+def fast_path_response(datagram):
     try:
-        # Obtenemos el sysuptime del engine principal, puesto que el del engine temporal será 0 y no tiene sentido enviarlo.
-        agent_uptime = mib_store.get_sysuptime()
+        tag, pos, end = ber_read(datagram, 0)
+        if tag != 0x30 or end != len(datagram):
+            return None
+        tag, start, pos = ber_read(datagram, pos)
+        if tag != 0x02 or datagram[start:pos] != b'\x01':    # sólo SNMPv2c
+            return None
+        tag, start, pos = ber_read(datagram, pos)
+        community = datagram[start:pos]
+        if tag != 0x04 or community not in FAST_PATH_COMMUNITIES:
+            return None
+        pdu_tag, pos, pdu_end = ber_read(datagram, pos)
+        if pdu_tag not in FAST_PATH_PDU_TAGS or pdu_end != end:
+            return None
+        tag, start, pos = ber_read(datagram, pos)
+        if tag != 0x02 or pos - start > 5:
+            return None
+        request_id = int.from_bytes(datagram[start:pos], 'big', signed=True)
+        if not -2**31 <= request_id < 2**31:
+            return None
+        for _ in range(2):                                   # error-status, error-index
+            tag, start, pos = ber_read(datagram, pos)
+            if tag != 0x02:
+                return None
+        tag, pos, list_end = ber_read(datagram, pos)
+        if tag != 0x30 or list_end != pdu_end:
+            return None
+
+        varbinds = []
+        while pos < list_end:
+            tag, pos, vb_end = ber_read(datagram, pos)
+            if tag != 0x30:
+                return None
+            tag, start, pos = ber_read(datagram, pos)
+            if tag != 0x06:
+                return None
+            oid = ber_decode_oid(datagram[start:pos])
+            tag, start, pos = ber_read(datagram, pos)        # valor (se ignora)
+            if pos != vb_end:
+                return None
+
+            if pdu_tag == 0xa0:
+                obj = mib_registry.get(oid)
+                if obj is None:
+                    varbinds.append(ber_tlv(0x30, ber_oid(oid) + NO_SUCH_OBJECT_BER))
+                    continue
+            else:
+                obj = mib_registry.next(oid)
+                if obj is None:
+                    varbinds.append(ber_tlv(0x30, ber_oid(oid) + END_OF_MIB_VIEW_BER))
+                    continue
+            # Fuera de las vistas VACM: que lo decida pysnmp
+            if not in_read_view(obj.oid):
+                return None
+            varbinds.append(mib_registry.encoded(obj)[1])
+    except (ValueError, IndexError):
+        return None
 
-        # OID para tipo de trampa (standard)
-        SNMP_TRAP_OID = (1, 3, 6, 1, 6, 3, 1, 1, 4, 1, 0)
-        TRAP_TYPE_OID = BASE_OID + (2, 1)  # Identificador de evento cpuThresholdExceeded
-        
-        errorIndication, errorStatus, errorIndex, varBinds = await send_notification(
-            trapEngine,
-            CommunityData('private', mpModel=1),
-            await UdpTransportTarget.create((TRAP_HOST, TRAP_PORT)),
-            ContextData(),
+    pdu = ber_integer(request_id) + ERROR_FIELDS_BER + ber_tlv(0x30, b''.join(varbinds))
+    return ber_tlv(0x30, b'\x02\x01\x01' + ber_tlv(0x04, community) + ber_tlv(RESPONSE_PDU_TAG, pdu))
+
+# Transporte UDP que responde en el propio socket los GET/GETNEXT v2c y pasa el resto a pysnmp
+class FastPathUdpTransport(udp.UdpTransport):
+    def __init__(self, *args, max_message_size=65507, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_message_size = max_message_size
+        self.handled = 0
+        self.forwarded = 0
+
+    def datagram_received(self, datagram, transportAddress):
+        response = fast_path_response(datagram)
+        if response is None or len(response) > self.max_message_size:
+            self.forwarded += 1
+            super().datagram_received(datagram, transportAddress)
+        else:
+            self.handled += 1
+            self.transport.sendto(response, transportAddress)
+
+# ===========================
+# INFORMs confirmados con cola de retransmisión
+# ===========================
+
+INFORM_PDU_TAG = 0xa6           # InformRequest-PDU
+
+class WheelTimer:
+    __slots__ = ('due', 'callback', 'args', 'cancelled')
+
+    def __init__(self, due, callback, args):
+        self.due = due              # Tick en el que vence
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+class TimerWheel:
+    """Rueda de temporización: 'slots' ranuras de 'tick' segundos avanzadas por un único
+    temporizador del event loop, sólo mientras quede algún temporizador pendiente"""
+
+    def __init__(self, tick=INFORM_WHEEL_TICK, slots=INFORM_WHEEL_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.origin = None      # loop.time() del tick 0
+        self.current = 0        # Último tick procesado
+        self.pending = 0        # Temporizadores sin vencer ni cancelar
+        self.handle = None      # call_at del siguiente tick (None = rueda parada)
+        self.fired = 0
+
+    def schedule(self, delay, callback, *args):
+        loop = asyncio.get_running_loop()
+        if self.handle is None:
+            # Rueda parada: se reanuda en el tick actual
+            if self.origin is None:
+                self.origin = loop.time()
+            self.current = int((loop.time() - self.origin) / self.tick)
+            self.handle = loop.call_at(self.origin + (self.current + 1) * self.tick, self.advance)
+        timer = WheelTimer(self.current + max(1, math.ceil(delay / self.tick)), callback, args)
+        self.slots[timer.due % len(self.slots)].append(timer)
+        self.pending += 1
+        return timer
+
+    # Cancelación perezosa: el temporizador se descarta cuando la rueda pasa por su ranura
+    def cancel(self, timer):
+        if not timer.cancelled:
+            timer.cancelled = True
+            self.pending -= 1
+
+    def advance(self):
+        loop = asyncio.get_running_loop()
+        now = int((loop.time() - self.origin) / self.tick)
+        # Si el loop se ha retrasado se procesan todas las ranuras atrasadas
+        while self.current < now and self.pending:
+            self.current += 1
+            index = self.current % len(self.slots)
+            slot = self.slots[index]
+            if not slot:
+                continue
+            self.slots[index] = []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.due > self.current:        # Vence en una vuelta posterior
+                    self.slots[index].append(timer)
+                    continue
+                timer.cancelled = True
+                self.pending -= 1
+                self.fired += 1
+                timer.callback(*timer.args)
+        if self.pending:
+            self.handle = loop.call_at(self.origin + (self.current + 1) * self.tick, self.advance)
+        else:
+            self.handle = None
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        self.slots = [[] for _ in self.slots]
+        self.pending = 0
+
+class PendingInform:
+    __slots__ = ('request_id', 'address', 'message', 'future', 'attempt', 'timer')
+
+    def __init__(self, request_id, address, message, future):
+        self.request_id = request_id
+        self.address = address
+        self.message = message      # Mensaje BER (se reenvía tal cual en cada retransmisión)
+        self.future = future        # True = confirmado, False = sin respuesta o con error
+        self.attempt = 0
+        self.timer = None
+
+class InformOriginator(asyncio.DatagramProtocol):
+    """INFORMs v2c codificados a mano sobre un socket UDP propio. Los temporizadores de
+    retransmisión de todos los INFORMs pendientes comparten una TimerWheel"""
+
+    def __init__(self, community='private', timeout=INFORM_TIMEOUT, retries=INFORM_RETRIES,
+                 backoff_max=INFORM_BACKOFF_MAX, max_pending=INFORM_MAX_PENDING):
+        self.community = community.encode()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_max = backoff_max
+        self.max_pending = max_pending
+        self.enabled = False    # send_trap envía INFORMs en lugar de traps (--inform)
+        self.transport = None
+        self.wheel = TimerWheel()
+        self.pending = {}       # request-id -> PendingInform
+        self.addresses = {}     # (host, port) -> dirección resuelta
+        self.slots = {}         # (host, port) -> semáforo de INFORMs pendientes
+        self.request_id = int.from_bytes(os.urandom(3), 'big')
+        self.sent = 0
+        self.retransmitted = 0
+        self.acked = 0
+        self.expired = 0
+
+    async def open(self):
+        if self.transport is None:
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: self, local_addr=('0.0.0.0', 0))
+
+    async def target(self, host, port):
+        # El semáforo se crea antes de esperar a la resolución: todos los envíos al destino lo comparten
+        slots = self.slots.get((host, port))
+        if slots is None:
+            slots = self.slots[(host, port)] = asyncio.Semaphore(self.max_pending)
+        address = self.addresses.get((host, port))
+        if address is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+            address = self.addresses[(host, port)] = infos[0][4]
+        return address, slots
+
+    def encode(self, request_id, varBinds):
+        body = b''.join(encode_varbind(oid, value) for oid, value in varBinds)
+        pdu = ber_integer(request_id) + ERROR_FIELDS_BER + ber_tlv(0x30, body)
+        return ber_tlv(0x30, b'\x02\x01\x01' + ber_tlv(0x04, self.community) + ber_tlv(INFORM_PDU_TAG, pdu))
+
+    async def send(self, host, port, *varBinds):
+        """Envía un INFORM y espera su confirmación: True si el receptor responde sin error"""
+        await self.open()
+        address, slots = await self.target(host, port)
+        async with slots:
+            self.request_id = self.request_id % (2**31 - 1) + 1
+            inform = PendingInform(self.request_id, address, self.encode(self.request_id, varBinds),
+                                   asyncio.get_running_loop().create_future())
+            self.pending[inform.request_id] = inform
+            try:
+                self.transmit(inform)
+                return await inform.future
+            finally:
+                del self.pending[inform.request_id]
+                if inform.timer is not None:
+                    self.wheel.cancel(inform.timer)
+
+    def transmit(self, inform):
+        self.transport.sendto(inform.message, inform.address)
+        self.sent += 1
+        delay = min(self.timeout * 2 ** inform.attempt, self.backoff_max)
+        inform.timer = self.wheel.schedule(delay, self.expire, inform)
+
+    # Vence el temporizador de un INFORM: retransmitir con el doble de espera o darlo por perdido
+    def expire(self, inform):
+        inform.timer = None
+        if inform.future.done():
+            return
+        if inform.attempt < self.retries:
+            inform.attempt += 1
+            self.retransmitted += 1
+            self.transmit(inform)
+        else:
+            self.expired += 1
+            inform.future.set_result(False)
+
+    def datagram_received(self, data, addr):
+        try:
+            request_id, error_status = self.parse_response(data)
+        except (ValueError, IndexError):
+            return
+        inform = self.pending.get(request_id)
+        if inform is None or addr[:2] != inform.address or inform.future.done():
+            return
+        self.wheel.cancel(inform.timer)
+        inform.timer = None
+        self.acked += 1
+        inform.future.set_result(error_status == 0)
+
+    # (request-id, error-status) de una Response-PDU v2c
+    def parse_response(self, data):
+        tag, pos, end = ber_read(data, 0)
+        tag, start, pos = ber_read(data, pos)           # version
+        tag, start, pos = ber_read(data, pos)           # community
+        if data[start:pos] != self.community:
+            raise ValueError('Wrong community')
+        tag, pos, _ = ber_read(data, pos)
+        if tag != RESPONSE_PDU_TAG:
+            raise ValueError('Not a response')
+        tag, start, pos = ber_read(data, pos)
+        request_id = int.from_bytes(data[start:pos], 'big', signed=True)
+        tag, start, pos = ber_read(data, pos)
+        return request_id, int.from_bytes(data[start:pos], 'big', signed=True)
+
+    def close(self):
+        self.wheel.close()
+        for inform in self.pending.values():
+            if not inform.future.done():
+                inform.future.set_result(False)
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self.addresses.clear()
+        self.slots.clear()
+
+informer = InformOriginator()
+
+# ===========================
+# Envío de TRAP SNMP y Email de Alarma
+# ===========================
+
+# Enviar TRAP SNMP (cuando CPU supera umbral)
+# OID para tipo de trampa (standard)
+SNMP_TRAP_OID = (1, 3, 6, 1, 6, 3, 1, 1, 4, 1, 0)
+TRAP_TYPE_OID = BASE_OID + (2, 1)  # Identificador de evento cpuThresholdExceeded
+ALARM_RISING_OID = BASE_OID + (2, 2)    # alarmRising: una fila de alarmTable alcanza su umbral ascendente
+ALARM_FALLING_OID = BASE_OID + (2, 3)   # alarmFalling: una fila de alarmTable alcanza su umbral descendente
+ALERT_SUMMARY_OID = BASE_OID + (2, 4)   # alertSummary: repeticiones de un evento suprimidas por el límite
+PRESSURE_STALL_OID = BASE_OID + (2, 5)  # pressureStall: un trigger de PSI ha detectado un atasco
+
+class NotificationOriginator:
+    """Engine de notificaciones de larga duración con destinos (transporte + dirección) cacheados"""
+
+    def __init__(self, community='private'):
+        # Engine propio (no el del agente): evita conflictos ACL/VACM y permite usar hlapi (high-level api)
+        self.snmpEngine = None
+        self.community = CommunityData(community, mpModel=1)
+        self.context = ContextData()
+        self.targets = {}   # (host, port) -> UdpTransportTarget ya resuelto
+
+    def open(self):
+        if self.snmpEngine is None:
+            self.snmpEngine = engine.SnmpEngine()
+
+    async def target(self, host, port):
+        target = self.targets.get((host, port))
+        if target is None:
+            target = await UdpTransportTarget.create((host, port))
+            self.targets[(host, port)] = target
+        return target
+
+    async def send(self, host, port, *varBinds):
+        self.open()
+        return await send_notification(
+            self.snmpEngine,
+            self.community,
+            await self.target(host, port),
+            self.context,
             'trap',
-            # Tuplas directamente
-            # Importante incluir sysUpTime explícitamente como primer varbind
-            ObjectType(ObjectIdentity(SYS_UP_TIME), v2c.TimeTicks(agent_uptime)),
-            ObjectType(ObjectIdentity(SNMP_TRAP_OID), ObjectIdentifier(TRAP_TYPE_OID)),
-            ObjectType(ObjectIdentity(OID_CPU_USAGE), Integer32(cpu_usage)),
-            ObjectType(ObjectIdentity(OID_CPU_THRESHOLD), Integer32(cpu_threshold)),
-            ObjectType(ObjectIdentity(OID_MANAGER_EMAIL), OctetString(mib_store.data['managerEmail']))
+            *[ObjectType(ObjectIdentity(oid), value) for oid, value in varBinds]
         )
-        
-        if errorIndication:
-            print(f'❌ Trap error: {errorIndication}')
-        elif errorStatus:
-            print(f'❌ SNMP error: {errorStatus.prettyPrint()}')
-        else:
-            print('✅ Trap sent successfully!')
-            
-    except Exception as e:
-        print(f'❌ Exception: {e}')
-        import traceback
-        traceback.print_exc()
-    finally:
-        trapEngine.close_dispatcher()
 
-# Enviar email de alarma si CPU supera el umbral
-async def send_email(cpu_usage, cpu_threshold):
-    """Envía email de alarma con Gmail (SMTP_SSL)"""
-    try:
-        recipient = mib_store.data['managerEmail']
-        manager = mib_store.data['manager']
+    def close(self):
+        if self.snmpEngine is not None:
+            self.snmpEngine.close_dispatcher()
+            self.snmpEngine = None
+        self.targets.clear()
+
+notifier = NotificationOriginator()
+
+def trap_varbinds(cpu_usage, cpu_threshold, top=()):
+    """Varbinds del trap cpuThresholdExceeded (seguidos de las filas de topCpuTable del momento)"""
+    # Obtenemos el sysuptime del engine principal, puesto que el del engine de notificaciones no tiene sentido enviarlo.
+    agent_uptime = mib_store.get_sysuptime()
+    return (
+        # Importante incluir sysUpTime explícitamente como primer varbind
+        (SYS_UP_TIME, v2c.TimeTicks(agent_uptime)),
+        (SNMP_TRAP_OID, ObjectIdentifier(TRAP_TYPE_OID)),
+        (OID_CPU_USAGE, Integer32(cpu_usage)),
+        (OID_CPU_THRESHOLD, Integer32(cpu_threshold)),
+        (OID_MANAGER_EMAIL, OctetString(mib_store.data['managerEmail'])),
+        *top_cpu_varbinds(top)
+    )
 
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_SENDER
-        msg['To'] = recipient
-        msg['Subject'] = f"⚠️ ALERTA: Uso de CPU {cpu_usage}% > Umbral {cpu_threshold}%"
+# topCpuPid, topCpuName y topCpuUsage de cada fila, en orden de rango
+def top_cpu_varbinds(top):
+    return tuple(
+        varbind
+        for rank, (pid, name, usage) in enumerate(top, 1)
+        for varbind in ((OID_TOP_CPU_ENTRY + (2, rank), Integer32(pid)),
+                        (OID_TOP_CPU_ENTRY + (3, rank), OctetString(name)),
+                        (OID_TOP_CPU_ENTRY + (4, rank), Integer32(usage)))
+    )
+
+# Alerta de la regla de CPU integrada (cpuUsage > cpuThreshold)
+class CpuAlert:
+    key = 'cpu'                 # Evento al que se aplica el límite de notificaciones
+    trap_oid = TRAP_TYPE_OID
+
+    def __init__(self, cpu_usage, cpu_threshold):
+        self.cpu_usage = cpu_usage
+        self.cpu_threshold = cpu_threshold
+        self.top = top_processes()  # Mayores consumidores en el momento de la alerta
+        self.delivered = set()  # Destinos de trapTargetTable que ya la han recibido
 
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def varbinds(self):
+        return trap_varbinds(self.cpu_usage, self.cpu_threshold, self.top)
 
+    def describe(self):
+        return f'CPU {self.cpu_usage}% > threshold {self.cpu_threshold}%'
+
+    # Línea del email resumen
+    def summary(self):
+        return f'CPU {self.cpu_usage}% > umbral {self.cpu_threshold}%'
+
+    def email(self, manager, timestamp):
         body = f"""
 ALERTA DE SEGURIDAD - UMBRAL DE CPU SUPERADO
 =============================================
@@ -430,25 +2196,299 @@ El uso de CPU ha superado el umbral configurado:
 DETALLES:
 ---------
 Timestamp:            {timestamp}
-Uso de CPU actual:    {cpu_usage}%
-Umbral configurado:   {cpu_threshold}%
+Uso de CPU actual:    {self.cpu_usage}%
+Umbral configurado:   {self.cpu_threshold}%
+
+PROCESOS CON MÁS CPU:
+---------------------
+{self.top_lines()}
 
 Este es un mensaje automático del Agente SNMP.
         """
+        return f"⚠️ ALERTA: Uso de CPU {self.cpu_usage}% > Umbral {self.cpu_threshold}%", body, 'Email de alarma de CPU'
+
+    def top_lines(self):
+        if not self.top:
+            return '(sin datos de procesos todavía)'
+        return '\n'.join(f'PID {pid:<8} {usage:>4}%   {name}' for pid, name, usage in self.top)
+
+# Alerta de una fila de alarmTable (umbral ascendente o descendente)
+class AlarmAlert:
+    def __init__(self, index, row, value, rising):
+        self.index = index
+        self.variable = row['variable']
+        self.sample_type = row['sampleType']
+        self.value = value
+        self.rising = rising
+        self.threshold = row['rising'] if rising else row['falling']
+        self.key = (index, rising)
+        self.trap_oid = ALARM_RISING_OID if rising else ALARM_FALLING_OID
+        self.delivered = set()
+
+    def varbinds(self):
+        column = 7 if self.rising else 8
+        entry = OID_ALARM_ENTRY
+        return (
+            (SYS_UP_TIME, v2c.TimeTicks(mib_store.get_sysuptime())),
+            (SNMP_TRAP_OID, ObjectIdentifier(self.trap_oid)),
+            (entry + (3,) + self.index, ObjectIdentifier(self.variable)),
+            (entry + (4,) + self.index, Integer32(self.sample_type)),
+            (entry + (5,) + self.index, Integer32(self.value)),
+            (entry + (column,) + self.index, Integer32(self.threshold)),
+            (OID_MANAGER_EMAIL, OctetString(mib_store.data['managerEmail']))
+        )
+
+    def condition(self):
+        variable = '.'.join(map(str, self.variable))
+        return f'{variable} = {self.value} {">=" if self.rising else "<="} {self.threshold}'
+
+    def describe(self):
+        return f'alarm {self.index[0]} {"rising" if self.rising else "falling"}: {self.condition()}'
 
-        msg.attach(MIMEText(body, 'plain'))
+    def summary(self):
+        return f'Alarma {self.index[0]}: {self.condition()}'
 
-        # Envío asíncrono
-        await aiosmtplib.send(
-            msg,
-            hostname=SMTP_SERVER,
-            port=SMTP_PORT,
-            username=EMAIL_SENDER,
-            password=EMAIL_PASSWORD,
-            use_tls=True,
+    def email(self, manager, timestamp):
+        kind = 'ASCENDENTE' if self.rising else 'DESCENDENTE'
+        body = f"""
+ALERTA - UMBRAL {kind} DE ALARMA ALCANZADO
+=============================================
+
+Hola {manager},
+
+La alarma {self.index[0]} de alarmTable ha alcanzado su umbral {kind.lower()}:
+
+DETALLES:
+---------
+Timestamp:            {timestamp}
+Variable:             {'.'.join(map(str, self.variable))}
+Valor muestreado:     {self.value}{' (delta)' if self.sample_type == ALARM_DELTA else ''}
+Umbral:               {self.threshold}
+
+Este es un mensaje automático del Agente SNMP.
+        """
+        return f"⚠️ ALARMA {self.index[0]}: {self.condition()}", body, f'Email de alarma {self.index[0]}'
+
+# Resumen de las repeticiones de un evento suprimidas por alertRateLimit en una ventana
+class SummaryAlert:
+    def __init__(self, alert, count):
+        self.alert = alert      # Última repetición suprimida
+        self.count = count
+        self.key = ('summary', alert.key)
+        self.trap_oid = ALERT_SUMMARY_OID
+        self.delivered = set()
+
+    # Tipo y número de repeticiones, seguidos de los objetos de la última repetición
+    def varbinds(self):
+        uptime, _, *objects = self.alert.varbinds()
+        return (
+            uptime,
+            (SNMP_TRAP_OID, ObjectIdentifier(self.trap_oid)),
+            (OID_ALERT_SUMMARY_TYPE, ObjectIdentifier(self.alert.trap_oid)),
+            (OID_ALERT_SUMMARY_COUNT, Integer32(self.count)),
+            *objects
         )
 
-        print(f'Email de alarma de CPU enviado a {recipient}')
+    def describe(self):
+        return f'{self.count} suppressed repeats of {self.alert.describe()}'
+
+    def summary(self):
+        return f'{self.count} repeticiones suprimidas; última: {self.alert.summary()}'
+
+    def email(self, manager, timestamp):
+        body = f"""
+RESUMEN DE ALERTAS REPETIDAS
+=============================================
+
+Hola {manager},
+
+Una alerta se ha repetido más veces de las permitidas por alertRateLimit.
+Las repeticiones no se notificaron una a una:
+
+DETALLES:
+---------
+Timestamp:            {timestamp}
+Repeticiones:         {self.count}
+Última repetición:    {self.alert.summary()}
+
+Este es un mensaje automático del Agente SNMP.
+        """
+        return (f"⚠️ RESUMEN: {self.count} alertas repetidas ({self.alert.summary()})", body,
+                f'Resumen de {self.count} alertas repetidas')
+
+# Atasco detectado por un trigger de PSI (--pressure-trigger), con la presión del momento
+class PressureAlert:
+    trap_oid = PRESSURE_STALL_OID
+
+    def __init__(self, trigger, snapshot):
+        self.trigger = trigger
+        self.avg10 = pressure_key(trigger.resource, trigger.kind, 'avg10')
+        self.total = pressure_key(trigger.resource, trigger.kind, 'total')
+        self.values = {key: snapshot.get(key, 0) for key in (self.avg10, self.total)}
+        self.key = ('pressure', trigger.resource, trigger.kind)
+        self.delivered = set()
+
+    def varbinds(self):
+        return (
+            (SYS_UP_TIME, v2c.TimeTicks(mib_store.get_sysuptime())),
+            (SNMP_TRAP_OID, ObjectIdentifier(self.trap_oid)),
+            (PRESSURE_OIDS[self.avg10], v2c.Gauge32(self.values[self.avg10])),
+            (PRESSURE_OIDS[self.total], v2c.Counter64(self.values[self.total])),
+            (OID_PRESSURE_TRIGGER_STALL, Integer32(self.trigger.stall)),
+            (OID_PRESSURE_TRIGGER_WINDOW, Integer32(self.trigger.window)),
+            (OID_MANAGER_EMAIL, OctetString(mib_store.data['managerEmail']))
+        )
+
+    def describe(self):
+        return f'{self.trigger.describe()} (avg10 {self.values[self.avg10] / 100:.2f}%)'
+
+    def summary(self):
+        trigger = self.trigger
+        return (f'Presión {trigger.resource} {trigger.kind}: {trigger.stall // 1000} ms de atasco '
+                f'en {trigger.window // 1000} ms (avg10 {self.values[self.avg10] / 100:.2f}%)')
+
+    def email(self, manager, timestamp):
+        trigger = self.trigger
+        body = f"""
+ALERTA - ATASCO DE {trigger.resource.upper()} (PSI)
+=============================================
+
+Hola {manager},
+
+Las tareas del sistema han estado esperando por {trigger.resource} más tiempo del configurado:
+
+DETALLES:
+---------
+Timestamp:            {timestamp}
+Recurso:              {trigger.resource} ({trigger.kind})
+Umbral:               {trigger.stall // 1000} ms de atasco en {trigger.window // 1000} ms
+Presión (avg10):      {self.values[self.avg10] / 100:.2f}%
+Tiempo total:         {self.values[self.total]} µs
+
+Este es un mensaje automático del Agente SNMP.
+        """
+        return f"⚠️ ATASCO: {self.summary()}", body, f'Email de presión de {trigger.resource}'
+
+# Entrega a un destino de trapTargetTable: trap por el engine persistente o INFORM con --inform
+async def send_to_target(index, row, varBinds):
+    host, port = row['address'], row['port']
+    delivered = False
+    try:
+        if informer.enabled:
+            delivered = await informer.send(host, port, *varBinds)
+            if delivered:
+                print(f'✅ Inform acknowledged by {host}:{port}')
+            else:
+                print(f'❌ Inform not acknowledged by {host}:{port} after {informer.retries} retransmissions')
+            return delivered
+
+        errorIndication, errorStatus, errorIndex, _ = await notifier.send(host, port, *varBinds)
+        if errorIndication:
+            print(f'❌ Trap error ({host}:{port}): {errorIndication}')
+        elif errorStatus:
+            print(f'❌ SNMP error ({host}:{port}): {errorStatus.prettyPrint()}')
+        else:
+            print(f'✅ Trap sent successfully to {host}:{port}!')
+            delivered = True
+        return delivered
+
+    except Exception as e:
+        print(f'❌ Exception ({host}:{port}): {e}')
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        # También si el timeout del canal cancela la entrega: cuenta como fallo
+        trap_target_table.count(index, row, delivered)
+
+async def send_trap(alert):
+    """Envía la alerta a la vez a todos los destinos activos (en un reintento, sólo a los que fallaron)"""
+    targets = [(index, row) for index, row in trap_target_table.active() if index not in alert.delivered]
+    if not targets:
+        print('❌ No active trap targets')
+        return False
+
+    print(f'Sending {"INFORM" if informer.enabled else "TRAP"} to {len(targets)} target(s): {alert.describe()}')
+    varBinds = alert.varbinds()
+    results = await asyncio.gather(*(send_to_target(index, row, varBinds) for index, row in targets))
+    for (index, _), delivered in zip(targets, results):
+        if delivered:
+            alert.delivered.add(index)
+    return all(results)
+
+# Sesiones SMTP persistentes: conexión TLS y login una sola vez, reconexión si el servidor las cierra
+class SmtpPool:
+    def __init__(self, hostname=SMTP_SERVER, port=SMTP_PORT, use_tls=SMTP_USE_TLS,
+                 size=SMTP_POOL_SIZE, username=EMAIL_SENDER, password=EMAIL_PASSWORD):
+        self.hostname = hostname
+        self.port = port
+        self.use_tls = use_tls
+        self.size = size
+        self.username = username
+        self.password = password
+        self.idle = []          # Sesiones conectadas y libres
+        self.slots = None       # Semáforo con 'size' sesiones (se crea dentro del event loop)
+        self.connects = 0       # Conexiones (y logins) realizados
+
+    def configure(self, hostname, port, use_tls):
+        self.hostname = hostname
+        self.port = port
+        self.use_tls = use_tls
+
+    async def connect(self):
+        client = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, use_tls=self.use_tls)
+        await client.connect()
+        if self.username:
+            await client.login(self.username, self.password)
+        self.connects += 1
+        return client
+
+    async def send(self, msg):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.size)
+        async with self.slots:
+            client = self.idle.pop() if self.idle else None
+            try:
+                if client is None or not client.is_connected:
+                    client = await self.connect()
+                try:
+                    await client.send_message(msg)
+                except (aiosmtplib.errors.SMTPServerDisconnected, ConnectionError):
+                    # Sesión caducada (el servidor cerró la conexión ociosa): reconectar una vez
+                    client.close()
+                    client = await self.connect()
+                    await client.send_message(msg)
+            except BaseException:
+                if client is not None:
+                    client.close()
+                raise
+            self.idle.append(client)
+
+    async def close(self):
+        for client in self.idle:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+        self.idle.clear()
+
+smtp_pool = SmtpPool()
+
+# Mensaje de email para el manager actual
+def build_email(subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = EMAIL_SENDER
+    msg['To'] = mib_store.data['managerEmail']
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+async def deliver_email(msg, description):
+    """Envía el email por una sesión SMTP del pool"""
+    try:
+        await smtp_pool.send(msg)
+        print(f'{description} enviado a {msg["To"]}')
+        return True
 
     except aiosmtplib.errors.SMTPAuthenticationError as e:
         print("❌ Error autenticación SMTP: Verifica usuario y contraseña.")
@@ -458,32 +2498,1133 @@ Este es un mensaje automático del Agente SNMP.
         print(f'❌ Error enviando email: {e}')
         import traceback
         traceback.print_exc()
+    return False
+
+# Enviar email de alarma (umbral de CPU o fila de alarmTable)
+async def send_email(alert):
+    """Envía email de alarma con Gmail (SMTP_SSL)"""
+    manager = mib_store.data['manager']
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    subject, body, description = alert.email(manager, timestamp)
+    return await deliver_email(build_email(subject, body), description)
+
+# Enviar un único email con todas las alertas agrupadas en la ventana de resumen
+async def send_email_digest(alerts):
+    """Envía un email resumen; alerts es una lista de (datetime, (alerta,))"""
+    manager = mib_store.data['manager']
+    lines = '\n'.join(
+        f'{when.strftime("%Y-%m-%d %H:%M:%S")}   {alert.summary()}'
+        for when, (alert,) in alerts
+    )
+
+    body = f"""
+RESUMEN DE ALERTAS - UMBRALES SUPERADOS
+=======================================
+
+Hola {manager},
+
+Se han producido {len(alerts)} alertas de umbral:
+
+{lines}
+
+Este es un mensaje automático del Agente SNMP.
+        """
+
+    msg = build_email(f"⚠️ ALERTA: {len(alerts)} alertas de umbral (resumen)", body)
+    return await deliver_email(msg, f'Resumen de {len(alerts)} alarmas')
+
+# ===========================
+# Cola de notificaciones (entrega asíncrona de alertas)
+# ===========================
+
+class NotificationQueue:
+    """Cola acotada por canal (trap, email) con workers de entrega, timeouts y reintentos"""
+
+    def __init__(self, maxsize=NOTIFY_QUEUE_SIZE, retries=NOTIFY_RETRIES,
+                 backoff=NOTIFY_BACKOFF, backoff_max=NOTIFY_BACKOFF_MAX):
+        self.maxsize = maxsize
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.channels = {}  # nombre -> (coroutine de entrega, timeout)
+        self.queues = {}    # nombre -> asyncio.Queue de (coroutine de entrega, evento, intento)
+        self.workers = []
+        self.timers = set()         # Reintentos esperando su backoff y resúmenes esperando su ventana
+        self.retrying = {}          # Tarea de reintento -> (canal, coroutine de entrega, evento, intento)
+        self.in_flight = 0          # Entregas en curso en los workers
+        self.stopping = False       # Cerrando: los fallos se reintentan sin backoff
+        self.digests = {}           # nombre -> coroutine de entrega de un resumen
+        self.digest_windows = {}    # nombre -> segundos de agrupación (0 = sin resumen)
+        self.digest_pending = {}    # nombre -> [(datetime, evento), ...] aún sin enviar
+
+    def add_channel(self, name, deliver, timeout, deliver_digest=None):
+        self.channels[name] = (deliver, timeout)
+        if deliver_digest is not None:
+            self.digests[name] = deliver_digest
+
+    def set_digest_window(self, name, seconds):
+        self.digest_windows[name] = seconds
+
+    def start(self):
+        for name in self.channels:
+            self.queues[name] = asyncio.Queue(self.maxsize)
+            self.workers.append(asyncio.create_task(self.worker(name)))
+
+    # Al cerrar: los resúmenes abiertos y los reintentos en espera se encolan ya y se entrega lo
+    # pendiente durante NOTIFY_DRAIN_TIMEOUT como máximo; lo que quede se cuenta como descartado
+    async def stop(self, timeout=NOTIFY_DRAIN_TIMEOUT):
+        self.stopping = True
+        for name in list(self.digest_pending):
+            self.send_digest(name)
+        for task, retry in list(self.retrying.items()):
+            if task.cancel():   # Si ya ha terminado, el reintento ya está en la cola
+                self.put(*retry)
+        self.retrying = {}
+        pending = sum(queue.qsize() for queue in self.queues.values()) + self.in_flight
+        if pending:
+            print(f'Delivering {pending} pending notifications (up to {timeout}s)...')
+            try:
+                await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self.queues.values())),
+                                       timeout)
+            except asyncio.TimeoutError:
+                pass
+        dropped = sum(queue.qsize() for queue in self.queues.values()) + self.in_flight
+        if dropped:
+            print(f'\n⚠️  {dropped} notifications dropped at shutdown')
+            self.count('notifyDropped', dropped)
+
+        tasks = self.workers + list(self.timers)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.queues = {}
+        self.in_flight = 0
+        self.stopping = False
+        self.update_depth()
+
+    # Encolar un evento en todos los canales sin esperar (lo usa el muestreador)
+    def enqueue(self, *event):
+        for name, (deliver, _) in self.channels.items():
+            if self.digest_windows.get(name) and name in self.digests:
+                self.add_to_digest(name, event)
+            else:
+                self.put(name, deliver, event, 0)
+
+    def put(self, name, deliver, event, attempt):
+        queue = self.queues.get(name)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait((deliver, event, attempt))
+        except asyncio.QueueFull:
+            print(f'\n⚠️  Notification queue full: {name} event dropped')
+            self.count('notifyDropped')
+        self.update_depth()
+
+    def schedule(self, coro):
+        task = asyncio.create_task(coro)
+        self.timers.add(task)
+        task.add_done_callback(self.timers.discard)
+        return task
+
+    async def retry(self, delay, name, deliver, event, attempt):
+        await asyncio.sleep(delay)
+        self.put(name, deliver, event, attempt)
+
+    # Modo resumen: la primera alerta abre la ventana; al cerrarse se entregan todas juntas
+    def add_to_digest(self, name, event):
+        pending = self.digest_pending.setdefault(name, [])
+        pending.append((datetime.now(), event))
+        if len(pending) == 1:
+            self.schedule(self.flush_digest(name))
+        self.update_depth()
+
+    async def flush_digest(self, name):
+        await asyncio.sleep(self.digest_windows[name])
+        self.send_digest(name)
+
+    # Encolar las alertas agrupadas de un canal: una sola se entrega como alerta normal
+    def send_digest(self, name):
+        pending = self.digest_pending.pop(name, [])
+        if len(pending) == 1:
+            self.put(name, self.channels[name][0], pending[0][1], 0)
+        elif pending:
+            self.put(name, self.digests[name], (pending,), 0)
+
+    def count(self, key, n=1):
+        mib_store.data[key] = mib_store.data[key] + n
+        mib_registry.invalidate(key)
+
+    def update_depth(self):
+        depth = sum(queue.qsize() for queue in self.queues.values())
+        depth += sum(len(pending) for pending in self.digest_pending.values())
+        if mib_store.data['notifyQueueDepth'] != depth:
+            mib_store.data['notifyQueueDepth'] = depth
+            mib_registry.invalidate('notifyQueueDepth')
+
+    async def worker(self, name):
+        timeout = self.channels[name][1]
+        queue = self.queues[name]
+        while True:
+            deliver, event, attempt = await queue.get()
+            self.in_flight += 1
+            self.update_depth()
+            try:
+                delivered = await asyncio.wait_for(deliver(*event), timeout)
+            except asyncio.TimeoutError:
+                print(f'\n❌ {name} delivery timed out after {timeout}s')
+                delivered = False
+            except Exception as e:
+                print(f'\n❌ {name} delivery failed: {e}')
+                delivered = False
+
+            if delivered:
+                self.count('notifyDelivered')
+            elif attempt < self.retries and self.stopping:
+                self.put(name, deliver, event, attempt + 1)     # Cerrando: sin esperar el backoff
+            elif attempt < self.retries:
+                # Reintento con backoff exponencial, sin bloquear el worker
+                delay = min(self.backoff * 2 ** attempt, self.backoff_max)
+                print(f'Retrying {name} in {delay:.0f}s (attempt {attempt + 1}/{self.retries})')
+                task = self.schedule(self.retry(delay, name, deliver, event, attempt + 1))
+                self.retrying[task] = (name, deliver, event, attempt + 1)
+                task.add_done_callback(self.retrying.pop)
+            else:
+                self.count('notifyFailed')
+            self.in_flight -= 1
+            queue.task_done()
+
+notify_queue = NotificationQueue()
+notify_queue.add_channel('trap', send_trap, TRAP_TIMEOUT)
+notify_queue.add_channel('email', send_email, EMAIL_TIMEOUT, deliver_digest=send_email_digest)
+notify_queue.set_digest_window('email', EMAIL_DIGEST_WINDOW)
+
+# ===========================
+# Supresión de alertas (antes de la cola de notificaciones)
+# ===========================
+
+# Límite de notificaciones por evento: en cada ventana de alertRateWindow segundos se notifican
+# como mucho alertRateLimit repeticiones de un mismo evento; las demás se cuentan y, al cerrarse
+# la ventana, se envían juntas en una única notificación alertSummary
+class AlertSuppressor:
+    def __init__(self):
+        self.windows = {}   # clave del evento -> [fin de la ventana, notificadas, suprimidas, última suprimida]
+
+    def count(self, key, amount=1):
+        mib_store.data[key] = mib_store.data[key] + amount
+        mib_registry.invalidate(key)
+
+    # Alertas del tick 'now' que deben notificarse (incluidos los resúmenes de ventanas cerradas)
+    def filter(self, alerts, now):
+        passed = []
+        for key, (end, _, suppressed, last) in list(self.windows.items()):
+            if now >= end:
+                del self.windows[key]
+                if suppressed:
+                    passed.append(SummaryAlert(last, suppressed))
+                    self.count('alertSummaries')
+
+        limit = mib_store.data['alertRateLimit']
+        for alert in alerts:
+            if not limit:
+                passed.append(alert)
+                continue
+            window = self.windows.get(alert.key)
+            if window is None:
+                window = self.windows[alert.key] = [now + mib_store.data['alertRateWindow'], 0, 0, None]
+            if window[1] < limit:
+                window[1] += 1
+                passed.append(alert)
+            else:
+                window[2] += 1
+                window[3] = alert
+                print(f'\nSuppressed: {alert.describe()}')
+                self.count('alertSuppressed')
+        return passed
+
+alert_suppressor = AlertSuppressor()
+
+# ===========================
+# Recolectores de métricas (fuera del event loop)
+# ===========================
+
+# Función de recolección bloqueante (psutil, /proc) que se ejecuta en un thread del pool de
+# recolectores. Cada resultado se publica como un snapshot nuevo de sólo lectura: los responders
+# lo leen sin locks y nunca ven un snapshot a medio construir.
+class Collector:
+    def __init__(self, name, collect, interval=None):
+        self.name = name
+        self.collect = collect          # Función bloqueante -> dict con las métricas
+        self.interval = interval        # Segundos entre recolecciones (None: se refresca a demanda)
+        self.snapshot = MappingProxyType({})    # Último snapshot publicado
+        self.running = None             # Future de la recolección en curso
+        self.duration = 0.0             # Segundos que tardó la última recolección
+        self.shared = None              # SharedSnapshot en modo multiproceso
+        self.owner = None               # PID del proceso que recolecta (el supervisor)
+
+    def _collect(self):
+        start = time.monotonic()
+        snapshot = MappingProxyType(dict(self.collect()))
+        if self.shared is not None:
+            self.shared.publish(snapshot)
+        self.duration = time.monotonic() - start
+        return snapshot
+
+    # Snapshot actual: en los workers, el último que ha publicado el supervisor
+    def current(self):
+        if self.shared is not None and os.getpid() != self.owner:
+            return self.shared.load()
+        return self.snapshot
+
+    # Recoger en el executor y publicar; si ya hay una recolección en curso, se espera a esa
+    async def refresh(self, executor):
+        if self.running is None or self.running.done():
+            self.running = asyncio.get_running_loop().run_in_executor(executor, self._collect)
+        self.snapshot = await asyncio.shield(self.running)
+        return self.snapshot
+
+class CollectorSet:
+    def __init__(self):
+        self.collectors = {}
+        self.executor = None
+        self.tasks = set()
+
+    def add(self, name, collect, interval=None):
+        self.collectors[name] = Collector(name, collect, interval)
+
+    def snapshot(self, name):
+        return self.collectors[name].current()
+
+    # Pasar los snapshots a memoria compartida (antes de crear los workers)
+    def share(self):
+        for collector in self.collectors.values():
+            collector.shared = SharedSnapshot()
+            collector.owner = os.getpid()
+
+    async def refresh(self, name):
+        return await self.collectors[name].refresh(self.executor)
+
+    # Pool propio: un recolector lento no retrasa las escrituras del journal (executor por defecto)
+    def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=COLLECTOR_THREADS, thread_name_prefix='collector')
+        for collector in self.collectors.values():
+            if collector.interval is not None:
+                task = asyncio.get_running_loop().create_task(self.poll(collector))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def stop(self):
+        for task in list(self.tasks):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    # Recolección periódica sobre el reloj monotónico (sin deriva; los ticks perdidos se saltan)
+    async def poll(self, collector):
+        loop = asyncio.get_running_loop()
+        tick = loop.time()
+        while True:
+            try:
+                await collector.refresh(self.executor)
+            except Exception as e:
+                print(f'\nError in collector {collector.name}: {e}')
+            tick += collector.interval
+            now = loop.time()
+            if tick < now:
+                tick += math.ceil((now - tick) / collector.interval) * collector.interval
+            await asyncio.sleep(tick - now)
+
+# Snapshot de un recolector en memoria compartida: el supervisor lo serializa con pickle y los
+# workers lo deserializan una sola vez por versión (seqlock, como SharedMibData)
+class SharedSnapshot:
+    _header = struct.Struct('=QQ')  # (versión del seqlock, longitud del snapshot serializado)
+
+    def __init__(self, size=SHARED_SNAPSHOT_SIZE):
+        self.size = size
+        # mmap anónimo: las páginas sólo ocupan memoria cuando se escriben
+        self.buffer = mmap.mmap(-1, self._header.size + size)
+        self.cached = (0, MappingProxyType({}))     # (versión, snapshot) ya deserializado en este proceso
+
+    def publish(self, snapshot):
+        data = pickle.dumps(dict(snapshot), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.size:
+            raise ValueError('Snapshot too large for shared memory')
+        version = self._header.unpack_from(self.buffer, 0)[0]
+        self._header.pack_into(self.buffer, 0, version + 1, 0)
+        start = self._header.size
+        self.buffer[start:start + len(data)] = data
+        self._header.pack_into(self.buffer, 0, version + 2, len(data))
+
+    def load(self):
+        while True:
+            version, length = self._header.unpack_from(self.buffer, 0)
+            if version == self.cached[0]:
+                return self.cached[1]
+            if version & 1:
+                continue    # Publicación en curso
+            data = self.buffer[self._header.size:self._header.size + length]
+            if self._header.unpack_from(self.buffer, 0)[0] == version:
+                break
+        snapshot = MappingProxyType(pickle.loads(data))
+        self.cached = (version, snapshot)
+        return snapshot
+
+collectors = CollectorSet()
+
+# Columnas del snapshot de núcleos: un valor (0-100) por núcleo, en orden de núcleo
+CORE_COLUMNS = {2: 'coreUsage', 3: 'coreUser', 4: 'coreSystem', 5: 'coreIowait'}
+
+def percent_column(values):
+    return bytes(min(100, max(0, round(value))) for value in values)
+
+# Uso global y por núcleo a partir de una única pasada de cpu_times(percpu=True): cada porcentaje
+# es el delta de tiempos respecto a la pasada anterior. La referencia la guarda el propio recolector
+# y no psutil, que la guarda por thread: el recolector se ejecuta en cualquier thread del pool y
+# una muestra en un thread nuevo saldría a 0%.
+# Cada columna es un bytes independiente: leer una columna no toca las demás.
+CPU_BUSY_FIELDS = ('user', 'nice', 'system', 'irq', 'softirq', 'steal')
+CPU_GUEST_FIELDS = ('guest', 'guest_nice')     # Ya incluidos en user y nice (Linux)
+
+class CpuSampler:
+    def __init__(self):
+        self.last = None    # cpu_times(percpu=True) de la pasada anterior
+
+    def collect(self):
+        cores = psutil.cpu_times(percpu=True)
+        last, self.last = self.last or cores, cores
+        deltas = [{field: max(0.0, getattr(core, field) - getattr(before, field)) for field in core._fields}
+                  for core, before in zip(cores, last)]
+        totals = [sum(delta.values()) - sum(delta.get(field, 0.0) for field in CPU_GUEST_FIELDS)
+                  for delta in deltas]
+        busy = [sum(delta.get(field, 0.0) for field in CPU_BUSY_FIELDS) for delta in deltas]
+
+        def percent(values):
+            return percent_column(100 * value / total if total else 0.0 for value, total in zip(values, totals))
+
+        return {
+            'usage': int(100 * sum(busy) / sum(totals)) if sum(totals) else 0,
+            'coreUsage': percent(busy),
+            'coreUser': percent(delta['user'] + delta['nice'] for delta in deltas),
+            'coreSystem': percent(delta['system'] for delta in deltas),
+            'coreIowait': percent(delta.get('iowait', 0.0) for delta in deltas),
+        }
+
+def core_indexes():
+    return sequential_indexes(len(collectors.snapshot('cpu').get('coreUsage', b'')))
+
+# Columna 6 (cpuCoreAlarm): TruthValue, true(1) si el núcleo supera cpuThreshold
+def core_cell(column, index):
+    snapshot = collectors.snapshot('cpu')
+    usage = snapshot.get('coreUsage', b'')
+    if len(index) != 1 or not 1 <= index[0] <= len(usage):
+        return None
+    if column == 6:
+        return 1 if usage[index[0] - 1] > mib_store.data['cpuThreshold'] else 2
+    return snapshot[CORE_COLUMNS[column]][index[0] - 1]
+
+# Recolector de prueba que bloquea como una lectura lenta de /proc (--slow-collector)
+def collect_slow(seconds):
+    time.sleep(seconds)
+    return {'duration': seconds}
+
+# Valores de ifType (IANAifType) y de ifAdminStatus/ifOperStatus
+IF_TYPE_OTHER, IF_TYPE_ETHERNET, IF_TYPE_LOOPBACK = 1, 6, 24
+IF_UP, IF_DOWN = 1, 2
+
+# Una pasada de net_io_counters(pernic=True) y net_if_stats() para todas las interfaces.
+# Cada columna es una tupla en orden de ifIndex (el índice del kernel, estable entre lecturas).
+# psutil corrige el desbordamiento de los contadores del kernel: los valores sólo crecen.
+def collect_interfaces():
+    counters = psutil.net_io_counters(pernic=True)
+    stats = psutil.net_if_stats()
+    rows = sorted((index, name) for index, name in socket.if_nameindex() if name in counters)
+    io = [counters[name] for _, name in rows]
+    flags = [stats[name].flags.split(',') if name in stats else [] for _, name in rows]
+    speeds = [stats[name].speed if name in stats else 0 for _, name in rows]   # Mb/s
+    return {
+        'indexes': [(index,) for index, _ in rows],
+        'name': tuple(name for _, name in rows),
+        'type': tuple(IF_TYPE_LOOPBACK if 'loopback' in f else IF_TYPE_ETHERNET if 'broadcast' in f
+                      else IF_TYPE_OTHER for f in flags),
+        'mtu': tuple(stats[name].mtu if name in stats else 0 for _, name in rows),
+        'speed': tuple(min(speed * 1000000, 2**32 - 1) for speed in speeds),
+        'highSpeed': tuple(speeds),
+        'adminStatus': tuple(IF_UP if 'up' in f else IF_DOWN for f in flags),
+        'operStatus': tuple(IF_UP if 'running' in f else IF_DOWN for f in flags),
+        'inOctets': tuple(nic.bytes_recv for nic in io),
+        'inPkts': tuple(nic.packets_recv for nic in io),
+        'inDiscards': tuple(nic.dropin for nic in io),
+        'inErrors': tuple(nic.errin for nic in io),
+        'outOctets': tuple(nic.bytes_sent for nic in io),
+        'outPkts': tuple(nic.packets_sent for nic in io),
+        'outDiscards': tuple(nic.dropout for nic in io),
+        'outErrors': tuple(nic.errout for nic in io),
+    }
+
+# Índices de fila de una tabla por columnas cuyo snapshot guarda la lista ordenada 'indexes'
+def snapshot_indexes(name):
+    return collectors.snapshot(name).get('indexes', [])
+
+# Celda de una tabla por columnas (ifTable, hrSWRunTable, ...): posición del índice por búsqueda binaria
+def snapshot_cell(name, columns, column, index):
+    snapshot = collectors.snapshot(name)
+    indexes = snapshot.get('indexes', [])
+    pos = bisect.bisect_left(indexes, index)
+    if pos == len(indexes) or indexes[pos] != index:
+        return None
+    _, syntax, key = columns[column]
+    if key is None:
+        return index[0]
+    # ifTable lleva los contadores de 32 bits: vuelven a cero como en el kernel (los HC no)
+    return snapshot[key][pos] & 0xFFFFFFFF if syntax is v2c.Counter32 else snapshot[key][pos]
+
+# Valores de hrSWRunType y hrSWRunStatus (HOST-RESOURCES-MIB)
+HR_SW_RUN_OS, HR_SW_RUN_APPLICATION = 2, 4
+HR_SW_RUN_RUNNING, HR_SW_RUN_RUNNABLE, HR_SW_RUN_NOT_RUNNABLE, HR_SW_RUN_INVALID = range(1, 5)
+# Estado de /proc/<pid>/stat -> hrSWRunStatus (mismo criterio que net-snmp)
+PROC_STATUS = {'R': HR_SW_RUN_RUNNING, 'S': HR_SW_RUN_RUNNABLE, 'I': HR_SW_RUN_RUNNABLE,
+               'D': HR_SW_RUN_NOT_RUNNABLE, 'T': HR_SW_RUN_NOT_RUNNABLE, 't': HR_SW_RUN_NOT_RUNNABLE}
+
+# Recolector incremental de procesos. En cada pasada sólo se lee /proc/<pid>/stat (estado, tiempo
+# de CPU y memoria); nombre, ruta y parámetros se leen una vez por proceso, identificado por pid e
+# instante de arranque para no confundir un pid reutilizado. El uso de CPU de cada proceso es el
+# delta de utime+stime respecto a la pasada anterior (un proceso nuevo cuenta todo su tiempo).
+class ProcessSampler:
+    def __init__(self, top=TOP_CPU_COUNT, proc='/proc'):
+        self.top = top
+        self.proc = proc
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_kb = os.sysconf('SC_PAGE_SIZE') // 1024
+        self.static = {}    # (pid, arranque) -> (ruta, parámetros, hrSWRunType)
+        self.ticks = {}     # (pid, arranque) -> ticks de CPU en la pasada anterior
+        self.last = None    # Instante monotónico de la pasada anterior
+
+    # Ruta y parámetros desde /proc/<pid>/cmdline (vacío en los hilos del kernel)
+    def read_static(self, pid, name):
+        with open(f'{self.proc}/{pid}/cmdline', 'rb') as f:
+            argv = f.read().rstrip(b'\0').split(b'\0')
+        if argv == [b'']:
+            return name, '', HR_SW_RUN_OS
+        return (argv[0].decode(errors='replace')[:128],
+                b' '.join(argv[1:]).decode(errors='replace')[:128],
+                HR_SW_RUN_APPLICATION)
+
+    def collect(self):
+        now = time.monotonic()
+        static, ticks, rows, deltas = {}, {}, [], []
+        with os.scandir(self.proc) as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                pid = int(entry.name)
+                try:
+                    with open(f'{self.proc}/{pid}/stat', 'rb') as f:
+                        stat = f.read()
+                    # El nombre va entre paréntesis y puede contener espacios
+                    head, _, tail = stat.rpartition(b')')
+                    name = head.partition(b'(')[2].decode(errors='replace')[:64]
+                    fields = tail.split()
+                    key = (pid, fields[19])                         # starttime
+                    info = self.static.get(key) or self.read_static(pid, name)
+                except (OSError, IndexError):
+                    continue    # Proceso terminado entre el listado y la lectura
+                cpu = int(fields[11]) + int(fields[12])             # utime + stime
+                static[key] = info
+                ticks[key] = cpu
+                rows.append((pid, name, info, fields[0].decode(), cpu, int(fields[21]) * self.page_kb))
+                if self.last is not None and cpu > self.ticks.get(key, 0):
+                    deltas.append((cpu - self.ticks.get(key, 0), pid, name))
+        elapsed = now - self.last if self.last is not None else 0
+        self.static, self.ticks, self.last = static, ticks, now
+
+        rows.sort()
+        top = heapq.nlargest(self.top, deltas)
+        return {
+            'indexes': [(pid,) for pid, *_ in rows],
+            'name': tuple(row[1] for row in rows),
+            'path': tuple(row[2][0] for row in rows),
+            'parameters': tuple(row[2][1] for row in rows),
+            'type': tuple(row[2][2] for row in rows),
+            'status': tuple(PROC_STATUS.get(row[3], HR_SW_RUN_INVALID) for row in rows),
+            'cpu': tuple(min(row[4] * 100 // self.clock_ticks, 2**31 - 1) for row in rows),   # centisegundos
+            'mem': tuple(min(row[5], 2**31 - 1) for row in rows),                             # KB
+            # % de un núcleo durante la última ventana (puede superar 100 con varios hilos)
+            'top': tuple((pid, name, round(delta * 100 / (self.clock_ticks * elapsed)))
+                         for delta, pid, name in top) if elapsed else (),
+        }
+
+# Filas de topCpuTable: (pid, nombre, % de CPU) de mayor a menor consumo
+def top_processes():
+    return collectors.snapshot('processes').get('top', ())
+
+def top_cpu_cell(column, index):
+    top = top_processes()
+    if len(index) != 1 or not 1 <= index[0] <= len(top):
+        return None
+    return top[index[0] - 1][column - 2]
+
+# Índices estables por nombre (punto de montaje, dispositivo): un nombre conserva su índice mientras
+# el agente esté en marcha aunque aparezcan o desaparezcan otros, así que una fila de alarmTable
+# sigue vigilando el mismo disco. Los nombres nuevos se numeran en orden alfabético.
+class StableIndexes:
+    def __init__(self):
+        self.numbers = {}   # nombre -> índice
+
+    # (índice, nombre) de los nombres dados, en orden de índice
+    def assign(self, names):
+        for name in sorted(names):
+            if name not in self.numbers:
+                self.numbers[name] = len(self.numbers) + 1
+        return sorted((self.numbers[name], name) for name in names)
+
+# Porcentaje ocupado redondeado hacia arriba, como df (0 si no hay nada que ocupar)
+def used_percent(used, available):
+    return -(-used * 100 // (used + available)) if used + available else 0
+
+# Ocupación de los sistemas de ficheros montados en dispositivos (disk_partitions sin los virtuales)
+# con un statvfs por punto de montaje. Tamaño y ocupación van en unidades de asignación, como en
+# hrStorageTable; la unidad se duplica hasta que el tamaño cabe en un Integer32.
+class FilesystemSampler:
+    def __init__(self):
+        self.indexes = StableIndexes()
+
+    def collect(self):
+        partitions = {}
+        for partition in psutil.disk_partitions(all=False):
+            partitions.setdefault(partition.mountpoint, partition)
+        rows = []
+        for index, mountpoint in self.indexes.assign(partitions):
+            try:
+                st = os.statvfs(mountpoint)
+            except OSError:
+                continue    # Desmontado entre el listado y la lectura
+            units = st.f_frsize or st.f_bsize
+            while st.f_blocks * st.f_frsize // units > 2**31 - 1:
+                units *= 2
+            used = st.f_blocks - st.f_bfree
+            rows.append((index, partitions[mountpoint],
+                         units, st.f_blocks * st.f_frsize // units, used * st.f_frsize // units,
+                         used_percent(used, st.f_bavail), used_percent(st.f_files - st.f_ffree, st.f_ffree)))
+        return {
+            'indexes': [(row[0],) for row in rows],
+            'storageType': (HR_STORAGE_FIXED_DISK,) * len(rows),
+            'mountPoint': tuple(row[1].mountpoint for row in rows),
+            'device': tuple(row[1].device for row in rows),
+            'fsType': tuple(row[1].fstype for row in rows),
+            'units': tuple(row[2] for row in rows),
+            'size': tuple(row[3] for row in rows),
+            'used': tuple(row[4] for row in rows),
+            'usedPercent': tuple(row[5] for row in rows),
+            'inodesUsedPercent': tuple(row[6] for row in rows),
+        }
+
+# Contadores y tasas de E/S por dispositivo de bloque. disk_io_counters(perdisk=True) es una sola
+# lectura de /proc/diskstats para todos los dispositivos; las tasas son el delta respecto al snapshot
+# anterior entre el tiempo transcurrido, así que cada pasada es lineal en el número de dispositivos.
+class DiskIOSampler:
+    def __init__(self):
+        self.indexes = StableIndexes()
+        self.last = {}      # dispositivo -> contadores de la pasada anterior
+        self.time = None    # Instante monotónico de la pasada anterior
+
+    def collect(self):
+        now = time.monotonic()
+        counters = psutil.disk_io_counters(perdisk=True)
+        rows = self.indexes.assign(counters)
+        io = [counters[name] for _, name in rows]
+        last = [self.last.get(name) for _, name in rows]
+        elapsed = now - self.time if self.time is not None else 0
+        self.last, self.time = counters, now
+
+        # Delta por segundo de un campo (0 en la primera pasada y para los dispositivos nuevos)
+        def rate(field, scale=1):
+            return tuple(min(int(max(0, getattr(new, field, 0) - getattr(old, field, 0)) * scale / elapsed), 2**32 - 1)
+                         if old is not None and elapsed else 0
+                         for new, old in zip(io, last))
+
+        return {
+            'indexes': [(index,) for index, _ in rows],
+            'device': tuple(name for _, name in rows),
+            'readBytes': tuple(disk.read_bytes for disk in io),
+            'writeBytes': tuple(disk.write_bytes for disk in io),
+            'reads': tuple(disk.read_count for disk in io),
+            'writes': tuple(disk.write_count for disk in io),
+            'readBytesRate': rate('read_bytes'),
+            'writeBytesRate': rate('write_bytes'),
+            'readsRate': rate('read_count'),
+            'writesRate': rate('write_count'),
+            # busy_time en ms: % del tiempo con E/S en curso (sólo Linux y FreeBSD)
+            'busyPercent': tuple(min(100, busy) for busy in rate('busy_time', scale=0.1)),
+        }
+
+# CPU de cada cgroup v2 bajo 'root' (contenedores, servicios de systemd). cpu.stat y cpu.max de
+# cada cgroup se abren una vez y se releen con pread en cada pasada, sin recorrer el árbol ni abrir
+# ficheros; el árbol se recorre cada CGROUP_RESCAN_INTERVAL segundos para descubrir cgroups nuevos.
+# El uso se mide contra la cuota (cpu.max): un contenedor limitado a 1 CPU que la agota marca 100%
+# aunque el host esté casi parado.
+class CgroupSampler:
+    def __init__(self, root=CGROUP_ROOT, rescan_interval=CGROUP_RESCAN_INTERVAL):
+        self.root = root
+        self.rescan_interval = rescan_interval
+        self.rescan_at = None   # Instante monotónico del próximo recorrido del árbol
+        self.indexes = StableIndexes()
+        self.files = {}         # ruta del cgroup -> (fd de cpu.stat, fd de cpu.max o None)
+        self.last = {}          # ruta del cgroup -> cpu.stat de la pasada anterior
+        self.time = None        # Instante monotónico de la pasada anterior
+
+    # Rutas de todos los cgroups bajo la raíz ('/' es la propia raíz); vacío si no es cgroup v2
+    def walk(self):
+        if not os.path.exists(os.path.join(self.root, 'cgroup.controllers')):
+            return set()
+        found, pending = set(), [self.root]
+        while pending:
+            path = pending.pop()
+            relative = os.path.relpath(path, self.root)
+            found.add('/' if relative == '.' else '/' + relative)
+            try:
+                with os.scandir(path) as entries:
+                    pending.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue    # Cgroup borrado durante el recorrido
+        return found
+
+    def open(self, cgroup, name):
+        try:
+            return os.open(os.path.join(self.root, cgroup.lstrip('/'), name), os.O_RDONLY | os.O_CLOEXEC)
+        except OSError:
+            return None     # La raíz no tiene cpu.max; sin el controlador cpu no hay cpu.stat
+
+    def forget(self, cgroup):
+        for fd in self.files.pop(cgroup):
+            if fd is not None:
+                os.close(fd)
+
+    # Abrir los ficheros de los cgroups nuevos y cerrar los de los borrados
+    def rescan(self):
+        found = self.walk()
+        for cgroup in self.files.keys() - found:
+            self.forget(cgroup)
+        # Dos descriptores por cgroup: subir el límite blando hasta el duro si hace falta
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        needed = 2 * len(found) + 256
+        if soft != resource.RLIM_INFINITY and soft < needed:
+            limit = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+        for cgroup in found - self.files.keys():
+            stat = self.open(cgroup, 'cpu.stat')
+            if stat is not None:
+                self.files[cgroup] = (stat, self.open(cgroup, 'cpu.max'))
+
+    # cpu.stat como {campo: entero} y cpu.max como (cuota, periodo) en µs (cuota None = sin límite)
+    @staticmethod
+    def read(stat_fd, max_fd):
+        stat = {key.decode(): int(value) for key, value in
+                (line.split() for line in os.pread(stat_fd, 4096, 0).splitlines() if line)}
+        quota, period = os.pread(max_fd, 256, 0).split() if max_fd is not None else (b'max', b'100000')
+        return stat, None if quota == b'max' else int(quota), int(period)
+
+    def collect(self):
+        now = time.monotonic()
+        if self.rescan_at is None or now >= self.rescan_at:
+            self.rescan()
+            self.rescan_at = now + self.rescan_interval
+        elapsed = now - self.time if self.time is not None else 0
+        cpus = os.cpu_count() or 1
+        current, rows = {}, []
+        for index, cgroup in self.indexes.assign(self.files):
+            try:
+                stat, quota, period = self.read(*self.files[cgroup])
+            except (OSError, ValueError):
+                self.forget(cgroup)     # Cgroup borrado: ENODEV al releer
+                continue
+            current[cgroup] = stat
+            last = self.last.get(cgroup)
+
+            def delta(field):
+                return max(0, stat.get(field, 0) - last.get(field, 0)) if last is not None else 0
+
+            # Capacidad de la ventana en µs de CPU: la cuota o, sin límite, todos los núcleos del host
+            capacity = elapsed * 1e6 * (quota / period if quota else cpus)
+            periods = delta('nr_periods')
+            rows.append((index, cgroup,
+                         min(round(delta('usage_usec') / (elapsed * 1e4)), 2**31 - 1) if elapsed else 0,
+                         min(round(delta('usage_usec') * 100 / capacity), 2**31 - 1) if elapsed else 0,
+                         quota * 1000 // period if quota else 0,
+                         delta('nr_throttled') * 100 // periods if periods else 0,
+                         stat.get('nr_throttled', 0), stat.get('throttled_usec', 0), stat.get('usage_usec', 0)))
+        self.last, self.time = current, now
+        return {
+            'indexes': [(row[0],) for row in rows],
+            'path': tuple(row[1] for row in rows),
+            'usage': tuple(row[2] for row in rows),
+            'quotaUsage': tuple(row[3] for row in rows),
+            'quota': tuple(row[4] for row in rows),
+            'throttledPercent': tuple(row[5] for row in rows),
+            'nrThrottled': tuple(row[6] for row in rows),
+            'throttledUsec': tuple(row[7] for row in rows),
+            'usageUsec': tuple(row[8] for row in rows),
+        }
+
+cgroup_sampler = CgroupSampler()
+
+# Presión de CPU, memoria y E/S (PSI): los ficheros se abren una vez y se releen con pread,
+# así que cada muestra son tres lecturas sin open/close
+class PressureSampler:
+    def __init__(self, root=PRESSURE_ROOT):
+        self.root = root
+        self.files = None       # recurso -> fd (sin los recursos que el kernel no expone)
+
+    def open(self):
+        self.files = {}
+        for name in PSI_RESOURCES:
+            try:
+                self.files[name] = os.open(os.path.join(self.root, name), os.O_RDONLY | os.O_CLOEXEC)
+            except OSError:
+                continue    # Kernel sin PSI (o sin la línea de este recurso)
+
+    # Líneas 'some avg10=1.23 avg60=0.50 avg300=0.10 total=123456' -> {clave del snapshot: entero}
+    @staticmethod
+    def parse(name, data):
+        values = {}
+        for line in data.decode().splitlines():
+            kind, *fields = line.split()
+            for field in fields:
+                key, value = field.split('=')
+                values[pressure_key(name, kind, key)] = int(value) if key == 'total' else round(float(value) * 100)
+        return values
+
+    def collect(self):
+        if self.files is None:
+            self.open()
+        snapshot = {}
+        for name, fd in self.files.items():
+            snapshot.update(self.parse(name, os.pread(fd, 256, 0)))
+        return snapshot
+
+# Trigger de PSI: el kernel avisa cuando el recurso acumula 'stall' µs de atasco en 'window' µs
+class PressureTrigger:
+    def __init__(self, resource, kind, stall, window):
+        self.resource = resource
+        self.kind = kind
+        self.stall = stall
+        self.window = window
+        self.fd = None
+
+    def describe(self):
+        return f'{self.resource} {self.kind} stall {self.stall // 1000} ms in {self.window // 1000} ms'
+
+# Triggers de PSI: el poll de cada fd devuelve POLLPRI en cuanto se supera su umbral, sin muestrear.
+# El selector de asyncio sólo espera lectura/escritura (y anidar un epoll en el del loop consumiría
+# el evento al comprobarlo), así que un thread propio espera en un epoll con los fds de los triggers
+# y pasa los atascos al event loop
+class PressureMonitor:
+    def __init__(self, root=PRESSURE_ROOT):
+        self.root = root
+        self.triggers = []
+        self.epoll = None
+        self.armed = {}         # fd -> PressureTrigger
+        self.wakeup = None      # Pipe (lectura, escritura) que despierta al thread para pararlo
+        self.thread = None
+        self.loop = None
+        self.tasks = set()
+
+    def add(self, resource, kind, stall, window):
+        self.triggers.append(PressureTrigger(resource, kind, stall, window))
+
+    def start(self):
+        if not self.triggers:
+            return
+        self.epoll = select.epoll()
+        for trigger in self.triggers:
+            try:
+                trigger.fd = os.open(os.path.join(self.root, trigger.resource), os.O_RDWR | os.O_NONBLOCK | os.O_CLOEXEC)
+                os.write(trigger.fd, f'{trigger.kind} {trigger.stall} {trigger.window}\0'.encode())
+            except OSError as e:
+                print(f'Pressure trigger {trigger.describe()} not available: {e}')
+                # Sin CAP_SYS_RESOURCE el kernel sólo acepta ventanas múltiplo de 2 s
+                if e.errno == errno.EINVAL and trigger.window % 2000000:
+                    print('  Unprivileged PSI triggers need a window that is a multiple of 2000 ms')
+                if trigger.fd is not None:
+                    os.close(trigger.fd)
+                    trigger.fd = None
+                continue
+            self.epoll.register(trigger.fd, select.EPOLLPRI)
+            self.armed[trigger.fd] = trigger
+            print(f'Pressure trigger armed: {trigger.describe()}')
+        self.wakeup = os.pipe()
+        self.epoll.register(self.wakeup[0], select.EPOLLIN)
+        self.loop = asyncio.get_running_loop()
+        self.thread = threading.Thread(target=self.wait, name='pressure-triggers', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        os.write(self.wakeup[1], b'\0')
+        self.thread.join()
+        self.thread = None
+        for task in list(self.tasks):
+            task.cancel()
+        for fd in (*self.armed, *self.wakeup):
+            os.close(fd)
+        self.armed.clear()
+        self.epoll.close()
+        self.epoll = None
+
+    # Thread de espera: bloqueado en el kernel hasta que salta algún trigger (o hay que parar)
+    def wait(self):
+        while True:
+            fired = []
+            for fd, events in self.epoll.poll():
+                if fd == self.wakeup[0]:
+                    return
+                trigger = self.armed[fd]
+                if events & select.EPOLLERR:
+                    print(f'\nPressure trigger {trigger.describe()} removed by the kernel')
+                    self.epoll.unregister(fd)
+                    os.close(self.armed.pop(fd).fd)
+                elif events & select.EPOLLPRI:
+                    fired.append(trigger)
+            if fired:
+                self.loop.call_soon_threadsafe(self.stalled, fired)
+
+    # En el event loop: contar los atascos y notificarlos
+    def stalled(self, fired):
+        mib_store.data['pressureStallEvents'] += len(fired)
+        mib_registry.invalidate('pressureStallEvents')
+        task = self.loop.create_task(self.notify(fired))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    # Releer PSI en el momento del atasco y encolar las alertas (con la misma supresión que el resto)
+    async def notify(self, fired):
+        try:
+            snapshot = await collectors.refresh('pressure')
+        except Exception as e:
+            print(f'\nError in collector pressure: {e}')
+            snapshot = {}
+        alerts = [PressureAlert(trigger, snapshot) for trigger in fired]
+        for alert in alerts:
+            print(f'\nPRESSURE STALL: {alert.describe()}')
+        for alert in alert_suppressor.filter(alerts, asyncio.get_running_loop().time()):
+            notify_queue.enqueue(alert)
+
+pressure_monitor = PressureMonitor()
+
+collectors.add('cpu', CpuSampler().collect)
+collectors.add('interfaces', collect_interfaces, interval=IF_SAMPLE_INTERVAL)
+collectors.add('processes', ProcessSampler().collect, interval=PROC_SAMPLE_INTERVAL)
+collectors.add('filesystems', FilesystemSampler().collect, interval=FS_SAMPLE_INTERVAL)
+collectors.add('diskio', DiskIOSampler().collect, interval=DISK_SAMPLE_INTERVAL)
+collectors.add('cgroups', cgroup_sampler.collect, interval=CGROUP_SAMPLE_INTERVAL)
+collectors.add('pressure', PressureSampler().collect, interval=PRESSURE_SAMPLE_INTERVAL)
+
+# ===========================
+# Evaluación de alarmas (alarmTable y umbral de CPU)
+# ===========================
+
+# Estado de una regla con umbral ascendente y descendente (histéresis como en RMON): tras un
+# evento ascendente no hay otro hasta que el valor baja al umbral descendente, y al revés
+class AlarmRule:
+    def __init__(self, config=None):
+        self.config = config        # Fila con la que se creó el estado (si cambia, se empieza de cero)
+        self.sampled = False        # Ya se ha evaluado la primera muestra (alarmStartupAlarm)
+        self.rising_armed = True
+        self.falling_armed = True
+        self.previous = None        # Último valor leído (muestras delta)
+        self.due = 0.0              # Siguiente tick (loop.time()) en el que toca muestrear
+        self.pending = None         # Evento cuya condición aún no ha durado 'hold' segundos
+        self.pending_since = 0.0
+        self.held_back = 0          # Eventos descartados porque su condición duró menos de 'hold'
+
+    # Devuelve 'rising', 'falling' o None; con 'hold', sólo si la condición se mantiene ese tiempo
+    def check(self, value, rising, falling, startup, now=0.0, hold=0):
+        if not self.sampled:
+            # Primera muestra: sólo genera el evento que permita alarmStartupAlarm
+            self.sampled = True
+            self.rising_armed = value < rising or startup in (ALARM_STARTUP_RISING, ALARM_STARTUP_BOTH)
+            self.falling_armed = value > falling or startup in (ALARM_STARTUP_FALLING, ALARM_STARTUP_BOTH)
+        event = None
+        if value >= rising and self.rising_armed:
+            event = 'rising'
+        elif value <= falling and self.falling_armed:
+            event = 'falling'
+
+        if event != self.pending:
+            if self.pending is not None:
+                self.held_back += 1     # La condición desapareció antes de cumplir 'hold'
+            self.pending, self.pending_since = event, now
+        if event is None or now - self.pending_since < hold:
+            return None
+
+        self.pending = None
+        self.rising_armed = event == 'falling'
+        self.falling_armed = event == 'rising'
+        return event
+
+# Una única pasada por tick para todas las reglas: cada variable se lee una sola vez aunque la
+# vigilen varias filas, y no se crean tareas ni se espera nada por fila
+class AlarmEvaluator:
+    def __init__(self):
+        self.rules = {}                 # índice de alarmTable -> AlarmRule
+        self.cpu_rule = AlarmRule()     # Regla integrada: cpuUsage > cpuThreshold
+
+    # Valor numérico actual de un OID, o None si ya no existe
+    @staticmethod
+    def read(oid):
+        obj = mib_registry.get(oid)
+        if obj is None or obj.syntax not in ALARM_SAMPLE_SYNTAXES:
+            return None
+        return int(obj.read()), obj.syntax
+
+    # Evaluar todas las reglas en el tick 'now'; devuelve las alertas a encolar
+    def evaluate(self, now):
+        alerts = []
+        hold = mib_store.data['alertHoldTime']
+        cpu_usage, threshold = mib_store.data['cpuUsage'], mib_store.data['cpuThreshold']
+        # Histéresis: tras una alerta, la CPU debe bajar cpuThresholdHysteresis puntos para rearmarla
+        rearm = threshold - mib_store.data['cpuThresholdHysteresis']
+        event = self.cpu_rule.check(cpu_usage, threshold + 1, rearm, ALARM_STARTUP_RISING, now, hold)
+        if event == 'rising':
+            print(f'\nTHRESHOLD CROSSED: CPU {cpu_usage}% > {threshold}%')
+            alerts.append(CpuAlert(cpu_usage, threshold))
+        elif event == 'falling':
+            print(f'\nCPU back below threshold: {cpu_usage}% <= {rearm}%')
+
+        rows = alarm_table.current()
+        values = dict(alarm_table.values)
+        for index in list(self.rules):
+            if index not in rows or rows[index]['status'] != ROW_ACTIVE:
+                del self.rules[index]
+                values.pop(index, None)
+
+        reads = {}  # OID -> (valor, sintaxis) leído en esta pasada
+        for index, row in rows.items():
+            if row['status'] != ROW_ACTIVE:
+                continue
+            rule = self.rules.get(index)
+            if rule is None or rule.config != row:
+                rule = self.rules[index] = AlarmRule(row)
+            if now < rule.due:
+                continue
+            rule.due = now + row['interval']
+
+            oid = row['variable']
+            if oid not in reads:
+                reads[oid] = self.read(oid)
+            if reads[oid] is None:
+                continue
+            value, syntax = reads[oid]
+            if row['sampleType'] == ALARM_DELTA:
+                previous, rule.previous = rule.previous, value
+                if previous is None:
+                    continue    # La primera muestra delta sólo fija la referencia
+                value -= previous
+                if value < 0 and syntax is v2c.Counter32:
+                    value += 2**32  # El contador ha dado la vuelta
+            value = max(-2**31, min(2**31 - 1, value))
+            values[index] = value
+
+            event = rule.check(value, row['rising'], row['falling'], row['startup'], now, hold)
+            if event is not None:
+                alert = AlarmAlert(index, row, value, event == 'rising')
+                print(f'\nALARM {alert.describe()}')
+                alerts.append(alert)
+
+        alarm_table.publish_values(values)
+        held_back = self.cpu_rule.held_back + sum(rule.held_back for rule in self.rules.values())
+        if held_back:
+            self.cpu_rule.held_back = 0
+            for rule in self.rules.values():
+                rule.held_back = 0
+            alert_suppressor.count('alertHeldBack', held_back)
+        return alerts
+
+alarm_evaluator = AlarmEvaluator()
 
 # ===========================
 # CPU Monitoring (async)
 # ===========================
 
+# Ticks de muestreo sobre el reloj monotónico del loop: cada tick se programa a partir del
+# anterior (no de cuándo terminó el trabajo), así que el periodo no deriva
+class SampleScheduler:
+    def __init__(self):
+        self.tick = None        # Instante (loop.time()) del tick actual
+        self.changed = None     # asyncio.Event: cpuSampleInterval/cpuSampleAdaptive modificados por SET
+
+    def start(self):
+        self.changed = asyncio.Event()
+        self.tick = asyncio.get_running_loop().time()
+
+    # Retraso (s) con el que ha empezado el tick actual
+    def lag(self):
+        return max(0.0, asyncio.get_running_loop().time() - self.tick)
+
+    # Intervalo hasta la siguiente muestra; en modo adaptativo, más corto cerca del umbral y más largo en reposo
+    def interval(self, cpu_usage, threshold):
+        interval = mib_store.data['cpuSampleInterval']
+        if mib_store.data['cpuSampleAdaptive'] != 1:
+            return interval
+        if abs(cpu_usage - threshold) <= ADAPTIVE_NEAR_BAND:
+            return max(ADAPTIVE_MIN_INTERVAL, interval * ADAPTIVE_FAST_FACTOR)
+        if cpu_usage < ADAPTIVE_IDLE_LEVEL:
+            return interval * ADAPTIVE_IDLE_FACTOR
+        return interval
+
+    # Esperar al siguiente tick; si cambia la configuración, se reprograma desde el tick actual
+    async def wait(self, cpu_usage, threshold):
+        loop = asyncio.get_running_loop()
+        last = self.tick
+        while True:
+            interval = self.interval(cpu_usage, threshold)
+            self.tick = last + interval
+            now = loop.time()
+            if self.tick < now:
+                # Ticks perdidos (trabajo más largo que el intervalo): saltarlos en vez de recuperarlos en ráfaga
+                self.tick += math.ceil((now - self.tick) / interval) * interval
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), self.tick - now)
+            except asyncio.TimeoutError:
+                return
+
+    # Llamado tras un SET con los valores persistentes modificados
+    def notify(self, changes):
+        if self.changed is not None and ('cpuSampleInterval' in changes or 'cpuSampleAdaptive' in changes):
+            self.changed.set()
+
+sample_scheduler = SampleScheduler()
+
 async def cpu_sampler(snmpEngine):
     print('CPU sampler started')
-    psutil.cpu_percent(interval=None)  # Warm-up (la primera vez siempre da 0)
+    await collectors.refresh('cpu')    # Warm-up (la primera vez siempre da 0)
     await asyncio.sleep(0.1)           # Espera breve para valor real
+    sample_scheduler.start()
+    cpu_usage = threshold = 0
     while True:
         try:
-            cpu_usage = int(psutil.cpu_percent(interval=None))
+            mib_store.data['cpuSampleLag'] = int(sample_scheduler.lag() * 1000)
+            cpu_usage = (await collectors.refresh('cpu'))['usage']
             mib_store.data['cpuUsage'] = cpu_usage
+            cpu_history.add(cpu_usage, mib_store.get_sysuptime())
+            summary = cpu_history.summary()
+            for key, value in summary.items():
+                mib_store.data[key] = value
+            mib_registry.invalidate('cpuUsage', 'cpuSampleLag', *summary)
             threshold = mib_store.data['cpuThreshold']
 
-            if cpu_usage > threshold and not mib_store.above_threshold:
-                mib_store.above_threshold = True
-                print(f'\nTHRESHOLD CROSSED: CPU {cpu_usage}% > {threshold}%')
-                
-                # Enviar alarma (TRAP & Email)
-                await send_trap(cpu_usage, threshold)
-                await send_email(cpu_usage, threshold)
-                
-            elif cpu_usage <= threshold and mib_store.above_threshold:
-                mib_store.above_threshold = False
-                print(f'\nCPU back below threshold: {cpu_usage}% <= {threshold}%')
+            # Umbral de CPU y filas de alarmTable en una sola pasada; las alarmas que pasan la
+            # supresión (TRAP & Email) se encolan: la entrega no bloquea el muestreo
+            now = sample_scheduler.tick
+            for alert in alert_suppressor.filter(alarm_evaluator.evaluate(now), now):
+                notify_queue.enqueue(alert)
 
             print(f'CPU: {cpu_usage}% (threshold: {threshold}%)', end='\r')
 
@@ -496,57 +3637,58 @@ async def cpu_sampler(snmpEngine):
             import traceback
             traceback.print_exc()
             
-        await asyncio.sleep(5)
+        await sample_scheduler.wait(cpu_usage, threshold)
     print('CPU sampler stopped')
 
 # ===========================
 # Main Agent
 # ===========================
 
-async def main():
-    """Función principal del agente SNMP"""
-    print('=== Mini SNMP Agent Starting ===')
-    print(f'Base OID: {".".join(map(str, BASE_OID))}')
+# Socket UDP compartido entre workers: el kernel reparte los datagramas (SO_REUSEPORT)
+def reuse_port_socket(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('0.0.0.0', port))
+    sock.setblocking(False)
+    return sock
 
+def setup_engine(port, fast_path, reuse_port=False):
+    """Crea el SnmpEngine con transporte, comunidades, VACM y Command Responders"""
     snmpEngine = engine.SnmpEngine()
 
-    # Registrar observer para capturar securityName de cada petición
-    snmpEngine.observer.register_observer(
-        request_observer,
-        'rfc3412.receiveMessage:request'
-    )
-
     # Configurar el transporte UDP del agente (puerto estándar SNMP: 161)
-    config.add_transport(
-        snmpEngine,
-        udp.DOMAIN_NAME,
-        udp.UdpTransport().open_server_mode(('0.0.0.0', 161))
-    )
+    # Con fast path, los GET/GETNEXT v2c se responden antes de entrar en pysnmp
+    if fast_path:
+        transport = FastPathUdpTransport(max_message_size=max_response_size(snmpEngine))
+    else:
+        transport = udp.UdpTransport()
+    if reuse_port:
+        transport.open_server_mode(sock=reuse_port_socket(port))
+    else:
+        transport.open_server_mode(('0.0.0.0', port))
+    config.add_transport(snmpEngine, udp.DOMAIN_NAME, transport)
 
     snmpContext = context.SnmpContext(snmpEngine)
 
     # Registrar comunidades SNMPv1/2c (public = sólo lectura, private = lectura-escritura)
-    config.add_v1_system(snmpEngine, 'public-user', 'public')
-    config.add_v1_system(snmpEngine, 'private-user', 'private')
+    for community, security_name in COMMUNITIES.items():
+        config.add_v1_system(snmpEngine, security_name, community)
 
     # Control de Acceso Basado en Vistas (VACM)
-    # Añadir vistas que cubren System y nuestra rama de Empresa
-    config.add_vacm_view(snmpEngine, 'read-view', 'included', (1, 3, 6, 1, 2, 1, 1), '')
-    config.add_vacm_view(snmpEngine, 'write-view', 'included', (1, 3, 6, 1, 2, 1, 1), '')
-
-    # Añadir vista para nuestra MIB personalizada (lectura y escritura)
-    config.add_vacm_view(snmpEngine, 'read-view', 'included', BASE_OID, '')
-    config.add_vacm_view(snmpEngine, 'write-view', 'included', BASE_OID, '')
-
-    # Añadir vista que incluya los OIDs que pueden ir en una notificación
-    config.add_vacm_view(snmpEngine, 'notify-view', 'included', (1, 3, 6, 1, 2, 1, 1), '')
-    config.add_vacm_view(snmpEngine, 'notify-view', 'included', BASE_OID, '')
+    # Vistas de lectura, escritura y notificación que cubren System y nuestra rama de Empresa
+    for subtree in VIEW_SUBTREES:
+        config.add_vacm_view(snmpEngine, 'read-view', 'included', subtree, '')
+        config.add_vacm_view(snmpEngine, 'write-view', 'included', subtree, '')
+        config.add_vacm_view(snmpEngine, 'notify-view', 'included', subtree, '')
 
     # Vista "todo" que incluye internet (1.3.6.1)
     # config.add_vacm_view(snmpEngine, 'read-view', 'included', (1, 3, 6, 1), '')
     # config.add_vacm_view(snmpEngine, 'write-view', 'included', (1, 3, 6, 1), '')
     # config.add_vacm_view(snmpEngine, 'notify-view', 'included', (1, 3, 6, 1), '')
 
+    # Contexto por defecto (''), necesario para que VACM autorice las peticiones
+    config.add_context(snmpEngine, '')
+
     # Configurar grupos y accesos
     config.add_vacm_group(snmpEngine, 'public-group', 2, 'public-user')
     config.add_vacm_group(snmpEngine, 'private-group', 2, 'private-user')
@@ -559,13 +3701,36 @@ async def main():
     # Inicializr Command Responders con operaciones SNMP
     JsonGetCommandResponder(snmpEngine, snmpContext)
     JsonGetNextCommandResponder(snmpEngine, snmpContext)
+    JsonBulkCommandResponder(snmpEngine, snmpContext)
     JsonSetCommandResponder(snmpEngine, snmpContext)
 
-    print('Agent listening on UDP port 161')
-    print('Serving OIDs from MIB-II System (1.3.6.1.2.1.1) and Enterprise (1.3.6.1.4.1.28308)')
+    return snmpEngine, transport
+
+async def main(port=AGENT_PORT, fast_path=FAST_PATH):
+    """Función principal del agente SNMP"""
+    print('=== Mini SNMP Agent Starting ===')
+    print(f'Base OID: {".".join(map(str, BASE_OID))}')
+
+    snmpEngine, transport = setup_engine(port, fast_path)
+
+    print(f'Agent listening on UDP port {port}')
+    if fast_path:
+        print('Fast path enabled for v2c GET/GETNEXT')
+    print('Serving OIDs from MIB-II System (1.3.6.1.2.1.1), Interfaces (1.3.6.1.2.1.2, 1.3.6.1.2.1.31) and Enterprise (1.3.6.1.4.1.28308)')
     print('Communities: public (RO), private (RW)')
-    print(f'TRAP target: {TRAP_HOST}:{TRAP_PORT}')
-    print(f'SMTP server: {SMTP_SERVER}:{SMTP_PORT} (Gmail)')
+    targets = ', '.join(f'{row["address"]}:{row["port"]}' for _, row in trap_target_table.active())
+    print(f'{"INFORM" if informer.enabled else "TRAP"} targets: {targets or "none"}')
+    print(f'SMTP server: {smtp_pool.hostname}:{smtp_pool.port}')
+    if notify_queue.digest_windows.get('email'):
+        print(f'Email digest window: {notify_queue.digest_windows["email"]}s')
+
+    # Engine de notificaciones persistente para los traps y workers de entrega de alertas
+    notifier.open()
+    if informer.enabled:
+        await informer.open()
+    notify_queue.start()
+    collectors.start()
+    pressure_monitor.start()
 
     # Iniciar el muestreador de CPU y guardar la referencia
     sampler_task = asyncio.create_task(cpu_sampler(snmpEngine))
@@ -588,15 +3753,201 @@ async def main():
         except asyncio.CancelledError:
             print('CPU sampler cancelled')
 
-        # Guardar estado final
-        mib_store.save_to_json()
+        pressure_monitor.stop()
+        await collectors.stop()
+        await notify_queue.stop()
+        await smtp_pool.close()
+
+        # Guardar estado final (tras esperar la escritura write-behind en curso)
+        await mib_store.flush()
+        notifier.close()
+        informer.close()
+
+        if fast_path:
+            print(f'Fast path: {transport.handled} handled, {transport.forwarded} forwarded to pysnmp')
 
         # Cerrar dispatcher
         snmpEngine.transport_dispatcher.close_dispatcher()
         print('Agent stopped')
 
+# ===========================
+# Modo multiproceso (workers con SO_REUSEPORT)
+# ===========================
+
+async def worker_main(port, fast_path, ready):
+    """Worker: sólo atiende peticiones SNMP sobre el estado compartido"""
+    snmpEngine, transport = setup_engine(port, fast_path, reuse_port=True)
+    snmpEngine.transport_dispatcher.job_started(1)
+    print(f'Worker {os.getpid()} listening on UDP port {port}')
+    ready.release()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if fast_path:
+            print(f'Worker {os.getpid()} fast path: {transport.handled} handled, '
+                  f'{transport.forwarded} forwarded to pysnmp')
+        snmpEngine.transport_dispatcher.close_dispatcher()
+
+async def persistence_watcher():
+    """Guarda el JSON una sola vez por lote de SETs hechos en cualquier worker"""
+    saved = mib_store.shared.persist_counter()
+    while True:
+        await asyncio.sleep(PERSIST_POLL_INTERVAL)
+        pending = mib_store.shared.persist_counter()
+        if pending != saved:
+            saved = pending
+            sample_scheduler.notify(await mib_store.persist_shared())
+
+async def supervisor_main(pids):
+    """Supervisor: único muestreador de CPU (y alertas) y único proceso que persiste"""
+    notifier.open()
+    if informer.enabled:
+        await informer.open()
+    notify_queue.start()
+    collectors.start()
+    pressure_monitor.start()
+    sampler_task = asyncio.create_task(cpu_sampler(None))
+    persist_task = asyncio.create_task(persistence_watcher())
+
+    print(f'\n=== Agent running with {len(pids)} workers - Press Ctrl+C to quit ===\n')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for task in (sampler_task, persist_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        pressure_monitor.stop()
+        await collectors.stop()
+        await notify_queue.stop()
+        await smtp_pool.close()
+        notifier.close()
+        informer.close()
+
+def run_workers(port, fast_path, workers):
+    """Lanza N workers con fork y ejecuta el supervisor en el proceso padre"""
+    print('=== Mini SNMP Agent Starting (multi-process) ===')
+    print(f'Base OID: {".".join(map(str, BASE_OID))}')
+
+    # El estado pasa a memoria compartida antes del fork para que lo hereden todos
+    lock = multiprocessing.Lock()
+    mib_store.share(lock)
+    alarm_table.share(lock)
+    trap_target_table.share(lock)
+    cpu_history.share()
+    collectors.share()
+    ready = multiprocessing.Semaphore(0)
+
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                asyncio.run(worker_main(port, fast_path, ready))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        pids.append(pid)
+
+    # Esperar a que los workers arranquen: su pico de CPU no debe contar como primera muestra
+    for _ in pids:
+        ready.acquire(timeout=10)
+
+    print(f'Agent listening on UDP port {port} with {workers} workers (SO_REUSEPORT)')
+    if fast_path:
+        print('Fast path enabled for v2c GET/GETNEXT')
+    targets = ', '.join(f'{row["address"]}:{row["port"]}' for _, row in trap_target_table.active())
+    print(f'{"INFORM" if informer.enabled else "TRAP"} targets: {targets or "none"}')
+    print(f'SMTP server: {smtp_pool.hostname}:{smtp_pool.port}')
+    if notify_queue.digest_windows.get('email'):
+        print(f'Email digest window: {notify_queue.digest_windows["email"]}s')
+
+    try:
+        asyncio.run(supervisor_main(pids))
+    except KeyboardInterrupt:
+        print('\nShutting down...')
+    finally:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+        # Guardar estado final (una sola vez, desde el supervisor)
+        mib_store.save_to_json()
+        print('Agent stopped')
+
+def pressure_trigger(spec):
+    """Argumento de --pressure-trigger -> (recurso, tipo, µs de atasco, µs de ventana)"""
+    try:
+        name, kind, stall, window = spec.split(':')
+        stall, window = round(float(stall) * 1000), round(float(window) * 1000)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected RESOURCE:KIND:STALL_MS:WINDOW_MS, got {spec!r}')
+    if name not in PSI_RESOURCES or kind not in PSI_KINDS or not 0 < stall <= window:
+        raise argparse.ArgumentTypeError(f'invalid pressure trigger {spec!r}')
+    return name, kind, stall, window
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mini SNMP Agent')
+    parser.add_argument('--port', type=int, default=AGENT_PORT,
+                        help='UDP port to listen on (default: 161)')
+    parser.add_argument('--fast-path', action='store_true', default=FAST_PATH,
+                        help='answer v2c GET/GETNEXT without the full pysnmp pipeline')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='number of request worker processes sharing the port (SO_REUSEPORT)')
+    parser.add_argument('--smtp-server', default=SMTP_SERVER,
+                        help='SMTP server for alert emails (default: smtp.gmail.com)')
+    parser.add_argument('--smtp-port', type=int, default=SMTP_PORT,
+                        help='SMTP server port (default: 465)')
+    parser.add_argument('--smtp-no-tls', action='store_true',
+                        help='connect to the SMTP server without implicit TLS')
+    parser.add_argument('--email-digest', type=float, default=EMAIL_DIGEST_WINDOW,
+                        help='merge alert emails raised within this many seconds (0 = disabled)')
+    parser.add_argument('--inform', action='store_true',
+                        help='send alerts as acknowledged INFORMs (retransmitted until answered)')
+    parser.add_argument('--cgroup-root', default=CGROUP_ROOT,
+                        help='cgroup v2 hierarchy scanned for per-container CPU (default: /sys/fs/cgroup)')
+    parser.add_argument('--pressure-trigger', action='append', default=[], type=pressure_trigger,
+                        metavar='RESOURCE:KIND:STALL_MS:WINDOW_MS',
+                        help='notify when RESOURCE (cpu, memory, io) stalls KIND (some, full) tasks for '
+                             'STALL_MS within WINDOW_MS (PSI trigger; repeatable)')
+    parser.add_argument('--slow-collector', type=float, default=0, metavar='SECONDS',
+                        help='add a test collector that blocks for SECONDS on every run')
+    parser.add_argument('--slow-journal', type=float, default=0, metavar='SECONDS',
+                        help='simulate a slow disk: every journal fdatasync takes SECONDS longer')
+    args = parser.parse_args()
+
+    mib_store.load_from_json()  # Cargar estado JSON (y reaplicar el journal)
+
+    # SIGTERM (systemd, kill) cierra igual que Ctrl+C: se guarda el estado pendiente
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    smtp_pool.configure(args.smtp_server, args.smtp_port, not args.smtp_no_tls)
+    notify_queue.set_digest_window('email', args.email_digest)
+    informer.enabled = args.inform
+    cgroup_sampler.root = args.cgroup_root
+    for trigger in args.pressure_trigger:
+        pressure_monitor.add(*trigger)
+    if args.slow_collector > 0:
+        collectors.add('slow', lambda: collect_slow(args.slow_collector), interval=1.0)
+        print(f'Slow test collector enabled ({args.slow_collector}s per run)')
+    if args.slow_journal > 0:
+        mib_store.journal_delay = args.slow_journal
+        print(f'Slow journal enabled ({args.slow_journal}s per fdatasync)')
+
     try:
-        asyncio.run(main())
+        if args.workers > 1:
+            run_workers(args.port, args.fast_path, args.workers)
+        else:
+            asyncio.run(main(args.port, args.fast_path))
     except KeyboardInterrupt:
         print('\n👋 Goodbye!')
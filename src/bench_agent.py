@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# bench_agent.py - UDP load generator / benchmark for the SNMP agent
+
+import argparse
+import asyncio
+import json
+import random
+import struct
+import sys
+import time
+
+from pyasn1.codec.ber import encoder, decoder
+from pysnmp.proto.api import v2c
+
+
+# OIDs usados por defecto en cada tipo de petición
+SYS_DESCR = (1, 3, 6, 1, 2, 1, 1, 1, 0)
+SYS_LOCATION = (1, 3, 6, 1, 2, 1, 1, 6, 0)
+MIB2_SYSTEM = (1, 3, 6, 1, 2, 1, 1)
+WALK_ROOT = (1, 3, 6, 1)
+
+OPERATIONS = ('get', 'getnext', 'getbulk', 'set', 'walk')
+
+# request-id de relleno: siempre se codifica con 4 bytes, así que se puede
+# parchear en el mensaje ya codificado sin volver a pasar por pyasn1
+REQUEST_ID_PLACEHOLDER = 0x7f7f7f7f
+REQUEST_ID_BYTES = bytes([0x02, 0x04]) + struct.pack('>I', REQUEST_ID_PLACEHOLDER)
+REQUEST_ID_MIN = 0x01000000
+REQUEST_ID_MAX = 0x7ffffffe
+
+
+def encode_request(community, pdu_class, varBinds, request_id=REQUEST_ID_PLACEHOLDER,
+                   non_repeaters=0, max_repetitions=10):
+    """Encode a v2c request message with pysnmp/pyasn1"""
+    pdu = pdu_class()
+    if pdu_class is v2c.GetBulkRequestPDU:
+        v2c.apiBulkPDU.set_defaults(pdu)
+        v2c.apiBulkPDU.set_non_repeaters(pdu, non_repeaters)
+        v2c.apiBulkPDU.set_max_repetitions(pdu, max_repetitions)
+    else:
+        v2c.apiPDU.set_defaults(pdu)
+    v2c.apiPDU.set_request_id(pdu, request_id)
+    v2c.apiPDU.set_varbinds(pdu, varBinds)
+
+    msg = v2c.Message()
+    v2c.apiMessage.set_defaults(msg)
+    v2c.apiMessage.set_community(msg, community)
+    v2c.apiMessage.set_pdu(msg, pdu)
+    return encoder.encode(msg)
+
+
+class RequestTemplate:
+    """Pre-encoded request whose request-id is patched in place for every send"""
+
+    def __init__(self, payload):
+        self.offset = payload.index(REQUEST_ID_BYTES) + 2
+        self.payload = bytearray(payload)
+
+    def render(self, request_id):
+        struct.pack_into('>I', self.payload, self.offset, request_id)
+        return bytes(self.payload)
+
+
+def read_tlv_header(data, pos):
+    """Return (tag, length, value offset) of the BER TLV starting at pos"""
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7f
+        length = int.from_bytes(data[pos:pos + n], 'big')
+        pos += n
+    return tag, length, pos
+
+
+def parse_response_header(data):
+    """Minimal BER parse of a v2c response: (request-id, error-status)"""
+    _, _, pos = read_tlv_header(data, 0)          # Message SEQUENCE
+    _, length, pos = read_tlv_header(data, pos)   # version
+    pos += length
+    _, length, pos = read_tlv_header(data, pos)   # community
+    pos += length
+    _, _, pos = read_tlv_header(data, pos)        # Response-PDU
+    _, length, pos = read_tlv_header(data, pos)   # request-id
+    request_id = int.from_bytes(data[pos:pos + length], 'big', signed=True)
+    pos += length
+    _, length, pos = read_tlv_header(data, pos)   # error-status
+    error_status = int.from_bytes(data[pos:pos + length], 'big')
+    return request_id, error_status
+
+
+class ClientProtocol(asyncio.DatagramProtocol):
+    """One UDP socket with a single outstanding request at a time"""
+
+    def __init__(self):
+        self.transport = None
+        self.request_id = None
+        self.waiter = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            request_id, _ = parse_response_header(data)
+        except (IndexError, ValueError):
+            return
+        # Respuestas tardías de peticiones que ya expiraron se descartan
+        if request_id == self.request_id and self.waiter and not self.waiter.done():
+            self.waiter.set_result(data)
+
+    def error_received(self, exc):
+        if self.waiter and not self.waiter.done():
+            self.waiter.set_exception(exc)
+
+    async def request(self, payload, request_id, timeout):
+        self.request_id = request_id
+        self.waiter = asyncio.get_running_loop().create_future()
+        self.transport.sendto(payload)
+        try:
+            return await asyncio.wait_for(self.waiter, timeout)
+        finally:
+            self.request_id = None
+
+
+class OperationStats:
+    """Latency samples and counters of one benchmark phase"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.timeouts = 0
+        self.packets = 0
+
+    def percentile(self, sorted_latencies, pct):
+        # Percentil por rango más cercano
+        index = max(int(len(sorted_latencies) * pct / 100.0 + 0.5) - 1, 0)
+        return sorted_latencies[min(index, len(sorted_latencies) - 1)]
+
+    def report(self, elapsed):
+        ordered = sorted(self.latencies)
+        result = {
+            'requests': len(self.latencies) + self.errors + self.timeouts,
+            'completed': len(self.latencies),
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'packets': self.packets,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(self.latencies) / elapsed, 1) if elapsed else 0.0,
+            'latency_ms': None,
+        }
+        if ordered:
+            result['latency_ms'] = {
+                'min': round(ordered[0] * 1000, 3),
+                'mean': round(sum(ordered) / len(ordered) * 1000, 3),
+                'p50': round(self.percentile(ordered, 50) * 1000, 3),
+                'p99': round(self.percentile(ordered, 99) * 1000, 3),
+                'p999': round(self.percentile(ordered, 99.9) * 1000, 3),
+                'max': round(ordered[-1] * 1000, 3),
+            }
+        return result
+
+
+class Benchmark:
+    """Drives one operation type against the agent at a given rate and concurrency"""
+
+    def __init__(self, args):
+        self.args = args
+        self.target = (args.host, args.port)
+        self.templates = {
+            'get': RequestTemplate(encode_request(
+                args.community, v2c.GetRequestPDU, [(SYS_DESCR, v2c.null)])),
+            'getnext': RequestTemplate(encode_request(
+                args.community, v2c.GetNextRequestPDU, [(MIB2_SYSTEM, v2c.null)])),
+            'getbulk': RequestTemplate(encode_request(
+                args.community, v2c.GetBulkRequestPDU, [(WALK_ROOT, v2c.null)],
+                max_repetitions=args.max_repetitions)),
+        }
+
+    def build_set_template(self, value):
+        self.templates['set'] = RequestTemplate(encode_request(
+            self.args.write_community, v2c.SetRequestPDU,
+            [(SYS_LOCATION, v2c.OctetString(value))]))
+
+    async def open_socket(self):
+        loop = asyncio.get_running_loop()
+        _, protocol = await loop.create_datagram_endpoint(
+            ClientProtocol, remote_addr=self.target)
+        return protocol
+
+    async def single_request(self, protocol, payload, request_id):
+        data = await protocol.request(payload, request_id, self.args.timeout)
+        return parse_response_header(data)[1], data
+
+    async def walk(self, protocol, next_request_id):
+        """Full GETNEXT walk of the agent; returns number of packets used"""
+        oid = WALK_ROOT
+        packets = 0
+        while True:
+            request_id = next_request_id()
+            payload = encode_request(self.args.community, v2c.GetNextRequestPDU,
+                                     [(oid, v2c.null)], request_id=request_id)
+            error_status, data = await self.single_request(protocol, payload, request_id)
+            packets += 1
+            if error_status:
+                raise RuntimeError(f'errorStatus {error_status}')
+            msg, _ = decoder.decode(data, asn1Spec=v2c.Message())
+            pdu = v2c.apiMessage.get_pdu(msg)
+            name, val = v2c.apiPDU.get_varbinds(pdu)[0]
+            if isinstance(val, v2c.EndOfMibView) or tuple(name) <= oid:
+                return packets
+            oid = tuple(name)
+
+    async def worker(self, operation, stats, deadline, interval, start):
+        protocol = await self.open_socket()
+        request_id = random.randint(REQUEST_ID_MIN, REQUEST_ID_MAX)
+
+        def next_request_id():
+            nonlocal request_id
+            request_id = request_id + 1 if request_id < REQUEST_ID_MAX else REQUEST_ID_MIN
+            return request_id
+
+        # Planificación en lazo abierto: la latencia se mide desde el instante en que
+        # la petición debía salir, para no ocultar colas (coordinated omission)
+        scheduled = start
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if interval:
+                    if scheduled > now:
+                        await asyncio.sleep(scheduled - now)
+                    sent_at = scheduled
+                    scheduled += interval
+                else:
+                    sent_at = now
+
+                try:
+                    if operation == 'walk':
+                        stats.packets += await self.walk(protocol, next_request_id)
+                    else:
+                        rid = next_request_id()
+                        payload = self.templates[operation].render(rid)
+                        error_status, _ = await self.single_request(protocol, payload, rid)
+                        stats.packets += 1
+                        if error_status:
+                            stats.errors += 1
+                            continue
+                except asyncio.TimeoutError:
+                    stats.timeouts += 1
+                    continue
+                except (OSError, RuntimeError):
+                    stats.errors += 1
+                    continue
+                stats.latencies.append(time.perf_counter() - sent_at)
+        finally:
+            protocol.transport.close()
+
+    async def run_operation(self, operation):
+        stats = OperationStats()
+        concurrency = self.args.concurrency
+        # Cada worker envía a rate/concurrency peticiones por segundo
+        interval = concurrency / self.args.rate if self.args.rate else 0.0
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        await asyncio.gather(*[
+            self.worker(operation, stats, deadline,
+                        interval, start + (interval * i / concurrency))
+            for i in range(concurrency)
+        ])
+        return stats.report(time.perf_counter() - start)
+
+    async def read_set_value(self):
+        """Read sysLocation so the SET phase can restore it afterwards"""
+        protocol = await self.open_socket()
+        try:
+            payload = encode_request(self.args.community, v2c.GetRequestPDU,
+                                     [(SYS_LOCATION, v2c.null)], request_id=REQUEST_ID_MIN)
+            _, data = await self.single_request(protocol, payload, REQUEST_ID_MIN)
+            msg, _ = decoder.decode(data, asn1Spec=v2c.Message())
+            _, val = v2c.apiPDU.get_varbinds(v2c.apiMessage.get_pdu(msg))[0]
+            return bytes(val)
+        finally:
+            protocol.transport.close()
+
+    async def restore_set_value(self, value):
+        protocol = await self.open_socket()
+        try:
+            payload = encode_request(self.args.write_community, v2c.SetRequestPDU,
+                                     [(SYS_LOCATION, v2c.OctetString(value))],
+                                     request_id=REQUEST_ID_MIN)
+            await self.single_request(protocol, payload, REQUEST_ID_MIN)
+        finally:
+            protocol.transport.close()
+
+    async def run(self):
+        results = {}
+        for operation in self.args.ops:
+            original = None
+            if operation == 'set':
+                # El SET escribe el mismo valor que ya tiene sysLocation
+                original = await self.read_set_value()
+                self.build_set_template(original)
+            print(f'Running {operation} for {self.args.duration}s '
+                  f'(concurrency {self.args.concurrency}, '
+                  f'rate {self.args.rate or "unlimited"})...', file=sys.stderr, flush=True)
+            results[operation] = await self.run_operation(operation)
+            if original is not None:
+                await self.restore_set_value(original)
+        return {
+            'target': f'{self.args.host}:{self.args.port}',
+            'duration_s': self.args.duration,
+            'concurrency': self.args.concurrency,
+            'rate_rps': self.args.rate,
+            'timeout_s': self.args.timeout,
+            'max_repetitions': self.args.max_repetitions,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'operations': results,
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='UDP load generator for the mini SNMP agent')
+    parser.add_argument('--host', default='127.0.0.1', help='agent address')
+    parser.add_argument('--port', type=int, default=161, help='agent UDP port')
+    parser.add_argument('--community', default='public', help='read community')
+    parser.add_argument('--write-community', default='private', help='write community (SET)')
+    parser.add_argument('--ops', default='get,getnext,getbulk,set,walk',
+                        help=f'comma separated operations ({",".join(OPERATIONS)})')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per operation')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='target requests/s per operation (0 = as fast as possible)')
+    parser.add_argument('--concurrency', type=int, default=8, help='outstanding requests')
+    parser.add_argument('--timeout', type=float, default=1.0, help='per request timeout (s)')
+    parser.add_argument('--max-repetitions', type=int, default=25, help='GETBULK max-repetitions')
+    parser.add_argument('--output', help='write JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    args.ops = [op.strip() for op in args.ops.split(',') if op.strip()]
+    unknown = [op for op in args.ops if op not in OPERATIONS]
+    if unknown:
+        parser.error(f'unknown operations: {", ".join(unknown)}')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be >= 1')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(Benchmark(args).run())
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Report written to {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
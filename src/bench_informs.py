@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# bench_informs.py - Benchmark de INFORMs: una corrutina con temporizador por INFORM (pysnmp) vs. rueda de retransmisiones
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import time
+
+from pysnmp.entity import engine
+from pysnmp.hlapi.v3arch.asyncio import (
+    send_notification,
+    CommunityData,
+    UdpTransportTarget,
+    ContextData,
+    ObjectIdentity,
+    ObjectType,
+)
+
+import agent_AnaDaniel as agent   # Sin cargar mib_state.* (eso sólo ocurre al arrancar el agente)
+
+
+class InformReceiver(asyncio.DatagramProtocol):
+    """Confirma los INFORMs devolviendo la misma PDU como Response; descarta una fracción 'loss'"""
+
+    def __init__(self, loss, seed):
+        self.loss = loss
+        self.seed = seed
+        self.reset()
+
+    # Mismo patrón de pérdidas para cada modo
+    def reset(self):
+        self.random = random.Random(self.seed)
+        self.received = 0
+        self.dropped = 0
+        self.request_ids = set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # Buffer grande: las ráfagas de miles de INFORMs no deben perderse en el propio socket
+        transport.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+
+    def datagram_received(self, data, addr):
+        # Saltar version y community: la etiqueta de la PDU pasa de InformRequest a Response
+        _, pos, _ = agent.ber_read(data, 0)
+        _, _, pos = agent.ber_read(data, pos)
+        _, _, pdu = agent.ber_read(data, pos)
+        if data[pdu] != agent.INFORM_PDU_TAG:
+            return
+        _, start, end = agent.ber_read(data, agent.ber_read(data, pdu)[1])
+        self.received += 1
+        self.request_ids.add(data[start:end])
+        if self.random.random() < self.loss:
+            self.dropped += 1
+            return
+        self.transport.sendto(data[:pdu] + bytes([agent.RESPONSE_PDU_TAG]) + data[pdu + 1:], addr)
+
+
+async def per_inform_coroutine(args):
+    """pysnmp: cada INFORM lleva su propio temporizador de retransmisión en el engine"""
+    informEngine = engine.SnmpEngine()
+    target = await UdpTransportTarget.create((args.host, args.port), timeout=agent.INFORM_TIMEOUT,
+                                             retries=agent.INFORM_RETRIES)
+    community = CommunityData('private', mpModel=1)
+    context = ContextData()
+    slots = asyncio.Semaphore(args.max_pending)
+    in_flight = [0]
+
+    async def send(varBinds):
+        async with slots:
+            in_flight[0] += 1
+            try:
+                errorIndication, errorStatus, _, _ = await send_notification(
+                    informEngine, community, target, context, 'inform',
+                    *[ObjectType(ObjectIdentity(oid), value) for oid, value in varBinds])
+                return not errorIndication and not errorStatus
+            finally:
+                in_flight[0] -= 1
+
+    try:
+        return await run_mode(send, lambda: in_flight[0], args)
+    finally:
+        informEngine.close_dispatcher()
+
+
+async def timer_wheel(args):
+    """Agente: INFORMs codificados a mano, retransmisiones de todos en una sola TimerWheel"""
+    informer = agent.InformOriginator(max_pending=args.max_pending)
+    await informer.open()
+
+    async def send(varBinds):
+        return await informer.send(args.host, args.port, *varBinds)
+
+    try:
+        report = await run_mode(send, lambda: len(informer.pending), args)
+        report['retransmissions'] = informer.retransmitted
+        return report
+    finally:
+        informer.close()
+
+
+async def run_mode(send, in_flight, args):
+    varBinds = agent.trap_varbinds(90, 80)
+    peak = 0
+
+    async def sample_in_flight():
+        nonlocal peak
+        while True:
+            peak = max(peak, in_flight())
+            await asyncio.sleep(0.005)
+
+    sampler = asyncio.create_task(sample_in_flight())
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    results = await asyncio.gather(*(send(varBinds) for _ in range(args.count)))
+    cpu = time.process_time() - cpu_start
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+
+    acked = sum(1 for result in results if result)
+    return {
+        'sent': args.count,
+        'acked': acked,
+        'failed': args.count - acked,
+        'peak_in_flight': peak,
+        'elapsed_s': round(elapsed, 3),
+        'cpu_s': round(cpu, 3),
+        'informs_per_s': round(args.count / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    transport, receiver = await loop.create_datagram_endpoint(
+        lambda: InformReceiver(args.loss, args.seed), local_addr=(args.host, args.port))
+    report = {}
+    try:
+        for name, mode in (('per_inform_coroutine', per_inform_coroutine), ('timer_wheel', timer_wheel)):
+            # Vaciar el socket del receptor: lo que quede del modo anterior no debe contar
+            await asyncio.sleep(1.0)
+            receiver.reset()
+            report[name] = await mode(args)
+            # Lo que ve el receptor (el resto lo ha perdido el socket al desbordarse)
+            report[name]['received'] = receiver.received
+            report[name]['received_retransmissions'] = receiver.received - len(receiver.request_ids)
+            report[name]['dropped'] = receiver.dropped
+    finally:
+        transport.close()
+
+    before = report['per_inform_coroutine']['informs_per_s']
+    after = report['timer_wheel']['informs_per_s']
+    report['speedup'] = round(after / before, 2) if before else None
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='INFORM retransmission benchmark for the mini SNMP agent',
+        epilog='Safe to run next to a running agent: the agent state (mib_state.*) is not touched.')
+    parser.add_argument('--host', default='127.0.0.1', help='inform receiver address (local)')
+    parser.add_argument('--port', type=int, default=16163, help='inform receiver UDP port')
+    parser.add_argument('--count', type=int, default=5000, help='informs sent per mode')
+    parser.add_argument('--max-pending', type=int, default=2000,
+                        help='unacknowledged informs in flight at once')
+    parser.add_argument('--loss', type=float, default=0.1,
+                        help='fraction of datagrams the receiver drops (forces retransmissions)')
+    parser.add_argument('--seed', type=int, default=1, help='seed for the receiver drop pattern')
+    parser.add_argument('--output', help='write JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+    if args.count < 1:
+        parser.error('--count must be >= 1')
+    if args.max_pending < 1:
+        parser.error('--max-pending must be >= 1')
+    if not 0 <= args.loss < 1:
+        parser.error('--loss must be in [0, 1)')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Report written to {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
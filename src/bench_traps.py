@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# bench_traps.py - Benchmark de envío de traps: engine por trap vs. engine persistente
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from pysnmp.entity import engine
+from pysnmp.hlapi.v3arch.asyncio import (
+    send_notification,
+    CommunityData,
+    UdpTransportTarget,
+    ContextData,
+    ObjectIdentity,
+    ObjectType,
+)
+
+import agent_AnaDaniel as agent
+
+# Importar el agente no carga ni escribe mib_state.json/mib_state.journal (sólo lo hace al arrancar)
+STATE_NOTE = ('Importing the agent module does not load or write mib_state.json/mib_state.journal, '
+              'so the benchmark can run in the directory of a running agent.')
+
+
+class TrapReceiver(asyncio.DatagramProtocol):
+    """Cuenta los traps recibidos (no los decodifica)"""
+
+    def __init__(self):
+        self.received = 0
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+
+
+async def per_trap_engine(host, port, varBinds):
+    """Envío anterior: engine, transporte y resolución de dirección nuevos en cada trap"""
+    trapEngine = engine.SnmpEngine()
+    try:
+        return await send_notification(
+            trapEngine,
+            CommunityData('private', mpModel=1),
+            await UdpTransportTarget.create((host, port)),
+            ContextData(),
+            'trap',
+            *[ObjectType(ObjectIdentity(oid), value) for oid, value in varBinds]
+        )
+    finally:
+        trapEngine.close_dispatcher()
+
+
+async def persistent_engine(host, port, varBinds):
+    """Envío actual: NotificationOriginator del agente con destino cacheado"""
+    return await agent.notifier.send(host, port, *varBinds)
+
+
+async def run_mode(send, args, receiver):
+    varBinds = agent.trap_varbinds(90, 80)
+    receiver.received = 0
+    errors = 0
+
+    start = time.perf_counter()
+    for _ in range(args.count):
+        errorIndication, errorStatus, _, _ = await send(args.host, args.port, varBinds)
+        if errorIndication or errorStatus:
+            errors += 1
+    elapsed = time.perf_counter() - start
+
+    # Dar tiempo a que lleguen los últimos datagramas
+    await asyncio.sleep(0.2)
+    return {
+        'sent': args.count,
+        'errors': errors,
+        'received': receiver.received,
+        'elapsed_s': round(elapsed, 3),
+        'traps_per_s': round(args.count / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    transport, receiver = await loop.create_datagram_endpoint(
+        TrapReceiver, local_addr=(args.host, args.port))
+    try:
+        report = {'per_trap_engine': await run_mode(per_trap_engine, args, receiver)}
+        agent.notifier.open()
+        report['persistent_engine'] = await run_mode(persistent_engine, args, receiver)
+        agent.notifier.close()
+    finally:
+        transport.close()
+
+    before = report['per_trap_engine']['traps_per_s']
+    after = report['persistent_engine']['traps_per_s']
+    report['speedup'] = round(after / before, 2) if before else None
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Trap sending benchmark for the mini SNMP agent',
+                                     epilog=STATE_NOTE)
+    parser.add_argument('--host', default='127.0.0.1', help='trap receiver address (local)')
+    parser.add_argument('--port', type=int, default=16162, help='trap receiver UDP port')
+    parser.add_argument('--count', type=int, default=200, help='traps sent per mode')
+    parser.add_argument('--output', help='write JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+    if args.count < 1:
+        parser.error('--count must be >= 1')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Report written to {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
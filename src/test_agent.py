@@ -16,16 +16,23 @@ test_results = {
     'get': {'passed': 0, 'total': 0},
     'getnext': {'passed': 0, 'total': 0},
     'walk': {'passed': 0, 'total': 0, 'oids': 0},
+    'getbulk': {'passed': 0, 'total': 0},
     'set_success': {'passed': 0, 'total': 0},
     'set_failure': {'passed': 0, 'total': 0},
     'access_control': {'passed': 0, 'total': 0},
     'cpu_sampler': {'passed': 0, 'total': 0},
     'persistence': {'passed': 0, 'total': 0},
-    'trap': {'passed': 0, 'total': 0}
+    'collectors': {'passed': 0, 'total': 0},
+    'fast_path': {'passed': 0, 'total': 0},
+    'workers': {'passed': 0, 'total': 0},
+    'trap': {'passed': 0, 'total': 0},
+    'notify_queue': {'passed': 0, 'total': 0},
+    'alarms': {'passed': 0, 'total': 0},
+    'email': {'passed': 0, 'total': 0}
 }
 
-async def test_get(oid, description=''):
-    """Test GET operation"""
+async def test_get(oid, description='', expected=None):
+    """Test GET operation (optionally checking the returned value)"""
     test_results['get']['total'] += 1
     try:
         errorIndication, errorStatus, errorIndex, varBinds = await get_cmd(
@@ -44,6 +51,9 @@ async def test_get(oid, description=''):
             return False
         else:
             name, val = varBinds[0]
+            if expected is not None and val.prettyPrint() != expected:
+                print(f'✗ GET {description or oid}: expected {expected}, got {val.prettyPrint()}')
+                return False
             print(f'✓ GET {description or oid}: {val.prettyPrint()}')
             test_results['get']['passed'] += 1
             return True
@@ -141,6 +151,36 @@ async def test_walk(oid, description=''):
         return False
 
 
+async def test_getbulk(non_repeaters, max_repetitions, oids, expected, description=''):
+    """Test GETBULK operation (non-repeaters / max-repetitions)"""
+    test_results['getbulk']['total'] += 1
+    try:
+        errorIndication, errorStatus, errorIndex, varBinds = await bulk_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            non_repeaters, max_repetitions,
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids]
+        )
+        
+        if errorIndication or errorStatus:
+            print(f'✗ GETBULK {description}: {errorIndication or errorStatus.prettyPrint()}')
+            return False
+        
+        names = [str(name) for name, val in varBinds]
+        if names[:len(expected)] != expected:
+            print(f'✗ GETBULK {description}: unexpected OIDs {names}')
+            return False
+        
+        print(f'✓ GETBULK {description}: {len(varBinds)} varbinds')
+        test_results['getbulk']['passed'] += 1
+        return True
+    except Exception as e:
+        print(f'✗ GETBULK {description}: Connection error - {e}')
+        return False
+
+
 async def test_cpu_sampler():
     """Test CPU sampler periodic updates (2.7.6)"""
     print('\n--- CPU Sampler Test (2.7.6) ---')
@@ -181,11 +221,240 @@ async def test_cpu_sampler():
         print(f'✗ CPU sampler test failed: {e}')
         return False
 
+
+async def read_cpu_history():
+    """Leer los escalares de resumen y las filas de cpuHistoryTable"""
+    _, _, _, varBinds = await get_cmd(
+        SnmpEngine(),
+        CommunityData('public'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        *[ObjectType(ObjectIdentity(f'1.3.6.1.4.1.28308.1.{column}.0')) for column in range(9, 14)]
+    )
+    summary = [int(val) for name, val in varBinds]
+
+    rows = {}
+    async for (errorIndication, errorStatus, errorIndex, varBinds) in walk_cmd(
+        SnmpEngine(),
+        CommunityData('public'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        ObjectType(ObjectIdentity('1.3.6.1.4.1.28308.1.14')),
+        lexicographicMode=False
+    ):
+        if errorIndication or errorStatus:
+            raise RuntimeError(errorIndication or errorStatus.prettyPrint())
+        for name, val in varBinds:
+            column, index = map(int, str(name).split('.')[-2:])
+            rows.setdefault(index, {})[column] = int(val)
+    return summary, rows
+
+
+async def test_cpu_history():
+    """Test CPU history ring buffer: averages, min/max and history table"""
+    print('\n--- CPU History Test ---')
+    test_results['cpu_sampler']['total'] += 1
+
+    try:
+        # Repetir si entra una muestra nueva entre la lectura de los escalares y la tabla
+        for _ in range(3):
+            summary, rows = await read_cpu_history()
+            if (await read_cpu_history())[0] == summary:
+                break
+        avg1, avg5, avg15, low, high = summary
+        usage = [row[2] for index, row in sorted(rows.items())]
+        times = [row[3] for index, row in sorted(rows.items())]
+        print(f'  Averages 1/5/15 min: {avg1}/{avg5}/{avg15}%, min {low}%, max {high}%')
+        print(f'  History: {len(rows)} samples {usage}')
+
+        if len(rows) < 2:
+            print('✗ Expected at least 2 samples in cpuHistoryTable')
+            return False
+        if sorted(rows) != list(range(min(rows), max(rows) + 1)) or times != sorted(times):
+            print('✗ History rows are not consecutive samples in time order')
+            return False
+        if (low, high) != (min(usage), max(usage)):
+            print(f'✗ cpuUsageMin/Max do not match the history ({min(usage)}/{max(usage)})')
+            return False
+        if not low <= avg1 <= high or not low <= avg15 <= high:
+            print('✗ Averages outside the min/max range')
+            return False
+        # Con menos de un minuto de muestras, todas las medias cubren el historial completo
+        if len(rows) < 12 and not avg1 == avg5 == avg15 == round(sum(usage) / len(usage)):
+            print('✗ Averages do not match the history')
+            return False
+
+        print('✓ CPU history table consistent with averages and min/max')
+        test_results['cpu_sampler']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ CPU history test failed: {e}')
+        return False
+
+
+
+async def test_cpu_history_windows():
+    """Test cpuLoadAvg5/15 cover their whole window with 1 s samples (more than CPU_HISTORY_SIZE)"""
+    print('\n--- CPU History Windows Test ---')
+    test_results['cpu_sampler']['total'] += 1
+
+    try:
+        # Importar el agente no carga ni escribe su estado: se prueba el ring buffer directamente
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from agent_AnaDaniel import CpuHistory, CPU_HISTORY_SIZE
+
+        # 600 s al 100% y 300 s al 0%, una muestra por segundo (900 muestras > CPU_HISTORY_SIZE)
+        history = CpuHistory()
+        now = 0.0
+        for value in [100] * 600 + [0] * 300:
+            now += 1.0
+            history.add(value, int(now * 100), now=now)
+        summary = history.summary()
+        averages = (summary['cpuLoadAvg1'], summary['cpuLoadAvg5'], summary['cpuLoadAvg15'])
+        print(f'  Averages 1/5/15 min: {averages[0]}/{averages[1]}/{averages[2]}% '
+              f'({len(history.indexes())} rows in cpuHistoryTable)')
+
+        if averages != (0, 0, 67):
+            print('✗ Expected 0/0/67%: the 15 min average must include the 600 s at 100%')
+            return False
+        if len(history.indexes()) != CPU_HISTORY_SIZE:
+            print(f'✗ cpuHistoryTable should keep {CPU_HISTORY_SIZE} rows')
+            return False
+
+        print('✓ Averages cover their full window at 1 s sampling')
+        test_results['cpu_sampler']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ CPU history windows test failed: {e}')
+        return False
+
+async def test_cpu_core_table():
+    """Test per-core CPU table rows and single-column GETBULK"""
+    print('\n--- CPU Core Table Test ---')
+    test_results['cpu_sampler']['total'] += 1
+    entry = '1.3.6.1.4.1.28308.1.18.1'
+    cores = os.cpu_count()
+
+    try:
+        # GETBULK de una sola columna: devuelve cpuCoreUsage de todos los núcleos en orden
+        errorIndication, errorStatus, errorIndex, varBinds = await bulk_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            0, cores,
+            ObjectType(ObjectIdentity(f'{entry}.2'))
+        )
+        if errorIndication or errorStatus:
+            print(f'✗ GETBULK cpuCoreUsage: {errorIndication or errorStatus.prettyPrint()}')
+            return False
+        names = [str(name) for name, val in varBinds]
+        if names != [f'{entry}.2.{core}' for core in range(1, cores + 1)]:
+            print(f'✗ Unexpected cpuCoreUsage column: {names}')
+            return False
+
+        # Cada fila en una sola petición (todas sus columnas salen del mismo snapshot)
+        _, _, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            ObjectType(ObjectIdentity('1.3.6.1.4.1.28308.1.4.0'))
+        )
+        threshold = int(varBinds[0][1])
+        for core in range(1, cores + 1):
+            _, errorStatus, _, varBinds = await get_cmd(
+                SnmpEngine(),
+                CommunityData('public'),
+                await UdpTransportTarget.create(('localhost', 161)),
+                ContextData(),
+                *[ObjectType(ObjectIdentity(f'{entry}.{column}.{core}')) for column in range(2, 7)]
+            )
+            if errorStatus or any(not val.prettyPrint().isdigit() for name, val in varBinds):
+                print(f'✗ Core {core}: incomplete row')
+                return False
+            usage, user, system, iowait, alarm = [int(val) for name, val in varBinds]
+            print(f'  Core {core}: usage {usage}%, user {user}%, system {system}%, '
+                  f'iowait {iowait}%, alarm {alarm}')
+            # Margen de 2 puntos por el redondeo de cada columna
+            if not 0 <= usage <= 100 or user + system > usage + 2 or alarm != (1 if usage > threshold else 2):
+                print(f'✗ Core {core}: inconsistent values')
+                return False
+
+        print(f'✓ CPU core table: {cores} cores')
+        test_results['cpu_sampler']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ CPU core table test failed: {e}')
+        return False
+
+
+async def set_sample_interval(seconds):
+    """Set cpuSampleInterval with the private community"""
+    errorIndication, errorStatus, errorIndex, varBinds = await set_cmd(
+        SnmpEngine(),
+        CommunityData('private'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        ObjectType(ObjectIdentity('1.3.6.1.4.1.28308.1.15.0'), Integer(seconds))
+    )
+    return not errorIndication and not errorStatus
+
+
+async def test_sample_interval(interval=1, samples=5):
+    """Test cpuSampleInterval changes and drift-free sample ticks"""
+    print('\n--- Sample Scheduling Test ---')
+    test_results['cpu_sampler']['total'] += 1
+
+    try:
+        print(f'  Setting cpuSampleInterval to {interval}s...')
+        if not await set_sample_interval(interval):
+            print('✗ SET cpuSampleInterval failed')
+            return False
+        # El cambio se aplica al momento, sin esperar al siguiente tick de 5 s
+        await asyncio.sleep((samples + 1) * interval + 0.5)
+
+        summary, rows = await read_cpu_history()
+        times = [row[3] for index, row in sorted(rows.items())][-samples:]
+        deltas = [b - a for a, b in zip(times, times[1:])]
+        print(f'  Sample spacing (ticks): {deltas}')
+
+        _, _, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            ObjectType(ObjectIdentity('1.3.6.1.4.1.28308.1.17.0'))
+        )
+        lag = int(varBinds[0][1])
+        print(f'  cpuSampleLag: {lag} ms')
+
+        # Cada muestra a interval s de la anterior (±20 ms de margen por la latencia del event loop)
+        if len(deltas) < samples - 1 or any(abs(delta - interval * 100) > 2 for delta in deltas[1:]):
+            print('✗ Samples are not evenly spaced at the new interval')
+            return False
+        if lag > 500:
+            print('✗ Scheduling lag too high')
+            return False
+
+        print('✓ Sampler rescheduled without drift')
+        test_results['cpu_sampler']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Sample scheduling test failed: {e}')
+        return False
+    finally:
+        await set_sample_interval(5)
+
 # Variable global para el proceso del agente
 agent_process = None
 
 
-def start_agent_in_terminal():
+def start_agent_in_terminal(extra_args=()):
     """Start agent in background and open terminal showing logs"""
     global agent_process
     
@@ -240,7 +509,7 @@ def start_agent_in_terminal():
     os.chmod(log_file_path, 0o644)
     
     agent_process = subprocess.Popen(
-        [python_executable, '-u', agent_path],
+        [python_executable, '-u', agent_path, *extra_args],
         stdin=subprocess.DEVNULL,
         stdout=log_file,
         stderr=subprocess.STDOUT,
@@ -396,10 +665,14 @@ def stop_agent():
     
     if agent_process and agent_process.poll() is None:
         try:
-            agent_process.terminate()
+            # Dar tiempo al agente a guardar su estado antes de forzar la salida
             agent_process.wait(timeout=5)
         except subprocess.TimeoutExpired:
-            agent_process.kill()
+            agent_process.terminate()
+            try:
+                agent_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                agent_process.kill()
     
     print('✓ Agent stopped')
 
@@ -502,99 +775,931 @@ async def test_persistence():
         return False
 
 
-def check_and_free_port_162():
-    """Check if port 162 is in use and free it if necessary"""
-    print('🔍 Checking port 162 availability...')
-    
-    # Verificar si el puerto está en uso
-    result = subprocess.run(
-        ['sudo', 'lsof', '-i', ':162'],
-        capture_output=True,
-        text=True
-    )
+async def test_journal_replay():
+    """Test SETs survive a crash (SIGKILL) through the journal - AUTOMATED"""
+    print('\n--- Journal Crash Recovery Test ---')
+    test_results['persistence']['total'] += 1
     
-    if result.stdout:
-        print('⚠️  Port 162 is in use')
-        print(result.stdout)
-        
-        # Intentar detener servicios conocidos
-        services_to_stop = [
-            'snmptrapd.service',
-            'snmptrapd.socket',
-            'snmpd.service',
-            'mgtrapd.service',
-            'mgtrapd.socket'
-        ]
+    try:
+        # 1. SET y esperar a que el write-behind lo añada al journal
+        test_value = f'JournalTest_{int(time.time())}'
+        print(f'  Setting sysLocation: {test_value}')
+        _, errorStatus, _, _ = await set_cmd(
+            SnmpEngine(),
+            CommunityData('private'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            ObjectType(ObjectIdentity('1.3.6.1.2.1.1.6.0'), OctetString(test_value))
+        )
+        if errorStatus:
+            print('✗ Failed to set value')
+            return False
+        await asyncio.sleep(2)
         
-        print('🛑 Stopping SNMP trap services...')
-        for service in services_to_stop:
+        # 2. Matar el agente sin darle ocasión de guardar (sin compactación al cerrar)
+        print('  Killing agent with SIGKILL...')
+        result = subprocess.run(['pgrep', '-f', 'agent_AnaDaniel.py'], capture_output=True, text=True)
+        for pid_str in result.stdout.split():
             try:
-                result = subprocess.run(
-                    ['sudo', 'systemctl', 'stop', service],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    print(f'   ✓ Stopped {service}')
-                else:
-                    # El servicio puede no existir, no es un error
-                    pass
-            except subprocess.TimeoutExpired:
-                print(f'   ⚠️  Timeout stopping {service}')
-            except Exception as e:
-                print(f'   ⚠️  Error stopping {service}: {e}')
+                os.kill(int(pid_str), signal.SIGKILL)
+            except (ValueError, ProcessLookupError):
+                pass
+        if agent_process:
+            agent_process.wait(timeout=5)
+        await asyncio.sleep(1)
         
-        # Esperar un momento para que los servicios se detengan
-        time.sleep(2)
+        # 3. Reiniciar: el snapshot más el journal deben contener el SET
+        if not start_agent_in_terminal() or not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
         
-        # Verificar de nuevo
-        result = subprocess.run(
-            ['sudo', 'lsof', '-i', ':162'],
-            capture_output=True,
-            text=True
+        _, _, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            ObjectType(ObjectIdentity('1.3.6.1.2.1.1.6.0'))
         )
+        recovered = str(varBinds[0][1])
         
-        if result.stdout:
-            print('✗ Port 162 still in use. Manual intervention required.')
-            print('  Run: sudo killall snmptrapd')
-            return False
-        else:
-            print('✓ Port 162 is now free')
+        if recovered == test_value:
+            print(f'✓ SET recovered from journal after crash: {recovered}')
+            test_results['persistence']['passed'] += 1
             return True
-    else:
-        print('✓ Port 162 is free')
-        return True
+        print(f'✗ Value lost: expected {test_value}, got {recovered}')
+        return False
+        
+    except Exception as e:
+        print(f'✗ Journal test failed: {e}')
+        import traceback
+        traceback.print_exc()
+        return False
 
 
-def generate_cpu_load(duration=10):
-    """Generate CPU load in background process"""
+
+async def test_slow_journal(delay=1):
+    """Test SET latency does not depend on disk speed (journal written behind) - AUTOMATED"""
+    print('\n--- Slow Journal Test ---')
+    test_results['persistence']['total'] += 1
     
-    def cpu_intensive_task():
-        """CPU-intensive calculation"""
-        end_time = time.time() + duration
-        while time.time() < end_time:
-            # Cálculos intensivos para generar carga
-            _ = [x**2 for x in range(10000)]
+    try:
+        baseline = measure_set_latency(tag='Baseline')
+        print(f'  Baseline SET latency: p50 {baseline[50]:.1f} ms, max {baseline[-1]:.1f} ms')
+        
+        print(f'  Restarting agent with --slow-journal {delay}...')
+        stop_agent()
+        await asyncio.sleep(3)
+        if not start_agent_in_terminal(['--slow-journal', str(delay)]):
+            print('✗ Failed to restart agent')
+            return False
+        if not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
+        
+        # 100 SETs en ~3 s: varias escrituras del journal, cada una con `delay` segundos de fdatasync
+        slow = measure_set_latency(tag='SlowDisk')
+        print(f'  With slow journal: p50 {slow[50]:.1f} ms, max {slow[-1]:.1f} ms')
+        
+        # Si el SET esperase a write_journal, cada lote retrasaría las respuestas `delay` segundos
+        if slow[-1] > 250 or slow[50] > baseline[50] + 10:
+            print('✗ SET latency grew with a slow journal')
+            return False
+        
+        # Los SETs siguen llegando al disco, sólo que más tarde
+        await asyncio.sleep(2 * delay + 2)
+        with open('mib_state.journal') as journal:
+            if 'SlowDisk_99' not in journal.read():
+                print('✗ Last SET missing from the journal')
+                return False
+        
+        print('✓ SET latency unaffected by a slow journal, SETs still journaled')
+        test_results['persistence']['passed'] += 1
+        return True
+        
+    except Exception as e:
+        print(f'✗ Slow journal test failed: {e}')
+        return False
+
+def encode_raw_request(pdu_class, oids, community='public', request_id=1234567,
+                       non_repeaters=0, max_repetitions=10, values=None):
+    """Encode a raw SNMPv2c request message"""
+    from pyasn1.codec.ber import encoder
+    from pysnmp.proto.api import v2c
     
-    # Lanzar múltiples procesos para asegurar carga
-    num_processes = multiprocessing.cpu_count()
-    processes = []
+    pdu = pdu_class()
+    if pdu_class is v2c.GetBulkRequestPDU:
+        v2c.apiBulkPDU.set_defaults(pdu)
+        v2c.apiBulkPDU.set_non_repeaters(pdu, non_repeaters)
+        v2c.apiBulkPDU.set_max_repetitions(pdu, max_repetitions)
+    else:
+        v2c.apiPDU.set_defaults(pdu)
+    v2c.apiPDU.set_request_id(pdu, request_id)
+    if values is None:
+        values = [v2c.null] * len(oids)
+    v2c.apiPDU.set_varbinds(pdu, list(zip(oids, values)))
     
-    print(f'  Generating CPU load with {num_processes} processes for {duration}s...')
+    msg = v2c.Message()
+    v2c.apiMessage.set_defaults(msg)
+    v2c.apiMessage.set_community(msg, community)
+    v2c.apiMessage.set_pdu(msg, pdu)
+    return encoder.encode(msg)
+
+
+def send_raw_requests(requests, timeout=1.0):
+    """Send raw requests one by one and return raw responses (None if no answer)"""
+    import socket
     
-    for _ in range(num_processes):
-        p = multiprocessing.Process(target=cpu_intensive_task)
-        p.start()
-        processes.append(p)
+    responses = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        for payload in requests:
+            sock.sendto(payload, ('127.0.0.1', 161))
+            try:
+                responses.append(sock.recv(65535))
+            except socket.timeout:
+                responses.append(None)
+    finally:
+        sock.close()
+    return responses
+
+
+def measure_get_latency(requests=100, gap=0.02):
+    """Send sequential GETs (sysDescr, cpuUsage) and return their latencies in ms"""
+    import socket
+    from pysnmp.proto.api import v2c
     
-    return processes
+    payload = encode_raw_request(v2c.GetRequestPDU, [(1, 3, 6, 1, 2, 1, 1, 1, 0),
+                                                     (1, 3, 6, 1, 4, 1, 28308, 1, 3, 0)])
+    latencies = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(5.0)
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            sock.sendto(payload, ('127.0.0.1', 161))
+            try:
+                sock.recv(65535)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except socket.timeout:
+                latencies.append(5000.0)
+            time.sleep(gap)
+    finally:
+        sock.close()
+    return sorted(latencies)
 
 
-def stop_cpu_load(processes):
-    """Stop all CPU load processes"""
-    for p in processes:
-        if p.is_alive():
+
+def measure_set_latency(requests=100, gap=0.02, tag='Latency'):
+    """Send sequential SETs of sysLocation and return their latencies in ms"""
+    import socket
+    from pysnmp.proto.api import v2c
+    
+    latencies = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(5.0)
+    try:
+        for i in range(requests):
+            payload = encode_raw_request(v2c.SetRequestPDU, [(1, 3, 6, 1, 2, 1, 1, 6, 0)],
+                                         community='private', request_id=1000 + i,
+                                         values=[v2c.OctetString(f'{tag}_{i}')])
+            start = time.perf_counter()
+            sock.sendto(payload, ('127.0.0.1', 161))
+            try:
+                sock.recv(65535)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except socket.timeout:
+                latencies.append(5000.0)
+            time.sleep(gap)
+    finally:
+        sock.close()
+    return sorted(latencies)
+
+async def test_interface_table(interval=5):
+    """Test ifTable/ifXTable rows and 64-bit counters from the shared interface snapshot"""
+    print('\n--- Interface Table Test ---')
+    test_results['collectors']['total'] += 1
+
+    async def get(*oids):
+        errorIndication, errorStatus, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids]
+        )
+        if errorIndication or errorStatus:
+            raise RuntimeError(errorIndication or errorStatus.prettyPrint())
+        return [val for name, val in varBinds]
+
+    try:
+        count = int((await get('1.3.6.1.2.1.2.1.0'))[0])
+
+        # GETBULK de la columna ifDescr: una fila por interfaz, tantas como ifNumber
+        errorIndication, errorStatus, errorIndex, varBinds = await bulk_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            0, count + 1,
+            ObjectType(ObjectIdentity('1.3.6.1.2.1.2.2.1.2'))
+        )
+        if errorIndication or errorStatus:
+            print(f'✗ GETBULK ifDescr: {errorIndication or errorStatus.prettyPrint()}')
+            return False
+        rows = {int(name[-1]): str(val) for name, val in varBinds
+                if str(name).startswith('1.3.6.1.2.1.2.2.1.2.')}
+        print(f'  ifNumber {count}: {rows}')
+        if not count or len(rows) != count or 'lo' not in rows.values():
+            print('✗ ifDescr column does not match ifNumber')
+            return False
+
+        # Contadores de 32 y 64 bits de la misma fila en una petición (mismo snapshot)
+        lo = next(index for index, descr in rows.items() if descr == 'lo')
+        columns = ['1.3.6.1.2.1.2.2.1.10', '1.3.6.1.2.1.31.1.1.1.6',
+                   '1.3.6.1.2.1.2.2.1.11', '1.3.6.1.2.1.31.1.1.1.7', '1.3.6.1.2.1.31.1.1.1.1']
+        in_octets, hc_octets, in_pkts, hc_pkts, if_name = await get(*[f'{oid}.{lo}' for oid in columns])
+        if (not isinstance(hc_octets, Counter64) or int(in_octets) != int(hc_octets) & 0xFFFFFFFF
+                or int(in_pkts) != int(hc_pkts) & 0xFFFFFFFF or str(if_name) != 'lo'):
+            print(f'✗ Inconsistent counters for lo: {in_octets} / {hc_octets}, {in_pkts} / {hc_pkts}')
+            return False
+
+        # Tráfico por loopback: tras el siguiente snapshot los contadores HC han crecido
+        for _ in range(20):
+            await get('1.3.6.1.2.1.1.5.0')
+        await asyncio.sleep(interval + 1)
+        later = int((await get(f'1.3.6.1.2.1.31.1.1.1.6.{lo}'))[0])
+        print(f'  lo ifHCInOctets: {int(hc_octets)} -> {later}')
+        if later <= int(hc_octets):
+            print('✗ ifHCInOctets did not grow with loopback traffic')
+            return False
+
+        print(f'✓ Interface table: {count} interfaces, HC counters consistent')
+        test_results['collectors']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Interface table test failed: {e}')
+        return False
+
+
+async def test_process_table(interval=5):
+    """Test hrSWRunTable rows and a busy process ranked in topCpuTable"""
+    print('\n--- Process Table Test ---')
+    test_results['collectors']['total'] += 1
+    spinner = subprocess.Popen([sys.executable, '-c', 'while True: pass'])
+
+    try:
+        # Dos pasadas del recolector: la primera descubre el proceso, la segunda mide su delta
+        await asyncio.sleep(2 * interval + 1)
+        run = '1.3.6.1.2.1.25.4.2.1'
+        errorIndication, errorStatus, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            *[ObjectType(ObjectIdentity(f'{run}.{column}.{spinner.pid}')) for column in (2, 5, 6, 7)],
+            ObjectType(ObjectIdentity(f'1.3.6.1.2.1.25.5.1.1.1.{spinner.pid}'))
+        )
+        if errorIndication or errorStatus:
+            print(f'✗ GET hrSWRun row: {errorIndication or errorStatus.prettyPrint()}')
+            return False
+        name, parameters, run_type, status, cpu = [val for _, val in varBinds]
+        print(f'  hrSWRun {spinner.pid}: {name} "{parameters}", type {run_type}, status {status}, cpu {cpu} cs')
+        if (not str(name).startswith('python') or str(parameters) != '-c while True: pass'
+                or int(run_type) != 4 or int(cpu) <= 0):
+            print('✗ Unexpected hrSWRunTable row for the busy process')
+            return False
+
+        # topCpuTable: el proceso ocupado aparece con casi un núcleo entero
+        errorIndication, errorStatus, _, varBinds = await bulk_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            0, 5,
+            ObjectType(ObjectIdentity('1.3.6.1.4.1.28308.1.30.1.2')),
+            ObjectType(ObjectIdentity('1.3.6.1.4.1.28308.1.30.1.4'))
+        )
+        if errorIndication or errorStatus:
+            print(f'✗ GETBULK topCpuTable: {errorIndication or errorStatus.prettyPrint()}')
+            return False
+        top = {}
+        for i in range(0, len(varBinds) - 1, 2):
+            (pid_oid, pid), (usage_oid, usage) = varBinds[i], varBinds[i + 1]
+            if str(pid_oid).startswith('1.3.6.1.4.1.28308.1.30.1.2.'):
+                top[int(pid)] = int(usage)
+        print(f'  topCpuTable: {top}')
+        if top.get(spinner.pid, 0) < 50:
+            print('✗ Busy process missing from topCpuTable')
+            return False
+
+        print(f'✓ Process table: busy process {spinner.pid} ranked at {top[spinner.pid]}% CPU')
+        test_results['collectors']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Process table test failed: {e}')
+        return False
+    finally:
+        spinner.kill()
+        spinner.wait()
+
+
+async def test_storage_tables(interval=5, alarm_index=12):
+    """Test filesystem usage, disk I/O rates and a disk column as an alarm input"""
+    print('\n--- Storage Tables Test ---')
+    test_results['collectors']['total'] += 1
+    fs_entry = '1.3.6.1.4.1.28308.1.31.1'
+    disk_entry = '1.3.6.1.4.1.28308.1.32.1'
+
+    async def column(oid):
+        """GETBULK a whole table column: {index: value}"""
+        errorIndication, errorStatus, _, varBinds = await bulk_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            0, 50,
+            ObjectType(ObjectIdentity(oid))
+        )
+        if errorIndication or errorStatus:
+            raise RuntimeError(errorIndication or errorStatus.prettyPrint())
+        return {int(name[-1]): val for name, val in varBinds if str(name).startswith(oid + '.')}
+
+    try:
+        # Sistema de ficheros raíz: mismo porcentaje que statvfs (df) y misma fila en hrStorageTable
+        mounts = {str(val): index for index, val in (await column(f'{fs_entry}.2')).items()}
+        root = mounts['/']
+        st = os.statvfs('/')
+        used = st.f_blocks - st.f_bfree
+        expected = -(-used * 100 // (used + st.f_bavail))
+        percent = int((await column(f'{fs_entry}.5'))[root])
+        descr = str((await column('1.3.6.1.2.1.25.2.3.1.3'))[root])
+        print(f'  fsTable: {len(mounts)} filesystems, / at index {root}: {percent}% used (statvfs {expected}%)')
+        if descr != '/' or abs(percent - expected) > 1:
+            print('✗ Inconsistent filesystem usage')
+            return False
+
+        # Escritura de 32 MB con fsync: los bytes escritos crecen y la tasa aparece en alguna ventana
+        before = sum(int(val) for val in (await column(f'{disk_entry}.4')).values())
+        with open('storage_test.tmp', 'wb') as f:
+            f.write(os.urandom(32 << 20))
+            f.flush()
+            os.fsync(f.fileno())
+        os.remove('storage_test.tmp')
+        peak = 0
+        for _ in range(2 * interval + 2):
+            await asyncio.sleep(1)
+            peak = max([peak] + [int(val) for val in (await column(f'{disk_entry}.8')).values()])
+        after = sum(int(val) for val in (await column(f'{disk_entry}.4')).values())
+        print(f'  diskIOTable: {(after - before) >> 20} MB written, peak write rate {peak >> 10} KB/s')
+        if after - before < 32 << 20 or peak <= 0:
+            print('✗ Disk I/O counters did not follow the write')
+            return False
+
+        # fsUsedPercent como variable de una fila de alarmTable: alarmValue sigue a la columna
+        created = await set_alarm(alarm_index, variable=f'{fs_entry}.5.{root}', interval=1, startup=1,
+                                  rising=101, falling=0, status=4)
+        await asyncio.sleep(interval + 2)   # Las filas se evalúan en cada muestra de CPU
+        value = await get_alarm(alarm_index, 5)
+        await set_alarm(alarm_index, status=6)
+        print(f'  Alarm on fsUsedPercent.{root}: {created}, alarmValue {value[0]}')
+        if created != 'noError' or abs(int(value[0]) - percent) > 1:
+            print('✗ fsUsedPercent not usable as an alarm variable')
+            return False
+
+        print('✓ Storage tables: filesystem usage, disk I/O rates and alarm input')
+        test_results['collectors']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Storage tables test failed: {e}')
+        return False
+
+
+async def test_cgroup_table(interval=5, alarm_index=13):
+    """Test per-cgroup CPU, quota and throttling rates from a simulated cgroup v2 tree"""
+    import shutil
+    import tempfile
+    print('\n--- Cgroup CPU Table Test ---')
+    test_results['collectors']['total'] += 1
+    entry = '1.3.6.1.4.1.28308.1.33.1'
+    root = tempfile.mkdtemp(prefix='cgroup_test_')
+    # web: cuota de media CPU agotada y estrangulada; batch: sin cuota, 0.2 CPU
+    cgroups = {'web': ('50000 100000', 500000, 100), 'batch': ('max 100000', 200000, 0)}
+    files = {}
+    stop = asyncio.Event()
+
+    def write_stat(name, usage, periods, throttled):
+        # Mismo tamaño en cada escritura: el agente relee el fichero abierto con pread
+        os.pwrite(files[name], (f'usage_usec {usage:015d}\nnr_periods {periods:010d}\n'
+                                f'nr_throttled {throttled:010d}\nthrottled_usec {throttled * 1000:015d}\n').encode(), 0)
+
+    async def consume():
+        start = time.monotonic()
+        while not stop.is_set():
+            elapsed = time.monotonic() - start
+            for name, (_, usage_per_second, throttled) in cgroups.items():
+                periods = int(elapsed * 10)
+                write_stat(name, int(elapsed * usage_per_second), periods, periods * throttled // 100)
+            await asyncio.sleep(0.2)
+
+    consumer = None
+    try:
+        open(os.path.join(root, 'cgroup.controllers'), 'w').close()
+        for name, (limit, _, _) in cgroups.items():
+            os.mkdir(os.path.join(root, name))
+            with open(os.path.join(root, name, 'cpu.max'), 'w') as f:
+                f.write(limit + '\n')
+            files[name] = os.open(os.path.join(root, name, 'cpu.stat'), os.O_RDWR | os.O_CREAT)
+            write_stat(name, 0, 0, 0)
+
+        print(f'  Restarting agent with --cgroup-root {root}...')
+        stop_agent()
+        await asyncio.sleep(3)
+        if not start_agent_in_terminal(['--cgroup-root', root]) or not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
+        consumer = asyncio.create_task(consume())
+
+        # Índices de los cgroups por ruta; alarma sobre el uso de la cuota de web
+        errorIndication, errorStatus, _, varBinds = await bulk_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            0, 10,
+            ObjectType(ObjectIdentity(f'{entry}.2'))
+        )
+        paths = {str(val): int(name[-1]) for name, val in varBinds if str(name).startswith(f'{entry}.2.')}
+        web, batch = paths['/web'], paths['/batch']
+        created = await set_alarm(alarm_index, variable=f'{entry}.4.{web}', interval=1, startup=1,
+                                  rising=200, falling=0, status=4)
+
+        # Dos ventanas completas del recolector con consumo constante
+        await asyncio.sleep(2 * interval + 2)
+        rows = {}
+        for name, index in (('web', web), ('batch', batch)):
+            _, _, _, varBinds = await get_cmd(
+                SnmpEngine(),
+                CommunityData('public'),
+                await UdpTransportTarget.create(('localhost', 161)),
+                ContextData(),
+                *[ObjectType(ObjectIdentity(f'{entry}.{column}.{index}')) for column in (3, 4, 5, 6)]
+            )
+            rows[name] = [int(val) for _, val in varBinds]
+        value = await get_alarm(alarm_index, 5)
+        await set_alarm(alarm_index, status=6)
+        print(f'  /web: usage {rows["web"][0]}%, quota usage {rows["web"][1]}%, quota {rows["web"][2]} mCPU, '
+              f'throttled {rows["web"][3]}%')
+        print(f'  /batch: usage {rows["batch"][0]}%, quota {rows["batch"][2]} mCPU, throttled {rows["batch"][3]}%')
+        print(f'  Alarm on cgroupCpuQuotaUsage.{web}: {created}, alarmValue {value[0]}')
+
+        usage, quota_usage, quota, throttled = rows['web']
+        if not (40 <= usage <= 60 and 80 <= quota_usage <= 120 and quota == 500 and throttled >= 90):
+            print('✗ Unexpected CPU accounting for the throttled cgroup')
+            return False
+        usage, _, quota, throttled = rows['batch']
+        if not (15 <= usage <= 25 and quota == 0 and throttled == 0):
+            print('✗ Unexpected CPU accounting for the unlimited cgroup')
+            return False
+        if created != 'noError' or not 80 <= int(value[0]) <= 120:
+            print('✗ cgroupCpuQuotaUsage not usable as an alarm variable')
+            return False
+
+        print('✓ Cgroup table: quota usage and throttling measured per cgroup')
+        test_results['collectors']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Cgroup table test failed: {e}')
+        return False
+    finally:
+        stop.set()
+        if consumer is not None:
+            await consumer
+        for fd in files.values():
+            os.close(fd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+async def test_pressure(interval=5, alarm_index=14):
+    """Test PSI scalars, a PSI trigger notification and pressure as an alarm variable"""
+    from pyasn1.codec.ber import encoder
+    print('\n--- Pressure (PSI) Test ---')
+    test_results['collectors']['total'] += 1
+    base = '1.3.6.1.4.1.28308.1.34'
+    avg10, total, events = f'{base}.1.0', f'{base}.4.0', f'{base}.25.0'    # cpu some avg10/total
+    stall_oid = encoder.encode(ObjectIdentifier('1.3.6.1.4.1.28308.2.5'))
+    if not os.path.exists('/proc/pressure/cpu'):
+        print('✗ Kernel without PSI (/proc/pressure)')
+        return False
+    if not check_and_free_port_162():
+        print('✗ Cannot free port 162 for pressure test')
+        return False
+
+    class StallTrapReceiver(asyncio.DatagramProtocol):
+        def __init__(self):
+            self.received = asyncio.Event()
+
+        def datagram_received(self, data, addr):
+            if stall_oid in data:
+                self.received.set()
+
+    transport, spinners = None, []
+    try:
+        # Ventana de 2 s: sin CAP_SYS_RESOURCE el kernel no acepta ventanas más cortas
+        print('  Restarting agent with --pressure-trigger cpu:some:100:2000...')
+        stop_agent()
+        await asyncio.sleep(3)
+        if not start_agent_in_terminal(['--pressure-trigger', 'cpu:some:100:2000']) or not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
+        transport, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+            StallTrapReceiver, local_addr=('127.0.0.1', 162))
+        created = await set_alarm(alarm_index, variable=avg10, interval=1, startup=1,
+                                  rising=10001, falling=0, status=4)
+        await asyncio.sleep(interval)    # Los atascos del arranque ya notificados
+        before = await get_integers(total, events)
+        protocol.received.clear()
+
+        # Más procesos ocupados que CPUs: las tareas esperan CPU (presión 'some')
+        start = time.monotonic()
+        spinners = [subprocess.Popen([sys.executable, '-c', 'while True: pass'])
+                    for _ in range(multiprocessing.cpu_count() + 1)]
+        await asyncio.wait_for(protocol.received.wait(), timeout=interval)
+        latency = time.monotonic() - start
+        print(f'  pressureStall trap {latency:.2f} s after the load started')
+
+        await asyncio.sleep(max(0, interval + 2 - latency))     # alarmValue se actualiza en cada muestra de CPU
+        after = await get_integers(avg10, total, events)
+        value = await get_alarm(alarm_index, 5)
+        await set_alarm(alarm_index, status=6)
+        print(f'  pressureCpuSomeAvg10 {after[0] / 100:.2f}%, total {before[0]} -> {after[1]} µs, '
+              f'stall events {before[1]} -> {after[2]}, alarmValue {value[0]}')
+
+        if not (after[0] > 0 and after[1] > before[0] and after[2] > before[1]):
+            print('✗ CPU pressure did not grow under load')
+            return False
+        if created != 'noError' or int(value[0]) <= 0:
+            print('✗ pressureCpuSomeAvg10 not usable as an alarm variable')
+            return False
+
+        print('✓ Pressure: PSI scalars, trigger notification before the next sample, alarm input')
+        test_results['collectors']['passed'] += 1
+        return True
+
+    except asyncio.TimeoutError:
+        print(f'✗ Timeout: no pressureStall trap within {interval} seconds')
+        return False
+    except Exception as e:
+        print(f'✗ Pressure test failed: {e}')
+        return False
+    finally:
+        for spinner in spinners:
+            spinner.kill()
+            spinner.wait()
+        if transport is not None:
+            transport.close()
+
+
+async def test_slow_collector(delay=2):
+    """Test GET latency stays flat while a slow collector blocks its thread - AUTOMATED"""
+    print('\n--- Slow Collector Test ---')
+    test_results['collectors']['total'] += 1
+    
+    try:
+        baseline = measure_get_latency()
+        print(f'  Baseline GET latency: p50 {baseline[50]:.1f} ms, max {baseline[-1]:.1f} ms')
+        
+        print(f'  Restarting agent with --slow-collector {delay}...')
+        stop_agent()
+        await asyncio.sleep(3)
+        if not start_agent_in_terminal(['--slow-collector', str(delay)]):
+            print('✗ Failed to restart agent')
+            return False
+        if not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
+        
+        # El recolector lento se ejecuta sin pausa (tarda más que su intervalo) durante toda la medida
+        slow = measure_get_latency()
+        print(f'  With slow collector: p50 {slow[50]:.1f} ms, max {slow[-1]:.1f} ms')
+        
+        # En el event loop, cada recolección retrasaría las respuestas hasta 2 s
+        if slow[-1] > 250 or slow[50] > baseline[50] + 10:
+            print('✗ GET latency grew while the collector was running')
+            return False
+        
+        print('✓ GET latency unaffected by a slow collector')
+        test_results['collectors']['passed'] += 1
+        return True
+        
+    except Exception as e:
+        print(f'✗ Slow collector test failed: {e}')
+        return False
+
+
+async def test_interleaved_access(requests=400, burst=50):
+    """Test public/private SETs interleaved at high rate are never misattributed"""
+    import socket
+    from pyasn1.codec.ber import decoder
+    from pysnmp.proto.api import v2c
+    
+    print('\n--- Interleaved Access Control Test ---')
+    test_results['access_control']['total'] += 1
+    location_oid = (1, 3, 6, 1, 2, 1, 1, 6, 0)
+    
+    try:
+        # Escribir el valor actual de sysLocation para no alterar el estado
+        _, _, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            ObjectType(ObjectIdentity('.'.join(map(str, location_oid))))
+        )
+        location = v2c.OctetString(str(varBinds[0][1]))
+        
+        # Enviar ráfagas alternando comunidades (sin esperar respuesta entre peticiones)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(5)
+        expected = {}
+        results = {}
+        try:
+            for start in range(1, requests + 1, burst):
+                batch = range(start, min(start + burst, requests + 1))
+                for request_id in batch:
+                    community = 'private' if request_id % 2 else 'public'
+                    expected[request_id] = 0 if community == 'private' else 6  # noError / noAccess
+                    sock.sendto(encode_raw_request(v2c.SetRequestPDU, [location_oid], community,
+                                                   request_id, values=[location]), ('127.0.0.1', 161))
+                
+                for _ in batch:
+                    try:
+                        data = sock.recv(65535)
+                    except socket.timeout:
+                        break
+                    message, _ = decoder.decode(data, asn1Spec=v2c.Message())
+                    pdu = v2c.apiMessage.get_pdu(message)
+                    results[int(v2c.apiPDU.get_request_id(pdu))] = int(v2c.apiPDU.get_error_status(pdu))
+        finally:
+            sock.close()
+        
+        misattributed = [rid for rid, status in results.items() if status != expected[rid]]
+        if len(results) < requests:
+            print(f'✗ Only {len(results)}/{requests} responses received')
+            return False
+        if misattributed:
+            print(f'✗ {len(misattributed)} requests misattributed (e.g. request-id {misattributed[0]})')
+            return False
+        
+        print(f'✓ {requests} interleaved public/private SETs correctly authorized')
+        test_results['access_control']['passed'] += 1
+        return True
+        
+    except Exception as e:
+        print(f'✗ Interleaved access test failed: {e}')
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+async def test_fast_path():
+    """Test v2c fast path answers byte-for-byte like pysnmp - AUTOMATED"""
+    from pysnmp.proto.api import v2c
+    
+    print('\n--- Fast Path Test ---')
+    test_results['fast_path']['total'] += 1
+    
+    system = (1, 3, 6, 1, 2, 1, 1)
+    enterprise = (1, 3, 6, 1, 4, 1, 28308)
+    # Sin sysUpTime ni cpuUsage como resultado: cambian entre ejecuciones
+    requests = [
+        encode_raw_request(v2c.GetRequestPDU, [system + (1, 0)]),
+        encode_raw_request(v2c.GetRequestPDU, [system + (2, 0), enterprise + (1, 1, 0),
+                                               enterprise + (1, 2, 0), enterprise + (1, 4, 0),
+                                               system + (7, 0)], request_id=-5),
+        encode_raw_request(v2c.GetRequestPDU, [(1, 3, 6, 1, 2, 1, 2, 1, 0), enterprise + (9,)],
+                           community='private', request_id=2**31 - 1),
+        encode_raw_request(v2c.GetNextRequestPDU, [system, system + (3, 0), enterprise + (1, 3, 0),
+                                                   enterprise + (1, 4, 0)], request_id=-2**31),
+        encode_raw_request(v2c.GetNextRequestPDU, [(0, 0)], request_id=0),
+        encode_raw_request(v2c.GetRequestPDU, []),
+        # Lo que el fast path no atiende debe seguir igual (GETBULK, comunidad errónea)
+        encode_raw_request(v2c.GetBulkRequestPDU, [enterprise + (1, 3, 0)], max_repetitions=3),
+        encode_raw_request(v2c.GetRequestPDU, [system + (1, 0)], community='wrong'),
+    ]
+    
+    try:
+        # 1. Respuestas del agente con la pila completa de pysnmp
+        print('  Recording responses from the pysnmp pipeline...')
+        expected = send_raw_requests(requests)
+        
+        # 2. Reiniciar el agente con el fast path activado
+        print('  Restarting agent with --fast-path...')
+        stop_agent()
+        await asyncio.sleep(3)
+        if not start_agent_in_terminal(['--fast-path']):
+            print('✗ Failed to restart agent')
+            return False
+        if not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
+        
+        # 3. Comparar byte a byte
+        actual = send_raw_requests(requests)
+        mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+        
+        if mismatches:
+            for i in mismatches:
+                print(f'✗ Request {i}: expected {expected[i] and expected[i].hex()}, '
+                      f'got {actual[i] and actual[i].hex()}')
+            return False
+        
+        print(f'✓ Fast path responses identical to pysnmp ({len(requests)} requests)')
+        test_results['fast_path']['passed'] += 1
+        return True
+        
+    except Exception as e:
+        print(f'✗ Fast path test failed: {e}')
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+async def test_workers(workers=4, requests=60):
+    """Test multi-process mode: SETs visible in every worker, saved once - AUTOMATED"""
+    from pyasn1.codec.ber import decoder
+    from pysnmp.proto.api import v2c
+    
+    print('\n--- Multi-process Workers Test ---')
+    test_results['workers']['total'] += 1
+    manager_oid = (1, 3, 6, 1, 4, 1, 28308, 1, 1, 0)
+    log_file_path = '/tmp/agent_snmp.log'
+    
+    try:
+        # 1. Reiniciar el agente con varios workers compartiendo el puerto
+        print(f'  Restarting agent with --workers {workers}...')
+        stop_agent()
+        await asyncio.sleep(3)
+        if not start_agent_in_terminal(['--workers', str(workers)]):
+            print('✗ Failed to restart agent')
+            return False
+        if not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
+        
+        with open(log_file_path) as f:
+            started = f.read().count('Worker ')
+        if started != workers:
+            print(f'✗ Expected {workers} workers, {started} started')
+            return False
+        
+        # 2. SET en un worker
+        test_value = f'Workers_{int(time.time())}'
+        _, errorStatus, _, _ = await set_cmd(
+            SnmpEngine(),
+            CommunityData('private'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            ObjectType(ObjectIdentity('.'.join(map(str, manager_oid))), OctetString(test_value))
+        )
+        if errorStatus:
+            print(f'✗ SET failed: {errorStatus.prettyPrint()}')
+            return False
+        
+        # 3. GETs desde sockets nuevos (puertos origen distintos -> workers distintos)
+        request = encode_raw_request(v2c.GetRequestPDU, [manager_oid])
+        stale = 0
+        for _ in range(requests):
+            response = send_raw_requests([request])[0]
+            if response is None:
+                stale += 1
+                continue
+            message, _ = decoder.decode(response, asn1Spec=v2c.Message())
+            pdu = v2c.apiMessage.get_pdu(message)
+            value = v2c.apiPDU.get_varbinds(pdu)[0][1]
+            if str(value) != test_value:
+                stale += 1
+        if stale:
+            print(f'✗ {stale}/{requests} GETs did not see the new value')
+            return False
+        print(f'✓ SET visible from all {requests} GETs across {workers} workers')
+        
+        # 4. El estado se guarda una sola vez (supervisor), no una por worker
+        await asyncio.sleep(1)
+        with open(log_file_path) as f:
+            saves = f.read().count('Saved state')
+        if saves != 1:
+            print(f'✗ State saved {saves} times after one SET (expected 1)')
+            return False
+        print('✓ State persisted exactly once')
+        
+        test_results['workers']['passed'] += 1
+        return True
+        
+    except Exception as e:
+        print(f'✗ Workers test failed: {e}')
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def check_and_free_port_162():
+    """Check if port 162 is in use and free it if necessary"""
+    print('🔍 Checking port 162 availability...')
+    
+    # Verificar si el puerto está en uso
+    result = subprocess.run(
+        ['sudo', 'lsof', '-i', ':162'],
+        capture_output=True,
+        text=True
+    )
+    
+    if result.stdout:
+        print('⚠️  Port 162 is in use')
+        print(result.stdout)
+        
+        # Intentar detener servicios conocidos
+        services_to_stop = [
+            'snmptrapd.service',
+            'snmptrapd.socket',
+            'snmpd.service',
+            'mgtrapd.service',
+            'mgtrapd.socket'
+        ]
+        
+        print('🛑 Stopping SNMP trap services...')
+        for service in services_to_stop:
+            try:
+                result = subprocess.run(
+                    ['sudo', 'systemctl', 'stop', service],
+                    capture_output=True,
+                    text=True,
+                    timeout=5
+                )
+                if result.returncode == 0:
+                    print(f'   ✓ Stopped {service}')
+                else:
+                    # El servicio puede no existir, no es un error
+                    pass
+            except subprocess.TimeoutExpired:
+                print(f'   ⚠️  Timeout stopping {service}')
+            except Exception as e:
+                print(f'   ⚠️  Error stopping {service}: {e}')
+        
+        # Esperar un momento para que los servicios se detengan
+        time.sleep(2)
+        
+        # Verificar de nuevo
+        result = subprocess.run(
+            ['sudo', 'lsof', '-i', ':162'],
+            capture_output=True,
+            text=True
+        )
+        
+        if result.stdout:
+            print('✗ Port 162 still in use. Manual intervention required.')
+            print('  Run: sudo killall snmptrapd')
+            return False
+        else:
+            print('✓ Port 162 is now free')
+            return True
+    else:
+        print('✓ Port 162 is free')
+        return True
+
+
+def generate_cpu_load(duration=10):
+    """Generate CPU load in background process"""
+    
+    def cpu_intensive_task():
+        """CPU-intensive calculation"""
+        end_time = time.time() + duration
+        while time.time() < end_time:
+            # Cálculos intensivos para generar carga
+            _ = [x**2 for x in range(10000)]
+    
+    # Lanzar múltiples procesos para asegurar carga
+    num_processes = multiprocessing.cpu_count()
+    processes = []
+    
+    print(f'  Generating CPU load with {num_processes} processes for {duration}s...')
+    
+    for _ in range(num_processes):
+        p = multiprocessing.Process(target=cpu_intensive_task)
+        p.start()
+        processes.append(p)
+    
+    return processes
+
+
+def stop_cpu_load(processes):
+    """Stop all CPU load processes"""
+    for p in processes:
+        if p.is_alive():
             p.terminate()
             p.join(timeout=1)
     print('  CPU load generation stopped')
@@ -663,6 +1768,9 @@ async def test_trap_sending():
             
             if protocol.data:
                 trap_hex = protocol.data.hex()
+                # topCpuPid.1 = 1.3.6.1.4.1.28308.1.30.1.2.1 (mayores consumidores de CPU)
+                if '2b0601040181dd14011e010201' in trap_hex:
+                    print('  ℹ️  Trap carries the top CPU consumers')
                 if '2b0601040' in trap_hex:
                     print('✓ Trap received with enterprise OID')
                     test_results['trap']['passed'] += 1
@@ -720,6 +1828,789 @@ async def test_trap_sending():
             stop_cpu_load(cpu_processes)
 
 
+async def test_notification_queue():
+    """Test notification queue counters after the trap test - AUTOMATED"""
+    print('\n--- Notification Queue Test ---')
+    test_results['notify_queue']['total'] += 1
+    
+    names = ['notifyQueueDepth', 'notifyDropped', 'notifyDelivered', 'notifyFailed']
+    try:
+        errorIndication, errorStatus, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            *[ObjectType(ObjectIdentity(f'1.3.6.1.4.1.28308.1.{i}.0')) for i in range(5, 9)]
+        )
+        if errorIndication or errorStatus:
+            print(f'✗ GET queue counters failed: {errorIndication or errorStatus.prettyPrint()}')
+            return False
+        
+        stats = {name: int(val) for name, (_, val) in zip(names, varBinds)}
+        print(f'  Queue stats: {stats}')
+        
+        # El trap del test anterior se entregó a través de la cola, sin descartes
+        if stats['notifyDelivered'] >= 1 and stats['notifyDropped'] == 0:
+            print('✓ Alerts delivered through the notification queue')
+            test_results['notify_queue']['passed'] += 1
+            return True
+        print('✗ Unexpected notification queue counters')
+        return False
+        
+    except Exception as e:
+        print(f'✗ Notification queue test failed: {e}')
+        return False
+
+
+
+async def test_notify_drain(timeout=2):
+    """Test shutdown delivers queued alerts and retries, and counts what cannot be delivered"""
+    print('\n--- Notification Drain Test ---')
+    test_results['notify_queue']['total'] += 1
+
+    try:
+        # Importar el agente no carga ni escribe su estado: se prueba la cola directamente
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from agent_AnaDaniel import NotificationQueue, mib_store
+
+        delivered = []
+        failed_once = set()
+
+        async def slow(event):
+            await asyncio.sleep(0.2)
+            delivered.append(event)
+            return True
+
+        async def flaky(event):
+            if event not in failed_once:
+                failed_once.add(event)
+                return False
+            delivered.append(event)
+            return True
+
+        async def stuck(event):
+            await asyncio.Event().wait()
+
+        # Reintento a los 30 s (backoff máximo): sólo se entrega si stop() lo adelanta
+        queue = NotificationQueue(backoff=60)
+        queue.add_channel('slow', slow, 5)
+        queue.add_channel('flaky', flaky, 5)
+        queue.add_channel('stuck', stuck, 60)
+        queue.start()
+        for i in range(5):
+            queue.put('slow', slow, (f'slow{i}',), 0)
+        queue.put('flaky', flaky, ('flaky',), 0)
+        queue.put('stuck', stuck, ('stuck0',), 0)
+        queue.put('stuck', stuck, ('stuck1',), 0)
+        await asyncio.sleep(0.1)
+
+        dropped = mib_store.data['notifyDropped']
+        start = time.monotonic()
+        await queue.stop(timeout)
+        elapsed = time.monotonic() - start
+        dropped = mib_store.data['notifyDropped'] - dropped
+        print(f'  Delivered at shutdown: {sorted(delivered)}, dropped {dropped}, in {elapsed:.1f}s')
+
+        if sorted(delivered) != ['flaky'] + [f'slow{i}' for i in range(5)]:
+            print('✗ Queued alerts or pending retries were lost at shutdown')
+            return False
+        if dropped != 2 or elapsed > timeout + 1:
+            print(f'✗ Expected the 2 stuck alerts dropped after ~{timeout}s')
+            return False
+
+        print('✓ Shutdown drained the queues and counted the undeliverable alerts')
+        test_results['notify_queue']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Notification drain test failed: {e}')
+        return False
+
+
+async def test_digest_shutdown(window=60, alerts=3):
+    """Test shutdown sends the alerts waiting for the digest window instead of dropping them"""
+    print('\n--- Digest On Shutdown Test ---')
+    test_results['notify_queue']['total'] += 1
+
+    try:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from agent_AnaDaniel import NotificationQueue
+
+        single = []
+        digests = []
+
+        async def deliver(*event):
+            single.append(event)
+            return True
+
+        async def deliver_digest(pending):
+            digests.append([event for _, event in pending])
+            return True
+
+        # La ventana del resumen no se cierra antes de stop()
+        queue = NotificationQueue()
+        queue.add_channel('email', deliver, 5, deliver_digest=deliver_digest)
+        queue.set_digest_window('email', window)
+        queue.start()
+        for i in range(alerts):
+            queue.enqueue(f'alert{i}', i)
+        await queue.stop(2)
+        print(f'  Digests sent at shutdown: {digests}, single alerts: {single}')
+
+        if digests != [[(f'alert{i}', i) for i in range(alerts)]] or single:
+            print(f'✗ Expected one digest with the {alerts} pending alerts')
+            return False
+
+        print('✓ Pending digest sent at shutdown')
+        test_results['notify_queue']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Digest shutdown test failed: {e}')
+        return False
+
+ALARM_ENTRY = '1.3.6.1.4.1.28308.1.19.1'
+
+
+async def set_alarm(index, **columns):
+    """SET several alarmTable columns of one row in a single PDU; returns the error status name"""
+    numbers = {'interval': 2, 'variable': 3, 'sampleType': 4, 'startup': 6,
+               'rising': 7, 'falling': 8, 'status': 9}
+    errorIndication, errorStatus, errorIndex, varBinds = await set_cmd(
+        SnmpEngine(),
+        CommunityData('private'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        *[ObjectType(ObjectIdentity(f'{ALARM_ENTRY}.{numbers[name]}.{index}'),
+                     ObjectIdentifier(value) if name == 'variable' else Integer(value))
+          for name, value in columns.items()]
+    )
+    if errorIndication:
+        return str(errorIndication)
+    return errorStatus.prettyPrint() if errorStatus else 'noError'
+
+
+async def get_alarm(index, *columns):
+    """GET alarmTable columns of one row (prettyPrint values)"""
+    _, _, _, varBinds = await get_cmd(
+        SnmpEngine(),
+        CommunityData('public'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        *[ObjectType(ObjectIdentity(f'{ALARM_ENTRY}.{column}.{index}')) for column in columns]
+    )
+    return [val.prettyPrint() for name, val in varBinds]
+
+
+async def test_alarm_table(index=7):
+    """Test alarmTable rows created by SET and the alarmRising trap - AUTOMATED"""
+    print('\n--- Alarm Table Test ---')
+    from pyasn1.codec.ber import encoder
+    rising_oid = encoder.encode(ObjectIdentifier('1.3.6.1.4.1.28308.2.2'))
+    sample_interval = '1.3.6.1.4.1.28308.1.15.0'
+    
+    # Ciclo de vida de la fila: createAndWait -> notReady, variable no numérica rechazada, activación
+    test_results['alarms']['total'] += 1
+    try:
+        await set_alarm(index, status=6)
+        created = await set_alarm(index, status=5)
+        status = await get_alarm(index, 9)
+        rejected = await set_alarm(index, variable='1.3.6.1.2.1.1.1.0', status=1)
+        print(f'  createAndWait: {created}, status {status}, sysDescr as variable: {rejected}')
+        if created == 'noError' and status == ['3'] and rejected == 'inconsistentValue':
+            print('✓ Alarm row created by SET (notReady until complete)')
+            test_results['alarms']['passed'] += 1
+        else:
+            print('✗ Unexpected alarm row lifecycle')
+    except Exception as e:
+        print(f'✗ Alarm row test failed: {e}')
+    
+    # cpuSampleInterval (5) >= umbral ascendente 5: alarma de arranque en el siguiente tick
+    test_results['alarms']['total'] += 1
+    if not check_and_free_port_162():
+        print('✗ Cannot free port 162 for alarm test')
+        return
+    
+    class AlarmTrapReceiver(asyncio.DatagramProtocol):
+        def __init__(self):
+            self.received = asyncio.Event()
+        
+        def datagram_received(self, data, addr):
+            if rising_oid in data:
+                self.received.set()
+    
+    transport = None
+    try:
+        transport, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+            AlarmTrapReceiver, local_addr=('127.0.0.1', 162))
+        activated = await set_alarm(index, variable=sample_interval, interval=1, startup=1,
+                                    rising=5, falling=1, status=1)
+        print(f'  Activate alarm on cpuSampleInterval >= 5: {activated}')
+        await asyncio.wait_for(protocol.received.wait(), timeout=15.0)
+        value, status = await get_alarm(index, 5, 9)
+        print(f'  alarmValue {value}, alarmRowStatus {status}')
+        if value == '5' and status == '1':
+            print('✓ alarmRising trap received')
+            test_results['alarms']['passed'] += 1
+        else:
+            print('✗ Unexpected alarm values')
+    except asyncio.TimeoutError:
+        print('✗ Timeout: no alarmRising trap within 15 seconds')
+    except Exception as e:
+        print(f'✗ Alarm trap test failed: {e}')
+    finally:
+        if transport is not None:
+            transport.close()
+    
+    # destroy borra la fila
+    test_results['alarms']['total'] += 1
+    try:
+        destroyed = await set_alarm(index, status=6)
+        status = await get_alarm(index, 9)
+        if destroyed == 'noError' and 'No Such' in status[0]:
+            print('✓ Alarm row destroyed')
+            test_results['alarms']['passed'] += 1
+        else:
+            print(f'✗ Alarm row still present: {destroyed} {status}')
+    except Exception as e:
+        print(f'✗ Alarm destroy test failed: {e}')
+
+
+async def test_atomic_set(index=15):
+    """Test a SET mixing scalars and alarmTable rows is applied entirely or not at all"""
+    print('\n--- Atomic SET Test ---')
+    sys_location = '1.3.6.1.2.1.1.6.0'
+    test_results['alarms']['total'] += 1
+
+    async def set_mixed(*varBinds):
+        errorIndication, errorStatus, errorIndex, _ = await set_cmd(
+            SnmpEngine(),
+            CommunityData('private'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            *[ObjectType(ObjectIdentity(oid), value) for oid, value in varBinds]
+        )
+        if errorIndication:
+            return str(errorIndication), 0
+        return (errorStatus.prettyPrint() if errorStatus else 'noError'), int(errorIndex)
+
+    async def get_location():
+        _, _, _, varBinds = await get_cmd(
+            SnmpEngine(),
+            CommunityData('public'),
+            await UdpTransportTarget.create(('localhost', 161)),
+            ContextData(),
+            ObjectType(ObjectIdentity(sys_location))
+        )
+        return str(varBinds[0][1])
+
+    try:
+        await set_alarm(index, status=6)
+        original = await get_location()
+
+        # Escalar válido + fila que no puede activarse (sin alarmVariable)
+        failed = await set_mixed((sys_location, OctetString('PARTIAL')),
+                                 (f'{ALARM_ENTRY}.9.{index}', Integer(4)))
+        location, status = await get_location(), await get_alarm(index, 9)
+        print(f'  sysLocation + createAndGo without variable: {failed}, '
+              f'sysLocation {location!r}, row {status[0]}')
+        if failed != ('inconsistentValue', 2) or location != original or 'No Such' not in status[0]:
+            print('✗ Rejected SET left earlier varbinds applied')
+            return False
+
+        # Fila válida + escalar con tipo incorrecto: tampoco se crea la fila
+        failed = await set_mixed((f'{ALARM_ENTRY}.3.{index}', ObjectIdentifier('1.3.6.1.4.1.28308.1.15.0')),
+                                 (f'{ALARM_ENTRY}.9.{index}', Integer(4)),
+                                 (sys_location, Integer(1)))
+        status = await get_alarm(index, 9)
+        print(f'  createAndGo + sysLocation wrongType: {failed}, row {status[0]}')
+        if failed != ('wrongType', 3) or 'No Such' not in status[0]:
+            print('✗ Rejected SET created the alarm row')
+            return False
+
+        print('✓ Rejected SETs change nothing')
+        test_results['alarms']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ Atomic SET test failed: {e}')
+        return False
+    finally:
+        await set_alarm(index, status=6)
+
+
+async def set_integers(values):
+    """SET several Integer objects ({oid: value}) in one request with the private community"""
+    errorIndication, errorStatus, errorIndex, varBinds = await set_cmd(
+        SnmpEngine(),
+        CommunityData('private'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        *[ObjectType(ObjectIdentity(oid), Integer(value)) for oid, value in values.items()]
+    )
+    return not errorIndication and not errorStatus
+
+
+async def get_integers(*oids):
+    """GET integer objects and return their values"""
+    _, _, _, varBinds = await get_cmd(
+        SnmpEngine(),
+        CommunityData('public'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        *[ObjectType(ObjectIdentity(oid)) for oid in oids]
+    )
+    return [int(val) for name, val in varBinds]
+
+
+async def flap_alarm_variable(oid, times, period=2):
+    """Move an alarm variable above and below its thresholds 'times' times"""
+    for _ in range(times):
+        await set_integers({oid: 100})
+        await asyncio.sleep(period)
+        await set_integers({oid: 10})
+        await asyncio.sleep(period)
+
+
+
+async def test_set_rollback():
+    """Test a commitFailed rollback restores only the rows of that SET (--workers)"""
+    print('\n--- SET Rollback Test ---')
+    test_results['alarms']['total'] += 1
+
+    try:
+        # Importar el agente no carga ni escribe su estado: se prueba la tabla directamente
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from agent_AnaDaniel import TrapTargetTable, OID_TRAP_TARGET_ENTRY
+
+        table = TrapTargetTable('trapTargetTable', OID_TRAP_TARGET_ENTRY)
+        original = table.current()[(1,)]
+        # El SET crea la fila 2 y cambia el puerto de la fila 1
+        changes = {(2,): {2: '10.0.0.2', 6: 4}, (1,): {3: 1162}}
+        error, before = table.apply(changes)
+        if error:
+            print(f'✗ SET rejected: {error}')
+            return False
+        # Otro worker publica la fila 3 antes de que falle el resto del SET
+        error, _ = table.apply({(3,): {2: '10.0.0.3', 6: 4}})
+        if error:
+            print(f'✗ Concurrent row rejected: {error}')
+            return False
+
+        table.rollback(before, changes)
+        rows = table.current()
+        print(f'  Rows after rollback: {sorted(index[0] for index in rows)}')
+
+        if (2,) in rows or rows.get((1,)) != original:
+            print('✗ Rows changed by the failed SET were not restored')
+            return False
+        if (3,) not in rows:
+            print('✗ Rollback discarded a row committed by another worker')
+            return False
+
+        print('✓ Rollback restored the SET rows and kept the concurrent one')
+        test_results['alarms']['passed'] += 1
+        return True
+
+    except Exception as e:
+        print(f'✗ SET rollback test failed: {e}')
+        return False
+
+async def test_alert_suppression(index=8, flaps=6, window=15, hold=4):
+    """Test per-event rate limits, repeat summaries and hold time with a flapping alarm - AUTOMATED"""
+    print('\n--- Alert Suppression Test ---')
+    from pyasn1.codec.ber import encoder
+    base = '1.3.6.1.4.1.28308.1'
+    services = '1.3.6.1.2.1.1.7.0'     # sysServices: entero escribible sin efectos en el agente
+    counters = [f'{base}.24.0', f'{base}.25.0', f'{base}.26.0']     # alertHeldBack, alertSuppressed, alertSummaries
+    rising_oid = encoder.encode(ObjectIdentifier('1.3.6.1.4.1.28308.2.2'))
+    summary_oid = encoder.encode(ObjectIdentifier('1.3.6.1.4.1.28308.2.4'))
+    
+    if not check_and_free_port_162():
+        print('✗ Cannot free port 162 for suppression test')
+        return
+    
+    class SuppressionTrapReceiver(asyncio.DatagramProtocol):
+        def __init__(self):
+            self.rising = 0
+            self.summaries = 0
+        
+        def datagram_received(self, data, addr):
+            # El resumen incluye el tipo del evento repetido (alarmRising) entre sus varbinds
+            if summary_oid in data:
+                self.summaries += 1
+            elif rising_oid in data:
+                self.rising += 1
+    
+    transport = None
+    try:
+        transport, receiver = await asyncio.get_running_loop().create_datagram_endpoint(
+            SuppressionTrapReceiver, local_addr=('127.0.0.1', 162))
+        
+        # Límite de 1 notificación por evento y ventana: las repeticiones se resumen al cerrarse
+        test_results['alarms']['total'] += 1
+        await set_integers({f'{base}.15.0': 1, f'{base}.21.0': 0, f'{base}.22.0': 1,
+                            f'{base}.23.0': window, services: 10})
+        await set_alarm(index, status=6)
+        created = await set_alarm(index, variable=services, interval=1, startup=1,
+                                  rising=50, falling=20, status=4)
+        before = await get_integers(*counters)
+        await asyncio.sleep(2)
+        await flap_alarm_variable(services, flaps)
+        await asyncio.sleep(window + 2)
+        after = await get_integers(*counters)
+        suppressed = after[1] - before[1]
+        print(f'  Alarm row: {created}; {flaps} flaps -> {receiver.rising} alarmRising, '
+              f'{receiver.summaries} alertSummary, {suppressed} suppressed')
+        if 1 <= receiver.rising < flaps and receiver.summaries >= 1 and suppressed >= 1:
+            print('✓ Repeated alerts rate limited and summarized')
+            test_results['alarms']['passed'] += 1
+        else:
+            print('✗ Unexpected rate limiting')
+        
+        # alertHoldTime: subidas más cortas que el tiempo de mantenimiento no se notifican
+        test_results['alarms']['total'] += 1
+        await set_integers({f'{base}.22.0': 0, f'{base}.21.0': hold})
+        rising_before = receiver.rising
+        await flap_alarm_variable(services, 3)
+        held = (await get_integers(counters[0]))[0] - after[0]
+        flapped = receiver.rising - rising_before
+        await set_integers({services: 100})
+        await asyncio.sleep(hold + 3)
+        sustained = receiver.rising - rising_before - flapped
+        print(f'  Hold {hold}s: {held} held back, {flapped} alarmRising while flapping, '
+              f'{sustained} once sustained')
+        if held >= 2 and flapped == 0 and sustained == 1:
+            print('✓ Short-lived crossings held back')
+            test_results['alarms']['passed'] += 1
+        else:
+            print('✗ Unexpected hold time behaviour')
+    
+    except Exception as e:
+        print(f'✗ Suppression test failed: {e}')
+    finally:
+        if transport is not None:
+            transport.close()
+        await set_alarm(index, status=6)
+        await set_integers({services: 72, f'{base}.15.0': 5, f'{base}.21.0': 0,
+                            f'{base}.22.0': 0, f'{base}.23.0': 60})
+
+
+async def test_inform_retransmission(index=9):
+    """Test alerts sent as INFORMs are retransmitted until acknowledged - AUTOMATED"""
+    print('\n--- INFORM Retransmission Test ---')
+    from pyasn1.codec.ber import decoder, encoder
+    from pysnmp.proto import api
+    sample_interval = '1.3.6.1.4.1.28308.1.15.0'
+    test_results['trap']['total'] += 1
+    
+    class InformReceiver(asyncio.DatagramProtocol):
+        def __init__(self):
+            self.transmissions = {}     # request-id -> veces recibido
+            self.acked = asyncio.Event()
+        
+        def connection_made(self, transport):
+            self.transport = transport
+        
+        def datagram_received(self, data, addr):
+            message, _ = decoder.decode(data, asn1Spec=api.v2c.Message())
+            pdu = api.v2c.apiMessage.get_pdu(message)
+            if not pdu.isSameTypeWith(api.v2c.InformRequestPDU()):
+                return
+            request_id = int(api.v2c.apiPDU.get_request_id(pdu))
+            self.transmissions[request_id] = self.transmissions.get(request_id, 0) + 1
+            # Se pierde la primera transmisión: sólo se confirma la retransmisión
+            if self.transmissions[request_id] > 1:
+                self.transport.sendto(encoder.encode(api.v2c.apiMessage.get_response(message)), addr)
+                self.acked.set()
+    
+    transport = None
+    try:
+        print('  Restarting agent with --inform...')
+        stop_agent()
+        await asyncio.sleep(3)
+        if not start_agent_in_terminal(['--inform']) or not await wait_for_agent_ready(15):
+            print('✗ Agent did not restart properly')
+            return False
+        if not check_and_free_port_162():
+            print('✗ Cannot free port 162 for INFORM test')
+            return False
+        
+        transport, receiver = await asyncio.get_running_loop().create_datagram_endpoint(
+            InformReceiver, local_addr=('127.0.0.1', 162))
+        await set_alarm(index, variable=sample_interval, interval=1, startup=1,
+                        rising=5, falling=1, status=4)
+        await asyncio.wait_for(receiver.acked.wait(), timeout=15.0)
+        await asyncio.sleep(1)
+        delivered, failed = await get_integers('1.3.6.1.4.1.28308.1.7.0', '1.3.6.1.4.1.28308.1.8.0')
+        retransmitted = sum(1 for count in receiver.transmissions.values() if count > 1)
+        print(f'  {len(receiver.transmissions)} INFORMs, {retransmitted} retransmitted; '
+              f'notifyDelivered {delivered}, notifyFailed {failed}')
+        if retransmitted >= 1 and delivered >= 1 and failed == 0:
+            print('✓ Lost INFORM retransmitted and acknowledged')
+            test_results['trap']['passed'] += 1
+            return True
+        print('✗ Unexpected INFORM delivery')
+        return False
+    
+    except asyncio.TimeoutError:
+        print('✗ Timeout: no INFORM retransmission within 15 seconds')
+        return False
+    except Exception as e:
+        print(f'✗ INFORM test failed: {e}')
+        return False
+    finally:
+        if transport is not None:
+            transport.close()
+        await set_alarm(index, status=6)
+
+
+TRAP_TARGET_ENTRY = '1.3.6.1.4.1.28308.1.29.1'
+
+
+async def set_trap_target(index, **columns):
+    """SET trapTargetTable columns of one row in a single PDU; returns the error status name"""
+    numbers = {'address': 2, 'port': 3, 'status': 6}
+    errorIndication, errorStatus, errorIndex, varBinds = await set_cmd(
+        SnmpEngine(),
+        CommunityData('private'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        *[ObjectType(ObjectIdentity(f'{TRAP_TARGET_ENTRY}.{numbers[name]}.{index}'),
+                     OctetString(value) if name == 'address' else Integer(value))
+          for name, value in columns.items()]
+    )
+    if errorIndication:
+        return str(errorIndication)
+    return errorStatus.prettyPrint() if errorStatus else 'noError'
+
+
+async def test_trap_target_fanout(count=5, ack_delay=1.0, index=10):
+    """Test alerts fan out concurrently to every trapTargetTable row - AUTOMATED"""
+    print('\n--- Trap Target Fan-out Test ---')
+    from pyasn1.codec.ber import decoder, encoder
+    from pysnmp.proto import api
+    sample_interval = '1.3.6.1.4.1.28308.1.15.0'
+    rows = range(11, 11 + count)
+    test_results['trap']['total'] += 1
+    
+    class SlowInformReceiver(asyncio.DatagramProtocol):
+        def __init__(self):
+            self.first = None       # Llegada del primer INFORM
+            self.acked = asyncio.Event()
+        
+        def connection_made(self, transport):
+            self.transport = transport
+        
+        def datagram_received(self, data, addr):
+            if self.first is None:
+                self.first = time.monotonic()
+            message, _ = decoder.decode(data, asn1Spec=api.v2c.Message())
+            response = encoder.encode(api.v2c.apiMessage.get_response(message))
+            # Confirmación lenta: un envío en serie separaría las llegadas ack_delay segundos
+            asyncio.get_running_loop().call_later(ack_delay, self.reply, response, addr)
+        
+        def reply(self, response, addr):
+            self.transport.sendto(response, addr)
+            self.acked.set()
+    
+    transports = []
+    try:
+        receivers = []
+        for row in rows:
+            transport, receiver = await asyncio.get_running_loop().create_datagram_endpoint(
+                SlowInformReceiver, local_addr=('127.0.0.1', 16300 + row))
+            transports.append(transport)
+            receivers.append(receiver)
+            await set_trap_target(row, address='127.0.0.1', port=16300 + row, status=4)
+        await set_trap_target(1, status=2)     # Destino por defecto (162) fuera de servicio
+        
+        start = time.monotonic()
+        await set_alarm(index, variable=sample_interval, interval=1, startup=1,
+                        rising=5, falling=1, status=4)
+        await asyncio.wait_for(asyncio.gather(*(r.acked.wait() for r in receivers)), timeout=15.0)
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0.5)
+        
+        arrivals = [r.first for r in receivers]
+        spread = max(arrivals) - min(arrivals)
+        delivered = await get_integers(*[f'{TRAP_TARGET_ENTRY}.4.{row}' for row in rows])
+        print(f'  {count} targets: arrivals within {spread * 1000:.0f} ms, all acknowledged after '
+              f'{elapsed:.1f}s; trapTargetDelivered {delivered}')
+        if spread < ack_delay / 2 and all(value >= 1 for value in delivered):
+            print('✓ Alert delivered concurrently to every target')
+            test_results['trap']['passed'] += 1
+            return True
+        print('✗ Targets were not notified concurrently')
+        return False
+    
+    except asyncio.TimeoutError:
+        print('✗ Timeout: not every target acknowledged within 15 seconds')
+        return False
+    except Exception as e:
+        print(f'✗ Fan-out test failed: {e}')
+        return False
+    finally:
+        for transport in transports:
+            transport.close()
+        await set_alarm(index, status=6)
+        for row in rows:
+            await set_trap_target(row, status=6)
+        await set_trap_target(1, status=1)
+
+
+class StandInSmtpServer:
+    """Minimal local SMTP server that records connections, logins and messages"""
+    
+    def __init__(self):
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+        self.server = None
+        self.writers = set()
+    
+    async def start(self, port):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', port)
+    
+    async def stop(self):
+        self.server.close()
+        # Cerrar las sesiones que el agente mantiene abiertas en su pool
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+    
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.writers.add(writer)
+        writer.write(b'220 standin ESMTP\r\n')
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode(errors='replace').split()
+                verb = parts[0].upper() if parts else ''
+                
+                if verb == 'EHLO':
+                    writer.write(b'250-standin\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n')
+                elif verb == 'AUTH':
+                    # PLAIN con o sin respuesta inicial, o LOGIN (usuario y contraseña)
+                    challenges = 2 if parts[1].upper() == 'LOGIN' else (0 if len(parts) > 2 else 1)
+                    for _ in range(challenges):
+                        writer.write(b'334 \r\n')
+                        await writer.drain()
+                        await reader.readline()
+                    self.logins += 1
+                    writer.write(b'235 2.7.0 Authentication successful\r\n')
+                elif verb == 'DATA':
+                    writer.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                    await writer.drain()
+                    data = b''
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b'.\r\n', b''):
+                            break
+                        data += data_line[1:] if data_line.startswith(b'..') else data_line
+                    self.messages.append(data)
+                    writer.write(b'250 OK\r\n')
+                elif verb == 'QUIT':
+                    writer.write(b'221 Bye\r\n')
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b'250 OK\r\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+    
+    def subjects(self):
+        import email
+        from email.header import decode_header, make_header
+        return [str(make_header(decode_header(email.message_from_bytes(raw)['Subject'])))
+                for raw in self.messages]
+
+
+async def set_threshold(value):
+    """Set cpuThreshold with the private community"""
+    await set_cmd(
+        SnmpEngine(),
+        CommunityData('private'),
+        await UdpTransportTarget.create(('localhost', 161)),
+        ContextData(),
+        ObjectType(ObjectIdentity('1.3.6.1.4.1.28308.1.4.0'), Integer(value))
+    )
+
+
+async def trigger_cpu_alerts(count, sample_wait=6):
+    """Cross the CPU threshold 'count' times under load (one sample above, one below)"""
+    processes = generate_cpu_load(duration=count * 2 * sample_wait + 5)
+    try:
+        for _ in range(count):
+            await set_threshold(0)
+            await asyncio.sleep(sample_wait)
+            await set_threshold(100)
+            await asyncio.sleep(sample_wait)
+    finally:
+        stop_cpu_load(processes)
+        await set_threshold(80)
+
+
+async def test_email_pool(smtp_port=2525, digest_window=20):
+    """Test pooled SMTP sessions and digest mode against a stand-in server - AUTOMATED"""
+    print('\n--- Email Pool / Digest Test ---')
+    smtp_args = ['--smtp-server', '127.0.0.1', '--smtp-port', str(smtp_port), '--smtp-no-tls']
+    
+    for digest in (False, True):
+        test_results['email']['total'] += 1
+        server = StandInSmtpServer()
+        try:
+            await server.start(smtp_port)
+            
+            extra_args = smtp_args + (['--email-digest', str(digest_window)] if digest else [])
+            print(f'  Restarting agent with {" ".join(extra_args)}...')
+            stop_agent()
+            await asyncio.sleep(3)
+            await set_threshold(100)
+            if not start_agent_in_terminal(extra_args) or not await wait_for_agent_ready(15):
+                print('✗ Agent did not restart properly')
+                continue
+            await set_threshold(100)
+            
+            await trigger_cpu_alerts(2)
+            if digest:
+                # Esperar a que se cierre la ventana de resumen
+                await asyncio.sleep(digest_window - 6)
+            else:
+                await asyncio.sleep(2)
+            
+            subjects = server.subjects()
+            print(f'  SMTP: {server.connections} connections, {server.logins} logins, '
+                  f'{len(server.messages)} messages {subjects}')
+            
+            if digest:
+                ok = len(server.messages) == 1 and '2 alertas' in subjects[0]
+                label = '2 alerts merged into one digest email'
+            else:
+                ok = len(server.messages) == 2 and server.connections == 1 and server.logins == 1
+                label = '2 alert emails over one pooled SMTP session'
+            
+            if ok:
+                print(f'✓ {label}')
+                test_results['email']['passed'] += 1
+            else:
+                print(f'✗ Expected {label}')
+                
+        except Exception as e:
+            print(f'✗ Email test failed: {e}')
+            import traceback
+            traceback.print_exc()
+        finally:
+            await server.stop()
+
+
 def print_summary():
     """Print test results summary"""
     total_passed = sum(cat['passed'] for cat in test_results.values())
@@ -733,12 +2624,19 @@ def print_summary():
     print(f'│  GET operations:        ✓ {test_results["get"]["passed"]}/{test_results["get"]["total"]}           │')
     print(f'│  GETNEXT operations:    ✓ {test_results["getnext"]["passed"]}/{test_results["getnext"]["total"]}           │')
     print(f'│  WALK operations:       ✓ {test_results["walk"]["passed"]}/{test_results["walk"]["total"]} ({test_results["walk"]["oids"]} OIDs)  │')
+    print(f'│  GETBULK operations:    ✓ {test_results["getbulk"]["passed"]}/{test_results["getbulk"]["total"]}           │')
     print(f'│  SET success:           ✓ {test_results["set_success"]["passed"]}/{test_results["set_success"]["total"]}           │')
     print(f'│  SET failures (expected): ✓ {test_results["set_failure"]["passed"]}/{test_results["set_failure"]["total"]}         │')
     print(f'│  Access control:        ✓ {test_results["access_control"]["passed"]}/{test_results["access_control"]["total"]}           │')
     print(f'│  CPU sampler:           ✓ {test_results["cpu_sampler"]["passed"]}/{test_results["cpu_sampler"]["total"]}           │')
     print(f'│  Persistence:           ✓ {test_results["persistence"]["passed"]}/{test_results["persistence"]["total"]}           │')
+    print(f'│  Collectors:            ✓ {test_results["collectors"]["passed"]}/{test_results["collectors"]["total"]}           │')
+    print(f'│  Fast path:             ✓ {test_results["fast_path"]["passed"]}/{test_results["fast_path"]["total"]}           │')
+    print(f'│  Workers:               ✓ {test_results["workers"]["passed"]}/{test_results["workers"]["total"]}           │')
     print(f'│  Trap sending:          ✓ {test_results["trap"]["passed"]}/{test_results["trap"]["total"]}           │')
+    print(f'│  Notification queue:    ✓ {test_results["notify_queue"]["passed"]}/{test_results["notify_queue"]["total"]}           │')
+    print(f'│  Alarms/suppression:    ✓ {test_results["alarms"]["passed"]}/{test_results["alarms"]["total"]}           │')
+    print(f'│  Email pool/digest:     ✓ {test_results["email"]["passed"]}/{test_results["email"]["total"]}           │')
     print('├─────────────────────────────────────────┤')
     print(f'│  TOTAL:                 ✓ {total_passed}/{total_tests}         │')
     print(f'│  SUCCESS RATE:          {success_rate:.0f}%            │')
@@ -777,6 +2675,8 @@ async def main():
         await test_get('1.3.6.1.4.1.28308.1.4.0', 'cpuThreshold')
         await test_get('1.3.6.1.2.1.1.1.0', 'sysDescr')
         await test_get('1.3.6.1.2.1.1.3.0', 'sysUpTime')
+        await test_get('1.3.6.1.4.1.28308.1.5.0', 'notifyQueueDepth')
+        await test_get('1.3.6.1.4.1.28308.1.6.0', 'notifyDropped')
         
         # 2.7.2 - GETNEXT
         print('\n--- GETNEXT Tests (2.7.2) ---')
@@ -786,12 +2686,30 @@ async def main():
         # 2.7.8 - WALK
         await test_walk('1.3.6.1.4.1.28308', 'Enterprise MIB (2.7.8)')
         
+        # GETBULK
+        print('\n--- GETBULK Tests ---')
+        await test_getbulk(0, 4, ['1.3.6.1.4.1.28308'], [
+            '1.3.6.1.4.1.28308.1.1.0', '1.3.6.1.4.1.28308.1.2.0',
+            '1.3.6.1.4.1.28308.1.3.0', '1.3.6.1.4.1.28308.1.4.0'
+        ], 'Enterprise MIB (M=4)')
+        await test_getbulk(1, 2, ['1.3.6.1.2.1.1.1.0', '1.3.6.1.4.1.28308.1.2.0'], [
+            '1.3.6.1.2.1.1.2.0', '1.3.6.1.4.1.28308.1.3.0', '1.3.6.1.4.1.28308.1.4.0'
+        ], 'non-repeaters (N=1, M=2)')
+        await test_getbulk(0, 1000, ['1.3.6.1.2.1.1'], [
+            '1.3.6.1.2.1.1.1.0', '1.3.6.1.2.1.1.2.0', '1.3.6.1.2.1.1.3.0'
+        ], 'large max-repetitions (M=1000)')
+        
         # 2.7.3 - SET success
         print('\n--- SET Tests - Success (2.7.3) ---')
         await test_set('1.3.6.1.4.1.28308.1.1.0', OctetString('Alice'), True, 'manager')
         await test_set('1.3.6.1.4.1.28308.1.2.0', OctetString('analumontuenga@gmail.com'), True, 'managerEmail')
         await test_set('1.3.6.1.4.1.28308.1.4.0', Integer(75), True, 'cpuThreshold')
         
+        # Los valores cacheados se invalidan tras un SET (y manager/sysContact siguen sincronizados)
+        await test_get('1.3.6.1.4.1.28308.1.1.0', 'manager after SET', expected='Alice')
+        await test_get('1.3.6.1.2.1.1.4.0', 'sysContact after SET', expected='Alice')
+        await test_get('1.3.6.1.4.1.28308.1.4.0', 'cpuThreshold after SET', expected='75')
+        
         # 2.7.4 - SET failures
         print('\n--- SET Tests - Expected Failures (2.7.4) ---')
         await test_set('1.3.6.1.4.1.28308.1.3.0', Integer(50), False, 'cpuUsage (notWritable)')
@@ -817,15 +2735,52 @@ async def main():
                 print('✗ Access control failed')
         except Exception as e:
             print(f'✗ Test error: {e}')
+        await test_interleaved_access()
         
         # 2.7.6 - CPU sampler
         await test_cpu_sampler()
+        await test_cpu_history()
+        await test_cpu_history_windows()
+        await test_cpu_core_table()
+        await test_sample_interval()
         
         # 2.7.5 - Persistence
         await test_persistence()
+        await test_journal_replay()
+        await test_slow_journal()
+        
+        # Recolectores fuera del event loop (deja el agente corriendo con --slow-collector)
+        await test_interface_table()
+        await test_process_table()
+        await test_storage_tables()
+        await test_cgroup_table()
+        await test_pressure()
+        await test_slow_collector()
+        
+        # Fast path (deja el agente corriendo con --fast-path)
+        await test_fast_path()
+        
+        # Multiproceso (deja el agente corriendo con --workers)
+        await test_workers()
         
         # 2.7.7 - Trap
         await test_trap_sending()
+        await test_notification_queue()
+        await test_notify_drain()
+        await test_digest_shutdown()
+        
+        # Tabla de alarmas (filas creadas por SET, trap alarmRising)
+        await test_alarm_table()
+        await test_atomic_set()
+        await test_set_rollback()
+        await test_alert_suppression()
+        
+        # INFORMs confirmados y varios destinos (deja el agente corriendo con --inform)
+        await test_inform_retransmission()
+        await test_trap_target_fanout()
+        
+        # Email (servidor SMTP local de prueba)
+        await test_email_pool()
         
     finally:
         # Detener el agente al finalizar